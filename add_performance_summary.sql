@@ -0,0 +1,22 @@
+-- إضافة جدول الإحصائيات التراكمية لأداء الصفقات
+-- يُحدَّث بواسطة TradeEvaluator في نفس معاملة كل صفقة مُقيّمة
+-- بعد التنفيذ شغّل: python3 python_scripts/rebuild_performance_summary.py
+
+USE saudi_stock_advisor;
+
+-- صف واحد (id = 1) يحمل المجاميع الجارية لجدول trade_performance
+CREATE TABLE IF NOT EXISTS trade_performance_summary (
+    id TINYINT PRIMARY KEY,
+    total_trades INT NOT NULL DEFAULT 0,
+    successful_trades INT NOT NULL DEFAULT 0,
+    failed_trades INT NOT NULL DEFAULT 0,
+    neutral_trades INT NOT NULL DEFAULT 0,
+    sum_return DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sum_sq_return DECIMAL(18,4) NOT NULL DEFAULT 0,
+    total_profit_loss DECIMAL(14,2) NOT NULL DEFAULT 0,
+    best_trade DECIMAL(5,2),
+    worst_trade DECIMAL(5,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+SELECT 'Trade performance summary table created successfully!' as status;
@@ -0,0 +1,9 @@
+-- إضافة عمود updated_at لجدول الأسعار التاريخية
+-- يسمح للنسخة المحلية (backend/data/price_snapshot.py) بجلب الصفوف المضافة أو المعدلة فقط
+-- (شمعة اليوم تُحدَّث كل ساعة عبر ON DUPLICATE KEY UPDATE)
+
+USE saudi_stock_advisor;
+
+ALTER TABLE historicalDailyPrices
+    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_updated_at (updated_at);
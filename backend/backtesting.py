@@ -0,0 +1,327 @@
+"""
+محرك Backtesting متجه (NumPy) لصفقات التوصيات
+
+نفس قواعد Backtester في python_scripts/backtest_model.py:
+- إشارة لكل يوم من الشمعة 50 حتى ما قبل آخر 5 شموع (تجاهل hold والثقة أقل من 55%)
+- الدخول بإغلاق يوم الإشارة، هدف 4% ووقف 2% (عكسهما للبيع)
+- الشموع الخمس التالية بالترتيب، والهدف أولاً إذا تحقق الاثنان في نفس الشمعة
+- بدون هدف أو وقف: الخروج بإغلاق الشمعة الخامسة (exit_date دائماً تاريخ الشمعة الخامسة)
+
+بدلاً من iloc و iterrows لكل صفقة: نوافذ منزلقة (sliding_window_view) للشموع التالية
+لكل الإشارات معاً، و argmax لأول شمعة تحقق فيها الهدف أو الوقف.
+
+backtest_parallel: كل السوق بالتوازي - أسعار كل الأسهم في كتلة SharedMemory واحدة
+تقرأها العمليات بدون نسخ، ونسخة واحدة من النموذج لكل عملية، والصفقات تُدمج بترتيب الأسهم.
+score_parallel: نفس التوزيع للتنبؤات فقط (لـ backend/strategy_sweep.py).
+
+المعاملات الافتراضية من backend/strategy.py.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backend.data.feature_store import PRICE_COLUMNS, FeatureStore
+from backend.data.training_dataset import group_by_symbol
+from backend.profiling import stage
+from backend.strategy import HOLD_DAYS, MIN_CONFIDENCE, STOP_PCT, TARGET_PCT, WARMUP_BARS
+
+
+def signal_rows(predictions: np.ndarray, confidences: np.ndarray, warmup: int = WARMUP_BARS,
+                hold_days: int = HOLD_DAYS, min_confidence: float = MIN_CONFIDENCE) -> np.ndarray:
+    """فهارس أيام الإشارات القابلة للتداول (ليست hold، ثقة كافية، و hold_days شمعة بعدها)"""
+    predictions = np.asarray(predictions).astype(str)
+    rows = np.arange(warmup, len(predictions) - hold_days)
+    keep = (predictions[rows] != 'hold') & (np.asarray(confidences)[rows] >= min_confidence)
+    return rows[keep]
+
+
+def resolve_exits(high: np.ndarray, low: np.ndarray, close: np.ndarray, entry_rows: np.ndarray,
+                  is_buy: np.ndarray, target_pct: float = TARGET_PCT, stop_pct: float = STOP_PCT,
+                  hold_days: int = HOLD_DAYS) -> Dict[str, np.ndarray]:
+    """
+    الخروج لكل صفقة من الشموع التالية دفعة واحدة
+
+    entry_rows: فهارس أيام الدخول (كل منها له hold_days شمعة بعده)
+    is_buy: True للشراء، False للبيع
+    يرجع مصفوفات: entry_price, target_price, stop_loss, exit_price, hit_target, hit_stop, exit_bar
+    (exit_bar: فهرس أول شمعة تحقق فيها الهدف أو الوقف، أو الشمعة الأخيرة)
+    """
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    entry = close[entry_rows]
+    target = np.where(is_buy, entry * (1 + target_pct), entry * (1 - target_pct))
+    stop = np.where(is_buy, entry * (1 - stop_pct), entry * (1 + stop_pct))
+
+    # النافذة k تغطي الشموع k+1 .. k+hold_days
+    highs = sliding_window_view(high[1:], hold_days)[entry_rows]
+    lows = sliding_window_view(low[1:], hold_days)[entry_rows]
+
+    buy = is_buy[:, None]
+    target_hit = np.where(buy, highs >= target[:, None], lows <= target[:, None])
+    stop_hit = np.where(buy, lows <= stop[:, None], highs >= stop[:, None])
+
+    any_hit = target_hit | stop_hit
+    first = any_hit.argmax(axis=1)
+    hit = any_hit[np.arange(len(entry_rows)), first]
+    hit_target = hit & target_hit[np.arange(len(entry_rows)), first]
+    hit_stop = hit & ~hit_target
+
+    last_close = close[entry_rows + hold_days]
+    return {
+        'entry_price': entry,
+        'target_price': target,
+        'stop_loss': stop,
+        'exit_price': np.where(hit_target, target, np.where(hit_stop, stop, last_close)),
+        'hit_target': hit_target,
+        'hit_stop': hit_stop,
+        'exit_bar': entry_rows + np.where(hit, first + 1, hold_days)
+    }
+
+
+def simulate_trades(symbol: str, df: pd.DataFrame, predictions: np.ndarray, confidences: np.ndarray,
+                    target_pct: float = TARGET_PCT, stop_pct: float = STOP_PCT,
+                    hold_days: int = HOLD_DAYS, min_confidence: float = MIN_CONFIDENCE,
+                    warmup: int = WARMUP_BARS) -> List[Dict]:
+    """
+    صفقات سهم واحد بنفس أعمدة وترتيب Backtester
+
+    df: شموع السهم مرتبة حسب التاريخ (date, high, low, close)
+    predictions / confidences: لكل صفوف df (من predict_with_proba دفعة واحدة، الثقة بالنسبة المئوية)
+    """
+    predictions = np.asarray(predictions).astype(str)
+    rows = signal_rows(predictions, confidences, warmup, hold_days, min_confidence)
+    if len(rows) == 0:
+        return []
+
+    is_buy = predictions[rows] == 'buy'
+    exits = resolve_exits(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(),
+                          rows, is_buy, target_pct, stop_pct, hold_days)
+
+    entry, exit_price = exits['entry_price'], exits['exit_price']
+    profit_loss = np.where(is_buy, exit_price - entry, entry - exit_price)
+    dates = df['date'].to_numpy(dtype=object)
+
+    return pd.DataFrame({
+        'symbol': symbol,
+        'type': predictions[rows],
+        'entry_price': entry,
+        'exit_price': exit_price,
+        'target_price': exits['target_price'],
+        'stop_loss': exits['stop_loss'],
+        'profit_loss': profit_loss,
+        'profit_loss_percent': (profit_loss / entry) * 100,
+        'confidence': np.asarray(confidences, dtype=np.float64)[rows],
+        'hit_target': exits['hit_target'],
+        'hit_stop': exits['hit_stop'],
+        'entry_date': dates[rows],
+        'exit_date': dates[rows + hold_days]
+    }).to_dict('records')
+
+
+def summarize_trades(trades: List[Dict]) -> Dict:
+    """مقاييس Backtester: العدد والنجاح والربح و Sharpe و Max Drawdown (بترتيب الصفقات)"""
+    total = len(trades)
+    successful = sum(1 for t in trades if t['hit_target'])
+    failed = sum(1 for t in trades if not t['hit_target'] and t['hit_stop'])
+    total_profit = sum(t['profit_loss'] for t in trades)
+    summary = {
+        'total_trades': total,
+        'successful_trades': successful,
+        'failed_trades': failed,
+        'neutral_trades': total - successful - failed,
+        'total_profit': total_profit
+    }
+    if total == 0:
+        return summary
+
+    returns = [t['profit_loss_percent'] for t in trades]
+    cumulative_returns = np.cumsum(returns)
+    summary.update({
+        'success_rate': successful / total * 100,
+        'avg_profit': total_profit / total,
+        'sharpe_ratio': (np.mean(returns) / np.std(returns)) * np.sqrt(252) if np.std(returns) > 0 else 0,
+        'max_drawdown': float(np.min(cumulative_returns - np.maximum.accumulate(cumulative_returns)))
+    })
+    return summary
+
+
+# ==================== سهم واحد ====================
+
+def score_symbol(symbol: str, prices: pd.DataFrame, ml_model, feature_store: FeatureStore) -> Optional[pd.DataFrame]:
+    """
+    تنبؤات سهم واحد: المؤشرات من مخزن الميزات والتنبؤ لكل الصفوف دفعة واحدة
+
+    prices: آخر الشموع (date + OHLCV) بأي ترتيب - أقل من 100 شمعة لا تُختبر
+    يرجع (date, high, low, close, prediction, confidence) مرتبة حسب التاريخ، أو None
+    """
+    if len(prices) < 100 or not ml_model.features:
+        return None
+
+    with stage("indicators"):
+        df = prices.copy()
+        for col in PRICE_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(float)
+        df = df.sort_values('date')
+        start = pd.Timestamp(df['date'].iloc[0])
+
+        # قراءة المؤشرات من مخزن الميزات (تُحسب للشموع الجديدة فقط)
+        df = feature_store.update(symbol, df)
+        df = df[df['date'] >= start]
+        df = df.dropna()
+
+    if len(df) < 50:
+        return None
+
+    with stage("predict"):
+        X = df[ml_model.features].to_numpy(dtype=float)
+        predictions, probabilities = ml_model.predict_with_proba(X)
+
+    scored = df[['date', 'high', 'low', 'close']].reset_index(drop=True)
+    scored['prediction'] = np.asarray(predictions).astype(str)
+    scored['confidence'] = probabilities.max(axis=1) * 100
+    return scored
+
+
+def scored_trades(symbol: str, scored: Optional[pd.DataFrame]) -> List[Dict]:
+    """simulate_trades بالمعاملات الافتراضية على نتيجة score_symbol"""
+    if scored is None:
+        return []
+    with stage("simulate"):
+        return simulate_trades(symbol, scored, scored['prediction'].to_numpy(), scored['confidence'].to_numpy())
+
+
+def backtest_symbol(symbol: str, prices: pd.DataFrame, ml_model, feature_store: FeatureStore) -> List[Dict]:
+    """صفقات سهم واحد: score_symbol ثم simulate_trades بالمعاملات الافتراضية"""
+    return scored_trades(symbol, score_symbol(symbol, prices, ml_model, feature_store))
+
+
+# ==================== كل السوق بالتوازي ====================
+
+class SharedPrices:
+    """
+    أسعار كل الأسهم في كتلة SharedMemory واحدة: مصفوفة float64 (صفوف × date,OHLCV)
+    مرتبة حسب (symbol, date)، والتاريخ كعدد أيام منذ 1970 (دقيق في float64)
+    """
+
+    COLUMNS = ['date'] + PRICE_COLUMNS
+
+    def __init__(self, prices: pd.DataFrame):
+        groups = group_by_symbol(prices)
+        self.symbols = [symbol for symbol, _ in groups]
+        sizes = [len(df) for _, df in groups]
+        self.bounds = np.r_[0, np.cumsum(sizes)].astype(np.int64)
+
+        n_rows = int(self.bounds[-1])
+        self.shm = SharedMemory(create=True, size=max(1, n_rows * len(self.COLUMNS) * 8))
+        matrix = np.ndarray((n_rows, len(self.COLUMNS)), dtype=np.float64, buffer=self.shm.buf)
+        for (_, df), start in zip(groups, self.bounds[:-1]):
+            end = start + len(df)
+            matrix[start:end, 0] = pd.to_datetime(df['date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+            matrix[start:end, 1:] = df[PRICE_COLUMNS].to_numpy(dtype=np.float64)
+        del matrix  # لا يبقى مرجع للكتلة قبل close
+
+    @property
+    def spec(self):
+        """ما تحتاجه العمليات للاتصال بالكتلة (الاسم والشكل والأسهم والحدود)"""
+        return self.shm.name, (int(self.bounds[-1]), len(self.COLUMNS)), self.symbols, self.bounds
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _prices_frame(matrix: np.ndarray, start: int, end: int) -> pd.DataFrame:
+    block = matrix[start:end]
+    frame = pd.DataFrame(block[:, 1:], columns=PRICE_COLUMNS)
+    frame.insert(0, 'date', block[:, 0].astype(np.int64).astype('datetime64[D]').astype('datetime64[ns]'))
+    return frame
+
+
+# حالة كل عملية: الكتلة المشتركة والنموذج ومخزن الميزات
+_worker: Dict = {}
+
+
+def _init_worker(spec, ml_model, feature_store: FeatureStore, func):
+    name, shape, symbols, bounds = spec
+    shm = SharedMemory(name=name)
+    _worker.update(shm=shm, matrix=np.ndarray(shape, dtype=np.float64, buffer=shm.buf),
+                   symbols=symbols, bounds=bounds, ml_model=ml_model,
+                   feature_store=feature_store, func=func)
+
+
+def _release_worker():
+    shm = _worker.pop('shm', None)
+    _worker.clear()  # المصفوفة قبل close (لا تُغلق الكتلة وعليها مراجع)
+    if shm is not None:
+        shm.close()
+
+
+def _symbol_task(index: int):
+    symbol = _worker['symbols'][index]
+    start, end = _worker['bounds'][index], _worker['bounds'][index + 1]
+    try:
+        return _worker['func'](symbol, _prices_frame(_worker['matrix'], start, end),
+                               _worker['ml_model'], _worker['feature_store'])
+    except Exception as e:
+        print(f"⚠️  خطأ في {symbol}: {e}")
+        return None
+
+
+def map_symbols(func, prices: pd.DataFrame, ml_model, feature_store: FeatureStore,
+                symbols: Optional[Sequence[str]] = None, n_workers: Optional[int] = None) -> List:
+    """
+    func(symbol, prices, ml_model, feature_store) لكل سهم في prices بالتوازي
+
+    func: دالة على مستوى الوحدة (تُرسل للعمليات بالاسم) مثل backtest_symbol أو score_symbol
+    prices: (symbol, date, OHLCV) لكل الأسهم (مثل compact_prices)
+    feature_store: مخزن الميزات (كل عملية تحدّث ملفات أسهمها فقط)
+    symbols: ترتيب النتائج (افتراضياً ترتيب الأسهم في prices)
+    n_workers: عدد العمليات (افتراضياً كل الأنوية)
+    يرجع [(symbol, النتيجة)] - None للسهم الذي فشل - بنفس الترتيب مهما كان عدد العمليات
+    """
+    shared = SharedPrices(prices)
+    order = {symbol: i for i, symbol in enumerate(shared.symbols)}
+    indexes = [order[s] for s in (symbols if symbols is not None else shared.symbols) if s in order]
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(indexes) or 1))
+
+    try:
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(shared.spec, ml_model, feature_store, func)) as executor:
+                results = list(executor.map(_symbol_task, indexes,
+                                            chunksize=max(1, len(indexes) // (n_workers * 4))))
+        else:
+            _init_worker(shared.spec, ml_model, feature_store, func)
+            try:
+                results = [_symbol_task(i) for i in indexes]
+            finally:
+                _release_worker()
+    finally:
+        shared.close()
+
+    return [(shared.symbols[i], result) for i, result in zip(indexes, results)]
+
+
+def backtest_parallel(prices: pd.DataFrame, ml_model, feature_store: FeatureStore,
+                      symbols: Optional[Sequence[str]] = None, n_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Backtesting لكل الأسهم في prices بالتوازي (map_symbols مع backtest_symbol)
+
+    الصفقات نفسها وبنفس الترتيب مهما كان عدد العمليات
+    """
+    results = map_symbols(backtest_symbol, prices, ml_model, feature_store, symbols, n_workers)
+    return [trade for _, trades in results if trades for trade in trades]
+
+
+def score_parallel(prices: pd.DataFrame, ml_model, feature_store: FeatureStore,
+                   symbols: Optional[Sequence[str]] = None,
+                   n_workers: Optional[int] = None) -> List[Tuple[str, pd.DataFrame]]:
+    """تنبؤات كل الأسهم بالتوازي (map_symbols مع score_symbol) - الأسهم بدون تنبؤات تُحذف"""
+    results = map_symbols(score_symbol, prices, ml_model, feature_store, symbols, n_workers)
+    return [(symbol, scored) for symbol, scored in results if scored is not None]
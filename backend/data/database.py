@@ -57,8 +57,27 @@ class Database:
             self.connection.rollback()
             return False
     
-    def fetch_all(self, query: str, params: tuple = None) -> List[Dict]:
-        """جلب جميع النتائج"""
+    def execute_transaction(self, statements: List[tuple]):
+        """تنفيذ عدة استعلامات في معاملة واحدة (كلها أو لا شيء)"""
+        try:
+            for query, params in statements:
+                if params:
+                    self.cursor.execute(query, params)
+                else:
+                    self.cursor.execute(query)
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"❌ خطأ في تنفيذ المعاملة: {e}")
+            self.connection.rollback()
+            return False
+    
+    def fetch_all(self, query: str, params: tuple = None, raise_errors: bool = False) -> List[Dict]:
+        """
+        جلب جميع النتائج
+
+        raise_errors: إعادة رفع الخطأ بدلاً من [] (عندما تختلف "لا صفوف" عن "فشل الاستعلام")
+        """
         try:
             if params:
                 self.cursor.execute(query, params)
@@ -67,6 +86,8 @@ class Database:
             return self.cursor.fetchall()
         except Error as e:
             print(f"❌ خطأ في جلب البيانات: {e}")
+            if raise_errors:
+                raise
             return []
     
     def fetch_one(self, query: str, params: tuple = None) -> Optional[Dict]:
@@ -93,6 +114,14 @@ class Database:
         query = "SELECT * FROM stocks WHERE symbol = %s"
         return self.fetch_one(query, (symbol,))
     
+    def get_stocks_by_symbols(self, symbols: List[str]) -> List[Dict]:
+        """جلب عدة أسهم باستعلام واحد"""
+        if not symbols:
+            return []
+        placeholders = ", ".join(["%s"] * len(symbols))
+        query = f"SELECT * FROM stocks WHERE symbol IN ({placeholders})"
+        return self.fetch_all(query, tuple(symbols))
+    
     def insert_stock(self, symbol: str, name_ar: str, name_en: str, sector: str = None):
         """إضافة سهم جديد"""
         query = """
@@ -141,14 +170,58 @@ class Database:
         """
         return self.fetch_all(query, (symbol, limit))
     
-    def get_all_historical_data(self, days: int = 500) -> List[Dict]:
+    def get_historical_prices_batch(self, symbols: List[str], limit: int = 100) -> Dict[str, List[Dict]]:
+        """جلب آخر `limit` سعر تاريخي لعدة أسهم باستعلام واحد (الأحدث أولاً)"""
+        history = {symbol: [] for symbol in symbols}
+        if not symbols:
+            return history
+        
+        placeholders = ", ".join(["%s"] * len(symbols))
+        query = f"""
+        SELECT * FROM (
+            SELECT h.*,
+                   ROW_NUMBER() OVER (PARTITION BY h.symbol ORDER BY h.date DESC) AS rn
+            FROM historicalDailyPrices h
+            WHERE h.symbol IN ({placeholders})
+        ) ranked
+        WHERE rn <= %s
+        ORDER BY symbol, date DESC
+        """
+        for row in self.fetch_all(query, tuple(symbols) + (limit,)):
+            row.pop('rn', None)
+            history.setdefault(row['symbol'], []).append(row)
+        return history
+    
+    def get_all_historical_data(self, days: int = 500, raise_errors: bool = False) -> List[Dict]:
         """جلب جميع البيانات التاريخية"""
         query = """
         SELECT * FROM historicalDailyPrices
         WHERE date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
         ORDER BY symbol, date
         """
-        return self.fetch_all(query, (days,))
+        return self.fetch_all(query, (days,), raise_errors=raise_errors)
+    
+    def get_historical_data_since(self, since_date, raise_errors: bool = False) -> List[Dict]:
+        """جلب البيانات التاريخية بعد تاريخ معين (للتدريب التزايدي)"""
+        query = """
+        SELECT * FROM historicalDailyPrices
+        WHERE date > %s
+        ORDER BY symbol, date
+        """
+        return self.fetch_all(query, (since_date,), raise_errors=raise_errors)
+    
+    def get_historical_data_updated_since(self, since_timestamp, raise_errors: bool = False) -> List[Dict]:
+        """
+        جلب الصفوف المضافة أو المعدلة منذ وقت معين (يتطلب عمود updated_at)
+
+        >= لأن الوقت بدقة الثانية: صف عُدِّل في نفس ثانية آخر سحب لا يُفقد (التكرار يُدمج لاحقاً)
+        """
+        query = """
+        SELECT * FROM historicalDailyPrices
+        WHERE updated_at >= %s
+        ORDER BY symbol, date
+        """
+        return self.fetch_all(query, (since_timestamp,), raise_errors=raise_errors)
     
     # دوال خاصة بالتوصيات
     
@@ -0,0 +1,204 @@
+"""
+مخزن الميزات (Feature Store)
+
+يحسب المؤشرات الفنية مرة واحدة لكل شمعة جديدة ويحفظها بشكل عمودي
+(ملف npz مضغوط لكل سهم) مفهرسة بـ (symbol, date, feature-set version).
+الإصدار = بصمة تعريفات المؤشرات (indicators.py + indicator_state.py)
+فأي تعديل على طريقة الحساب ينشئ مجلداً جديداً تلقائياً بدلاً من خلط النتائج.
+
+التدريب والـ Backtesting والتوصيات اليومية تقرأ الصفوف المحسوبة مسبقاً
+بدلاً من إعادة حساب 500 يوم × جميع الأسهم في كل تشغيل.
+"""
+
+import hashlib
+import inspect
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from backend.models import indicators, indicator_state
+from backend.models.indicators import INDICATOR_COLUMNS
+from backend.models.indicator_state import IndicatorState
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _feature_set_version() -> str:
+    """بصمة تعريفات المؤشرات"""
+    digest = hashlib.sha1()
+    for module in (indicators, indicator_state):
+        digest.update(inspect.getsource(module).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+FEATURE_SET_VERSION = _feature_set_version()
+
+
+class FeatureStore:
+    """مخزن ميزات عمودي على القرص - ملف لكل سهم"""
+
+    def __init__(self, root: str = "/tmp/feature_store", version: str = FEATURE_SET_VERSION):
+        self.version = version
+        self.path = os.path.join(root, version)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _data_file(self, symbol: str) -> str:
+        return os.path.join(self.path, f"{symbol}.npz")
+
+    def _state_file(self, symbol: str) -> str:
+        return os.path.join(self.path, f"{symbol}.state.pkl")
+
+    # ==================== القراءة ====================
+
+    def load(self, symbol: str) -> Optional[pd.DataFrame]:
+        """قراءة كل الصفوف المحفوظة لسهم (date + OHLCV + الميزات)"""
+        data_file = self._data_file(symbol)
+        if not os.path.exists(data_file):
+            return None
+
+        with np.load(data_file) as data:
+            df = pd.DataFrame({col: data[col] for col in data.files})
+
+        df['date'] = df['date'].astype('datetime64[ns]')
+        df.insert(0, 'symbol', symbol)
+        return df
+
+    def load_many(self, symbols: List[str], start_date=None) -> pd.DataFrame:
+        """قراءة عدة أسهم في DataFrame واحد (مرتب حسب symbol ثم date)"""
+        frames = []
+        for symbol in symbols:
+            df = self.load(symbol)
+            if df is None:
+                continue
+            if start_date is not None:
+                df = df[df['date'] >= pd.Timestamp(start_date)]
+            frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=['symbol', 'date'] + PRICE_COLUMNS + INDICATOR_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def latest(self, symbol: str) -> Optional[Dict]:
+        """آخر صف محفوظ لسهم كـ dict"""
+        df = self.load(symbol)
+        if df is None or df.empty:
+            return None
+        return df.iloc[-1].to_dict()
+
+    # ==================== التحديث ====================
+
+    def update(self, symbol: str, prices: pd.DataFrame) -> pd.DataFrame:
+        """
+        حساب الميزات للشموع الأحدث من آخر تاريخ محفوظ فقط وحفظها
+
+        prices: DataFrame يحتوي date + OHLCV (بأي ترتيب)
+        - شموع أقدم من أول صف محفوظ: إعادة البناء من اتحاد المحفوظ و prices
+        - آخر شمعة محفوظة بقيم OHLCV جديدة (شمعة يوم جارٍ): تُعاد من الحالة قبلها
+        يرجع كل الصفوف المحفوظة للسهم بعد التحديث
+        """
+        prices = prices[['date'] + PRICE_COLUMNS].copy()
+        prices['date'] = pd.to_datetime(prices['date'])
+        prices = prices.sort_values('date')
+
+        stored = self.load(symbol)
+        state = self._load_state(symbol)
+        revised = False
+
+        if stored is not None and not stored.empty and state is not None \
+                and state.last_date == str(stored['date'].iloc[-1].date()) \
+                and prices['date'].iloc[0] <= stored['date'].iloc[-1]:
+            last_date = stored['date'].iloc[-1]
+            last_bar = prices[prices['date'] == last_date]
+
+            if prices['date'].iloc[0] < stored['date'].iloc[0]:
+                # شموع أقدم من المخزن: المؤشرات كلها تتغير
+                rebuild = True
+            elif not last_bar.empty and state.last_bar_changed(last_bar.iloc[-1]):
+                # بدون حالة قبل آخر شمعة (مخزن قديم) تلزم إعادة البناء
+                revised = self._revise_last(stored, state, last_bar.iloc[-1])
+                rebuild = not revised
+            else:
+                rebuild = False
+
+            if rebuild:
+                stored, state, new_prices = None, IndicatorState(), self._merge_prices(stored, prices)
+            else:
+                new_prices = prices[prices['date'] > last_date]
+        else:
+            # لا يوجد مخزن صالح أو توجد فجوة في البيانات - إعادة البناء
+            stored = None
+            state = IndicatorState()
+            new_prices = prices
+
+        if new_prices.empty:
+            if revised:
+                self._save(symbol, stored, state)
+            return stored
+
+        bars = new_prices.to_dict('records')
+        for bar in bars:
+            bar['date'] = bar['date'].date()
+        rows = state.update_many(bars)
+
+        new_rows = pd.concat([
+            new_prices.reset_index(drop=True).astype({col: float for col in PRICE_COLUMNS}),
+            pd.DataFrame(rows, columns=INDICATOR_COLUMNS)
+        ], axis=1)
+        new_rows.insert(0, 'symbol', symbol)
+
+        df = new_rows if stored is None else pd.concat([stored, new_rows], ignore_index=True)
+        self._save(symbol, df, state)
+        return df
+
+    @staticmethod
+    def _merge_prices(stored: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+        """اتحاد شموع المخزن و prices (prices أولى في نفس التاريخ) مرتب حسب التاريخ"""
+        merged = pd.concat([stored[['date'] + PRICE_COLUMNS], prices], ignore_index=True)
+        return merged.drop_duplicates('date', keep='last').sort_values('date').reset_index(drop=True)
+
+    @staticmethod
+    def _revise_last(stored: pd.DataFrame, state: IndicatorState, last_bar: pd.Series) -> bool:
+        """استبدال آخر صف محفوظ بالشمعة المعدلة (في stored و state) - False إذا تعذر"""
+        bar = last_bar.to_dict()
+        bar['date'] = bar['date'].date()
+        latest = state.revise(bar)
+        if latest is None:
+            return False
+        row = stored.index[-1]
+        for col in PRICE_COLUMNS:
+            stored.at[row, col] = float(bar[col])
+        for col in INDICATOR_COLUMNS:
+            stored.at[row, col] = latest[col]
+        return True
+
+    def update_latest(self, symbol: str, history: List[Dict]) -> Optional[Dict]:
+        """تحديث المخزن من history (كما ترجعه Database) وإرجاع آخر صف"""
+        if not history:
+            return None
+        df = self.update(symbol, pd.DataFrame(history))
+        return df.iloc[-1].to_dict() if df is not None and not df.empty else None
+
+    # ==================== الحفظ ====================
+
+    def _load_state(self, symbol: str) -> Optional[IndicatorState]:
+        state_file = self._state_file(symbol)
+        if not os.path.exists(state_file):
+            return None
+        return IndicatorState.from_dict(joblib.load(state_file))
+
+    def _save(self, symbol: str, df: pd.DataFrame, state: IndicatorState):
+        """حفظ ذري (ملف مؤقت ثم os.replace) للبيانات ثم الحالة"""
+        columns = {'date': df['date'].to_numpy(dtype='datetime64[D]')}
+        for col in PRICE_COLUMNS + INDICATOR_COLUMNS:
+            columns[col] = df[col].to_numpy()
+
+        data_file = self._data_file(symbol)
+        tmp_file = data_file + ".tmp.npz"
+        np.savez_compressed(tmp_file, **columns)
+        os.replace(tmp_file, data_file)
+
+        state_file = self._state_file(symbol)
+        joblib.dump(state.to_dict(), state_file + ".tmp")
+        os.replace(state_file + ".tmp", state_file)
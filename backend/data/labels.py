@@ -0,0 +1,154 @@
+"""
+أهداف التدريب (labels) لعدة مدد وعتبات في مرور واحد لكل سهم
+
+- forward_returns: عائد الإغلاق بعد h يوم لكل المدد من نافذة منزلقة واحدة (sliding_window_view)
+- threshold_labels: buy / hold / sell حسب ±عتبة على العائد (مثل create_target)
+- barrier_labels: الهدف قبل الوقف خلال المدة، بنفس قواعد Backtester و TradeEvaluator:
+  الدخول بإغلاق يوم الإشارة، الشموع التالية بالترتيب، والهدف أولاً إذا تحقق الاثنان في نفس الشمعة.
+  buy إذا بلغت صفقة الشراء هدفها قبل وقفها، sell لصفقة البيع، وإذا نجحت الاثنتان فالأسبق
+  (ونفس الشمعة = hold)
+
+الأهداف أكواد int8 بترتيب TARGET_LABELS، و-1 للصفوف التي تتجاوز مدتها آخر البيانات
+(pd.Categorical.from_codes يحولها إلى NaN).
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+TARGET_LABELS = ['buy', 'hold', 'sell']
+BUY, HOLD, SELL, MISSING = 0, 1, 2, -1
+
+
+def _pct(value: float) -> str:
+    """0.03 -> '3'، 0.015 -> '1p5' (لأسماء الأعمدة)"""
+    return f"{value * 100:g}".replace('.', 'p')
+
+
+def _forward_windows(values: np.ndarray, horizon: int) -> np.ndarray:
+    """(n, horizon): قيم الشموع t+1 .. t+horizon لكل صف (NaN بعد آخر البيانات) - view بدون نسخ"""
+    padded = np.concatenate([np.asarray(values, dtype=np.float64)[1:], np.full(horizon, np.nan)])
+    return sliding_window_view(padded, horizon)
+
+
+def _available(n: int, horizon: int) -> np.ndarray:
+    """الصفوف التي تتوفر لها horizon شمعة تالية كاملة"""
+    return np.arange(n) + horizon < n
+
+
+# ==================== العوائد والعتبات ====================
+
+def forward_returns(close: np.ndarray, horizons: Sequence[int]) -> np.ndarray:
+    """(n, len(horizons)): close[t+h] / close[t] - 1 (NaN في آخر h صف)"""
+    close = np.asarray(close, dtype=np.float64)
+    windows = _forward_windows(close, max(horizons))
+    return windows[:, [h - 1 for h in horizons]] / close[:, None] - 1
+
+
+def threshold_labels(returns: np.ndarray, threshold: float) -> np.ndarray:
+    """أكواد int8: buy فوق +threshold، sell تحت -threshold، hold بينهما، -1 للعائد المجهول"""
+    codes = np.full(returns.shape, HOLD, dtype=np.int8)
+    codes[returns > threshold] = BUY
+    codes[returns < -threshold] = SELL
+    codes[np.isnan(returns)] = MISSING
+    return codes
+
+
+# ==================== الهدف قبل الوقف ====================
+
+def _first_hit(reached: np.ndarray) -> np.ndarray:
+    """أول شمعة تحقق فيها المستوى (المسار تراكمي فيكفي عدّ الشموع قبله) - horizon إن لم يتحقق"""
+    return (~reached).sum(axis=1)
+
+
+def barrier_labels(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                   horizons: Sequence[int], barriers: Sequence[Tuple[float, float]]) -> Dict[Tuple, np.ndarray]:
+    """
+    أكواد int8 لكل (horizon, target, stop)
+
+    barriers: [(نسبة الهدف, نسبة الوقف)] مثل (0.04, 0.02) في Backtester
+    أعلى/أدنى سعر تراكمي يُحسب مرة واحدة لأطول مدة، وكل مدة أقصر مقطع منه
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n, max_horizon = len(close), max(horizons)
+    running_high = np.maximum.accumulate(_forward_windows(high, max_horizon), axis=1)
+    running_low = np.minimum.accumulate(_forward_windows(low, max_horizon), axis=1)
+
+    labels = {}
+    for horizon in horizons:
+        highs, lows = running_high[:, :horizon], running_low[:, :horizon]
+        for target, stop in barriers:
+            long_hit = _first_hit(highs >= (close * (1 + target))[:, None])
+            long_stop = _first_hit(lows <= (close * (1 - stop))[:, None])
+            short_hit = _first_hit(lows <= (close * (1 - target))[:, None])
+            short_stop = _first_hit(highs >= (close * (1 + stop))[:, None])
+
+            long_win = (long_hit < horizon) & (long_hit <= long_stop)
+            short_win = (short_hit < horizon) & (short_hit <= short_stop)
+
+            codes = np.full(n, HOLD, dtype=np.int8)
+            codes[long_win & (~short_win | (long_hit < short_hit))] = BUY
+            codes[short_win & (~long_win | (short_hit < long_hit))] = SELL
+            codes[~_available(n, horizon)] = MISSING
+            labels[(horizon, target, stop)] = codes
+    return labels
+
+
+# ==================== الشبكة ====================
+
+class LabelGrid:
+    """
+    شبكة أهداف تُحسب معاً لكل سهم وتُخزن مع بيانات التدريب
+
+    الأعمدة:
+        return_<h>d            العائد (float32)
+        target_<h>d_<pct>      buy/hold/sell حسب ±pct% (category بأكواد int8)
+        path_<h>d_<tp>_<sl>    الهدف tp% قبل الوقف sl% (category بأكواد int8)
+    """
+
+    def __init__(self, horizons: Sequence[int] = (5,), thresholds: Sequence[float] = (0.03,),
+                 barriers: Sequence[Tuple[float, float]] = ((0.04, 0.02),)):
+        self.horizons = sorted(set(int(h) for h in horizons))
+        self.thresholds = list(thresholds)
+        self.barriers = [tuple(b) for b in barriers]
+
+    def return_columns(self) -> List[str]:
+        return [f"return_{h}d" for h in self.horizons]
+
+    def label_columns(self) -> List[str]:
+        return ([f"target_{h}d_{_pct(t)}" for h in self.horizons for t in self.thresholds] +
+                [f"path_{h}d_{_pct(tp)}_{_pct(sl)}" for h in self.horizons for tp, sl in self.barriers])
+
+    def horizon(self, column: str) -> int:
+        """مدة العمود بالأيام (لـ purge في التقسيم الزمني)"""
+        return int(column.split('_')[1][:-1])
+
+    def compute(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """كل الأعمدة لسهم واحد مرتب حسب التاريخ"""
+        close = df['close'].to_numpy(dtype=np.float64)
+        returns = forward_returns(close, self.horizons)
+
+        columns = {name: returns[:, i].astype(np.float32) for i, name in enumerate(self.return_columns())}
+        for i, h in enumerate(self.horizons):
+            for t in self.thresholds:
+                columns[f"target_{h}d_{_pct(t)}"] = threshold_labels(returns[:, i], t)
+        if self.barriers:
+            paths = barrier_labels(close, df['high'].to_numpy(), df['low'].to_numpy(),
+                                   self.horizons, self.barriers)
+            for (h, tp, sl), codes in paths.items():
+                columns[f"path_{h}d_{_pct(tp)}_{_pct(sl)}"] = codes
+        return columns
+
+
+def create_target(df: pd.DataFrame, horizon: int = 5, threshold: float = 0.03) -> pd.DataFrame:
+    """
+    الهدف الافتراضي للتدريب: buy / sell إذا تجاوز عائد 5 أيام ±3%، وإلا hold
+
+    يضيف future_return و target (category؛ NaN لآخر horizon صف)
+    """
+    returns = forward_returns(df['close'].to_numpy(dtype=np.float64), [horizon])[:, 0]
+    df['future_return'] = returns
+    df['target'] = pd.Categorical.from_codes(threshold_labels(returns, threshold), TARGET_LABELS)
+    return df
@@ -0,0 +1,146 @@
+"""
+نسخة محلية من الأسعار التاريخية (Price Snapshot) مع تحميل التغييرات فقط
+
+أول تشغيل يجلب كامل الفترة من قاعدة البيانات ويحفظها بشكل عمودي مضغوط
+(/tmp/price_snapshot/prices.npz) مع manifest.json (آخر تاريخ لكل سهم + وقت آخر سحب).
+التشغيلات التالية تجلب فقط:
+- الصفوف المعدلة أو المضافة بعد آخر سحب (عمود updated_at إن وُجد)
+- أو الصفوف من آخر تاريخ في الـ manifest فما بعد (يشمل إعادة آخر يوم لأنه قد يُحدَّث خلال اليوم)
+ثم تُدمج مع النسخة المحلية (الأحدث يستبدل القديم لنفس symbol/date).
+الاستعلامات ترفع الخطأ بدلاً من إرجاع [] فلا يتقدم وقت آخر سحب إلا بعد جلب ناجح.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+SNAPSHOT_DIR = "/tmp/price_snapshot"
+
+
+class PriceSnapshot:
+    """نسخة محلية عمودية من historicalDailyPrices"""
+
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def data_file(self) -> str:
+        return os.path.join(self.root, "prices.npz")
+
+    @property
+    def manifest_file(self) -> str:
+        return os.path.join(self.root, "manifest.json")
+
+    # ==================== القراءة ====================
+
+    def manifest(self) -> Optional[Dict]:
+        if not (os.path.exists(self.manifest_file) and os.path.exists(self.data_file)):
+            return None
+        with open(self.manifest_file) as f:
+            return json.load(f)
+
+    def read(self) -> Optional[pd.DataFrame]:
+        """النسخة المحلية كـ DataFrame (symbol category, date datetime64, OHLCV float64)"""
+        if self.manifest() is None:
+            return None
+        with np.load(self.data_file) as data:
+            df = pd.DataFrame({col: data[col] for col in PRICE_COLUMNS})
+            df.insert(0, 'symbol', pd.Categorical.from_codes(data['symbol_codes'], categories=data['symbols']))
+            df.insert(1, 'date', data['date'].astype('datetime64[ns]'))
+        return df
+
+    # ==================== التحميل ====================
+
+    def load_prices(self, db, days: int = 500) -> pd.DataFrame:
+        """
+        أسعار آخر `days` يوم لكل الأسهم - من النسخة المحلية + التغييرات فقط
+
+        db: كائن Database
+        فشل أي استعلام يرفع الخطأ ويترك النسخة المحلية والـ manifest كما هما
+        """
+        manifest = self.manifest()
+        server_now = db.fetch_one("SELECT NOW() AS now")['now']
+        window_start = pd.Timestamp(server_now.date() - timedelta(days=days))
+
+        if manifest is None or manifest.get('days') != days or not manifest.get('max_dates'):
+            print("📥 جلب كامل للأسعار التاريخية (لا توجد نسخة محلية)...")
+            rows = db.get_all_historical_data(days=days, raise_errors=True)
+            df = self._to_frame(rows)
+            mode = 'full'
+        else:
+            if manifest.get('has_updated_at'):
+                rows = db.get_historical_data_updated_since(manifest['pulled_at'], raise_errors=True)
+            else:
+                # بدون updated_at: كل ما بعد أقدم "آخر تاريخ" في الـ manifest (مع إعادة آخر يوم)
+                since = min(manifest['max_dates'].values())
+                rows = db.get_historical_data_since(pd.Timestamp(since).date() - timedelta(days=1),
+                                                    raise_errors=True)
+            delta = self._to_frame(rows)
+            df = self._merge(self.read(), delta)
+            mode = f"delta ({len(delta)} صف)"
+
+        df = df[df['date'] >= window_start].reset_index(drop=True)
+        df['symbol'] = df['symbol'].cat.remove_unused_categories()
+        self._save(df, {
+            'days': days,
+            'pulled_at': str(server_now),
+            'has_updated_at': self._has_updated_at(db),
+            'max_dates': {str(symbol): str(date.date()) for symbol, date in
+                          df.groupby('symbol', observed=True)['date'].max().items()},
+            'rows': len(df),
+            'saved_at': datetime.now().isoformat()
+        })
+        print(f"✅ الأسعار: {len(df)} صف من {df['symbol'].nunique()} سهم [{mode}]")
+        return df
+
+    @staticmethod
+    def _has_updated_at(db) -> bool:
+        return bool(db.fetch_all("SHOW COLUMNS FROM historicalDailyPrices LIKE 'updated_at'", raise_errors=True))
+
+    @staticmethod
+    def _to_frame(rows) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=['symbol', 'date'] + PRICE_COLUMNS)
+        df['symbol'] = df['symbol'].astype(str).astype('category')
+        df['date'] = pd.to_datetime(df['date'])
+        for col in PRICE_COLUMNS:
+            df[col] = df[col].astype(float)
+        return df
+
+    @staticmethod
+    def _merge(snapshot: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+        """الصفوف الجديدة تستبدل القديمة لنفس (symbol, date)"""
+        if delta.empty:
+            return snapshot
+        symbols = pd.api.types.union_categoricals(
+            [snapshot['symbol'], delta['symbol']], sort_categories=True
+        ).categories
+        frames = []
+        for df in (snapshot, delta):
+            df = df.copy()
+            df['symbol'] = df['symbol'].cat.set_categories(symbols)
+            frames.append(df)
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.drop_duplicates(['symbol', 'date'], keep='last')
+        return merged.sort_values(['symbol', 'date'], kind='stable').reset_index(drop=True)
+
+    def _save(self, df: pd.DataFrame, manifest: Dict):
+        """حفظ ذري: البيانات ثم الـ manifest"""
+        tmp_file = self.data_file + ".tmp.npz"
+        np.savez_compressed(
+            tmp_file,
+            symbols=np.asarray(df['symbol'].cat.categories, dtype=str),
+            symbol_codes=df['symbol'].cat.codes.to_numpy(),
+            date=df['date'].to_numpy(dtype='datetime64[D]'),
+            **{col: df[col].to_numpy(dtype=float) for col in PRICE_COLUMNS}
+        )
+        os.replace(tmp_file, self.data_file)
+
+        with open(self.manifest_file + ".tmp", 'w') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(self.manifest_file + ".tmp", self.manifest_file)
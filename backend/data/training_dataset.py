@@ -0,0 +1,147 @@
+"""
+بناء بيانات التدريب بتمثيل مضغوط في الذاكرة
+
+- الميزات والأسعار float32 في مصفوفة واحدة محجوزة مسبقاً (بدلاً من pd.concat لنسخ float64)
+- symbol و target من نوع category (أكواد int بدلاً من نصوص object)
+- date من نوع datetime64 بدلاً من كائنات date في Python
+- ترتيب واحد حسب (symbol, date) وتقطيع بالإزاحات، مع معالجة الأسهم بالتوازي اختيارياً
+- أهداف إضافية اختيارية لعدة مدد وعتبات (LabelGrid) كأعمدة int8 بجانب target
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.data.feature_store import FeatureStore, PRICE_COLUMNS
+from backend.data.labels import TARGET_LABELS, LabelGrid
+from backend.models.indicators import INDICATOR_COLUMNS
+
+DATASET_COLUMNS = PRICE_COLUMNS + INDICATOR_COLUMNS + ['future_return']
+
+
+def compact_prices(data: List[dict]) -> pd.DataFrame:
+    """
+    تحويل صفوف قاعدة البيانات إلى DataFrame مضغوط
+
+    Decimal -> float64 (تبقى أسعار الإدخال بدقة كاملة لحساب المؤشرات)
+    symbol -> category، date -> datetime64
+    """
+    df = pd.DataFrame(data, columns=['symbol', 'date'] + PRICE_COLUMNS)
+    df['symbol'] = df['symbol'].astype('category')
+    df['date'] = pd.to_datetime(df['date'])
+    for col in PRICE_COLUMNS:
+        df[col] = df[col].astype(float)
+    return df
+
+
+def _symbol_rows(symbol: str, stock_df: pd.DataFrame, target_func: Callable, store: FeatureStore,
+                 label_grid: Optional[LabelGrid] = None):
+    """ميزات وهدف سهم واحد - الصفوف الكاملة فقط (float32, datetime64, target codes, أعمدة الشبكة)"""
+    start_date = stock_df['date'].iloc[0]
+
+    # قراءة/تحديث الميزات من المخزن وحصرها في فترة التدريب
+    stock_df = store.update(symbol, stock_df)
+    stock_df = stock_df[stock_df['date'] >= start_date].copy()
+    stock_df = target_func(stock_df)
+
+    values = stock_df[DATASET_COLUMNS].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values).any(axis=1)
+    target_codes = pd.Categorical(stock_df['target'].to_numpy()[valid], categories=TARGET_LABELS).codes
+
+    # الشبكة على كل صفوف السهم (المدد الأطول تحتاج الشموع بعد آخر صف كامل)
+    labels = {name: column[valid] for name, column in label_grid.compute(stock_df).items()} if label_grid else {}
+
+    return values[valid].astype(np.float32), stock_df['date'].to_numpy()[valid], target_codes, labels
+
+
+def _symbol_rows_task(args):
+    return _symbol_rows(*args)
+
+
+def group_by_symbol(prices: pd.DataFrame):
+    """
+    ترتيب واحد حسب (symbol, date) ثم تقطيع بالإزاحات بدلاً من
+    df[df['symbol'] == symbol] لكل سهم (مسح كامل للجدول لكل سهم)
+    """
+    prices = prices.sort_values(['symbol', 'date'], kind='stable')
+    codes = pd.factorize(prices['symbol'], sort=False)[0]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.r_[0, bounds]
+    ends = np.r_[bounds, len(prices)]
+    symbol_values = prices['symbol'].to_numpy()
+    return [(str(symbol_values[start]), prices.iloc[start:end]) for start, end in zip(starts, ends)]
+
+
+def _grow(array: np.ndarray, capacity: int, n_rows: int) -> np.ndarray:
+    """نسخ أول n_rows صف إلى مصفوفة أكبر بنفس النوع"""
+    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:n_rows] = array[:n_rows]
+    return grown
+
+
+def build_training_dataset(prices: pd.DataFrame, target_func: Callable[[pd.DataFrame], pd.DataFrame],
+                           store: Optional[FeatureStore] = None, n_jobs: int = 1,
+                           label_grid: Optional[LabelGrid] = None) -> pd.DataFrame:
+    """
+    بناء بيانات التدريب لكل الأسهم
+
+    prices: DataFrame (symbol, date, OHLCV) كما ترجعه compact_prices
+    target_func: دالة create_target في سكربت التدريب (تضيف future_return و target)
+    n_jobs: عدد العمليات لمعالجة الأسهم بالتوازي (-1 = كل الأنوية)
+    label_grid: أهداف إضافية (return_* float32 و target_* / path_* category بأكواد int8)
+    الصفوف التي تحتوي NaN تُحذف (مثل dropna() سابقاً)، وأهداف الشبكة التي تتجاوز مدتها
+    آخر البيانات تبقى NaN
+    """
+    store = store or FeatureStore()
+    groups = group_by_symbol(prices)
+    tasks = [(symbol, stock_df, target_func, store, label_grid) for symbol, stock_df in groups]
+
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = executor.map(_symbol_rows_task, tasks, chunksize=max(1, len(tasks) // (n_jobs * 4)))
+    else:
+        results = map(_symbol_rows_task, tasks)
+
+    # السعة المبدئية = عدد صفوف الأسعار (كل صف تدريب يقابل شمعة في فترة التدريب عادةً)،
+    # لكن المخزن قد يرجع شموعاً محفوظة أقدم من المدخلات فتُوسَّع المصفوفات عند الحاجة
+    capacity = len(prices)
+    matrix = np.empty((capacity, len(DATASET_COLUMNS)), dtype=np.float32)
+    dates = np.empty(capacity, dtype='datetime64[ns]')
+    symbol_codes = np.empty(capacity, dtype=np.int32)
+    target_codes = np.empty(capacity, dtype=np.int8)
+    grid_columns = {}
+    if label_grid is not None:
+        grid_columns.update({name: np.empty(capacity, dtype=np.float32) for name in label_grid.return_columns()})
+        grid_columns.update({name: np.empty(capacity, dtype=np.int8) for name in label_grid.label_columns()})
+
+    symbols = [symbol for symbol, _ in groups]
+    n_rows = 0
+
+    for code, (values, symbol_dates, symbol_targets, labels) in enumerate(results):
+        end = n_rows + len(values)
+        if end > capacity:
+            capacity = max(end, capacity * 2)
+            matrix, dates, symbol_codes, target_codes = (
+                _grow(array, capacity, n_rows) for array in (matrix, dates, symbol_codes, target_codes))
+            grid_columns = {name: _grow(column, capacity, n_rows) for name, column in grid_columns.items()}
+        matrix[n_rows:end] = values
+        dates[n_rows:end] = symbol_dates
+        symbol_codes[n_rows:end] = code
+        target_codes[n_rows:end] = symbol_targets
+        for name, column in labels.items():
+            grid_columns[name][n_rows:end] = column
+        n_rows = end
+
+    # DataFrame فوق المصفوفة المحجوزة دون نسخ (الجزء المستخدم فقط)
+    dataset = pd.DataFrame(matrix[:n_rows], columns=DATASET_COLUMNS, copy=False)
+    dataset.insert(0, 'symbol', pd.Categorical.from_codes(symbol_codes[:n_rows], categories=symbols))
+    dataset.insert(1, 'date', dates[:n_rows])
+    dataset['target'] = pd.Categorical.from_codes(target_codes[:n_rows], categories=TARGET_LABELS)
+    for name, column in grid_columns.items():
+        dataset[name] = (column[:n_rows] if column.dtype == np.float32
+                         else pd.Categorical.from_codes(column[:n_rows], categories=TARGET_LABELS))
+    return dataset
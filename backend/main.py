@@ -4,8 +4,12 @@ FastAPI Backend لمستشار الأسهم السعودية
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import threading
+import time
 import sys
 
 import os
@@ -13,8 +17,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
-from backend.data.database import Database
-from backend.models.ml_model import StockMLModel
+# ملاحظة: Database و StockMLModel يُستوردان داخل warm_up فقط
+# حتى لا يُحمَّل pandas/numpy/sklearn/mysql عند استيراد التطبيق
 
 # إنشاء التطبيق
 app = FastAPI(
@@ -35,29 +39,120 @@ app.add_middleware(
 # المتغيرات العامة
 db = None
 ml_model = None
+model_registry = None
 
-@app.on_event("startup")
-async def startup_event():
-    """تشغيل عند بدء التطبيق"""
-    global db, ml_model
+# فترة مراقبة سجل النماذج بالثواني (0 = تعطيل، التحديث عبر /api/model/reload فقط)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "30"))
+
+# حالة تحميل النموذج: idle -> loading -> idle (أو failed)
+model_reload = {
+    "status": "idle",
+    "version": None,
+    "loaded_at": None,
+    "error": None
+}
+model_reload_lock = threading.Lock()
+_watched_mtime = None
+
+# حالة الجاهزية: warming -> ready (أو failed إذا تعذر الاتصال بقاعدة البيانات)
+readiness = {
+    "status": "warming",
+    "started_at": None,
+    "ready_at": None,
+    "warm_up_seconds": None,
+    "error": None
+}
+
+def warm_up():
+    """الاتصال بقاعدة البيانات وتحميل نموذج ML (يعمل في الخلفية)"""
+    global db, model_registry, trade_evaluator
+    
+    started = time.perf_counter()
     
     try:
         # الاتصال بقاعدة البيانات
+        from backend.data.database import Database
+        from backend.trade_evaluator import TradeEvaluator
+        
         db = Database()
         print("✅ تم الاتصال بقاعدة البيانات")
         
-        # تحميل نموذج ML
-        try:
-            ml_model = StockMLModel()
-            ml_model.load_model()
-            print("✅ تم تحميل نموذج ML")
-        except Exception as e:
-            print(f"⚠️  لم يتم تحميل نموذج ML: {e}")
-            ml_model = None
-            
+        trade_evaluator = TradeEvaluator(db)
+        print("✅ تم تهيئة نظام تقييم الصفقات")
     except Exception as e:
         print(f"❌ خطأ في بدء التطبيق: {e}")
-        raise
+        readiness["status"] = "failed"
+        readiness["error"] = str(e)
+        return
+    
+    # تحميل نموذج ML
+    try:
+        from backend.models.model_registry import ModelRegistry
+        
+        model_registry = ModelRegistry()
+    except Exception as e:
+        print(f"⚠️  تعذر فتح سجل النماذج: {e}")
+    
+    if model_registry is not None:
+        load_model_version()
+    
+    readiness["status"] = "ready"
+    readiness["ready_at"] = datetime.now().isoformat()
+    readiness["warm_up_seconds"] = round(time.perf_counter() - started, 3)
+
+def load_model_version(version: Optional[str] = None) -> bool:
+    """
+    تحميل إصدار من سجل النماذج ثم استبدال النموذج الحالي ذرياً
+    
+    الطلبات الجارية تحتفظ بمرجع للنموذج القديم حتى تنتهي.
+    يرجع False إذا كان هناك تحميل آخر قيد التنفيذ.
+    """
+    if not model_reload_lock.acquire(blocking=False):
+        return False
+    
+    model_reload["status"] = "loading"
+    _load_model_locked(version)
+    return True
+
+def _load_model_locked(version: Optional[str] = None):
+    """التحميل الفعلي - يُستدعى و model_reload_lock محجوز ويحرره في النهاية"""
+    global ml_model, _watched_mtime
+    
+    try:
+        _watched_mtime = model_registry.current_mtime()
+        
+        from backend.models.prediction_cache import PredictionCache, PREDICTION_CACHE_DIR
+        
+        model = model_registry.load(version, prediction_cache=PredictionCache(disk_path=PREDICTION_CACHE_DIR))
+        if not model.model:
+            raise FileNotFoundError("No trained model found")
+        
+        ml_model = model
+        model_reload.update(status="idle", version=model.version,
+                            loaded_at=datetime.now().isoformat(), error=None)
+        print(f"✅ تم تحميل نموذج ML (الإصدار: {model.version or 'legacy'})")
+    except Exception as e:
+        print(f"⚠️  لم يتم تحميل نموذج ML: {e}")
+        model_reload.update(status="failed", error=str(e))
+    finally:
+        model_reload_lock.release()
+
+async def watch_model_registry():
+    """مراقبة CURRENT في سجل النماذج وتحميل الإصدار الجديد عند تغيّره"""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        if model_registry is None or model_reload["status"] == "loading":
+            continue
+        if model_registry.current_mtime() != _watched_mtime:
+            await asyncio.get_running_loop().run_in_executor(None, load_model_version)
+
+@app.on_event("startup")
+async def startup_event():
+    """تشغيل عند بدء التطبيق - يبدأ التهيئة في الخلفية دون انتظارها"""
+    readiness["started_at"] = datetime.now().isoformat()
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+    if MODEL_WATCH_INTERVAL > 0:
+        asyncio.create_task(watch_model_registry())
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -83,17 +178,29 @@ async def health_check():
     """فحص صحة النظام"""
     return {
         "status": "healthy",
+        "readiness": readiness["status"],
         "database": "connected" if db else "disconnected",
         "model": "loaded" if ml_model and ml_model.model else "not loaded",
+        "model_version": ml_model.version if ml_model else None,
+        "warm_up_seconds": readiness["warm_up_seconds"],
+        "error": readiness["error"],
         "timestamp": datetime.now().isoformat()
     }
 
+def require_db():
+    """التحقق من جاهزية قاعدة البيانات"""
+    if not db:
+        detail = "Database not connected" if readiness["status"] == "failed" else "Service warming up"
+        raise HTTPException(status_code=503, detail=detail)
+
 @app.get("/api/stocks")
 async def get_stocks(
     limit: int = Query(100, ge=1, le=500),
     sector: Optional[str] = None
 ):
     """جلب قائمة الأسهم"""
+    require_db()
+    
     try:
         if sector:
             query = "SELECT * FROM stocks WHERE isActive = 1 AND sector = %s ORDER BY symbol LIMIT %s"
@@ -109,9 +216,43 @@ async def get_stocks(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class BatchStocksRequest(BaseModel):
+    """طلب جلب عدة أسهم دفعة واحدة"""
+    symbols: List[str] = Field(..., min_length=1, max_length=100)
+    limit: int = Field(90, ge=1, le=500)
+
+@app.post("/api/stocks/batch")
+async def get_stocks_batch(request: BatchStocksRequest):
+    """جلب معلومات وأسعار عدة أسهم باستعلامين فقط"""
+    require_db()
+    
+    try:
+        # إزالة التكرار مع الحفاظ على الترتيب
+        symbols = list(dict.fromkeys(request.symbols))
+        
+        stocks = {stock['symbol']: stock for stock in db.get_stocks_by_symbols(symbols)}
+        found = [symbol for symbol in symbols if symbol in stocks]
+        histories = db.get_historical_prices_batch(found, limit=request.limit)
+        
+        return {
+            "count": len(found),
+            "stocks": {
+                symbol: {
+                    "stock": stocks[symbol],
+                    "history": histories.get(symbol, [])
+                }
+                for symbol in found
+            },
+            "not_found": [symbol for symbol in symbols if symbol not in stocks]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/stocks/{symbol}")
 async def get_stock(symbol: str):
     """جلب معلومات سهم محدد"""
+    require_db()
+    
     try:
         stock = db.get_stock_by_symbol(symbol)
         if not stock:
@@ -132,6 +273,8 @@ async def get_stock(symbol: str):
 @app.get("/api/recommendations")
 async def get_recommendations(limit: int = Query(50, ge=1, le=200)):
     """جلب التوصيات النشطة"""
+    require_db()
+    
     try:
         recommendations = db.get_active_recommendations(limit)
         return {
@@ -144,8 +287,15 @@ async def get_recommendations(limit: int = Query(50, ge=1, le=200)):
 @app.post("/api/recommendations/generate")
 async def generate_recommendations(limit: int = Query(20, ge=1, le=100)):
     """توليد توصيات جديدة باستخدام ML"""
+    require_db()
+    
+    # مرجع ثابت للنموذج طوال الطلب (لا يتأثر باستبدال النموذج أثناء التنفيذ)
+    model = ml_model
+    
     try:
-        if not ml_model or not ml_model.model:
+        if not model or not model.model:
+            if readiness["status"] == "warming":
+                raise HTTPException(status_code=503, detail="ML model warming up")
             raise HTTPException(
                 status_code=503,
                 detail="ML model not loaded. Please train the model first."
@@ -168,7 +318,7 @@ async def generate_recommendations(limit: int = Query(20, ge=1, le=100)):
                     continue
                 
                 # توليد توصية
-                recommendation = ml_model.generate_recommendation(symbol, history)
+                recommendation = model.generate_recommendation(symbol, history)
                 
                 if recommendation:
                     # حفظ التوصية
@@ -198,9 +348,61 @@ async def generate_recommendations(limit: int = Query(20, ge=1, le=100)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/model")
+async def get_model_info():
+    """معلومات النموذج الحالي والإصدارات المتاحة"""
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Service warming up")
+    
+    model = ml_model
+    return {
+        "version": model.version if model else None,
+        "metadata": model.metadata if model else None,
+        "active_version": model_registry.current_version(),
+        "versions": model_registry.list_versions(),
+        "reload": model_reload,
+        "prediction_cache": model.prediction_cache.stats() if model else None
+    }
+
+@app.post("/api/model/reload", status_code=202)
+async def reload_model(version: Optional[str] = None):
+    """
+    تحميل النموذج الفعّال (أو تفعيل إصدار محدد) في الخلفية
+    
+    يستمر تقديم الطلبات بالنموذج الحالي حتى يكتمل التحميل.
+    القفل يُحجز قبل التفعيل ويحرره التحميل في الخلفية، فطلبان متزامنان لا يفعّلان
+    إصدارين والرد 202 يعني أن التحميل سيُنفذ فعلاً.
+    """
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Service warming up")
+    if not model_reload_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Model reload already in progress")
+    
+    previous_status = model_reload["status"]
+    model_reload["status"] = "loading"
+    started = False
+    try:
+        if version:
+            model_registry.activate(version)
+        asyncio.get_running_loop().run_in_executor(None, _load_model_locked)
+        started = True
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    finally:
+        if not started:
+            model_reload["status"] = previous_status
+            model_reload_lock.release()
+    
+    return {
+        "status": "loading",
+        "version": version or model_registry.current_version()
+    }
+
 @app.get("/api/market-summary")
 async def get_market_summary():
     """جلب ملخص السوق"""
+    require_db()
+    
     try:
         query = "SELECT * FROM marketSummary ORDER BY lastUpdate DESC LIMIT 1"
         summary = db.fetch_one(query)
@@ -218,6 +420,8 @@ async def get_market_summary():
 @app.get("/api/sectors")
 async def get_sectors():
     """جلب قائمة القطاعات"""
+    require_db()
+    
     try:
         query = """
         SELECT sector, COUNT(*) as count, 
@@ -238,19 +442,9 @@ async def get_sectors():
 
 # ==================== Trade Evaluation Endpoints ====================
 
-from backend.trade_evaluator import TradeEvaluator
-
-# Initialize Trade Evaluator
+# Trade Evaluator (يُهيَّأ داخل warm_up بعد الاتصال بقاعدة البيانات)
 trade_evaluator = None
 
-@app.on_event("startup")
-async def init_trade_evaluator():
-    """تهيئة نظام تقييم الصفقات"""
-    global trade_evaluator
-    if db:
-        trade_evaluator = TradeEvaluator(db)
-        print("✅ تم تهيئة نظام تقييم الصفقات")
-
 @app.post("/api/trades/evaluate")
 async def evaluate_trades():
     """تقييم جميع الصفقات المفتوحة"""
@@ -261,10 +455,13 @@ async def evaluate_trades():
         results = trade_evaluator.evaluate_open_trades()
         
         return {
-            "status": "success",
-            "message": f"تم تقييم {results['total']} صفقة",
+            "status": "success" if not results['failed'] else "partial",
+            "message": f"تم تقييم {results['total']} صفقة" + (
+                f" (تعذر حفظ {results['failed']})" if results['failed'] else ""),
             "results": results
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -281,6 +478,8 @@ async def get_trades_history(limit: int = Query(100, ge=1, le=500)):
             "count": len(trades),
             "trades": trades
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -316,54 +515,16 @@ async def get_stats():
 
 @app.get("/api/trades/performance")
 async def get_overall_performance():
-    """جلب الأداء الإجمالي"""
+    """جلب الأداء الإجمالي (قراءة صف واحد من trade_performance_summary)"""
     try:
-        if not db:
-            raise HTTPException(status_code=503, detail="Database not connected")
-        
-        query = """
-        SELECT 
-            COUNT(*) as total_trades,
-            SUM(CASE WHEN status = 'target_hit' THEN 1 ELSE 0 END) as successful,
-            SUM(CASE WHEN status = 'stop_loss_hit' THEN 1 ELSE 0 END) as failed,
-            SUM(CASE WHEN status = 'closed_neutral' THEN 1 ELSE 0 END) as neutral,
-            AVG(profit_loss_percent) as avg_return,
-            SUM(profit_loss) as total_profit_loss,
-            MAX(profit_loss_percent) as best_trade,
-            MIN(profit_loss_percent) as worst_trade
-        FROM trade_performance
-        """
-        
-        result = db.fetch_all(query)
+        require_db()
         
-        if result and len(result) > 0:
-            stats = result[0]
-            total = int(stats['total_trades']) if stats['total_trades'] else 0
-            successful = int(stats['successful']) if stats['successful'] else 0
-            
-            return {
-                "total_trades": total,
-                "successful_trades": successful,
-                "failed_trades": int(stats['failed']) if stats['failed'] else 0,
-                "neutral_trades": int(stats['neutral']) if stats['neutral'] else 0,
-                "success_rate": round((successful / total) * 100, 2) if total > 0 else 0.0,
-                "avg_return": float(stats['avg_return']) if stats['avg_return'] else 0.0,
-                "total_profit_loss": float(stats['total_profit_loss']) if stats['total_profit_loss'] else 0.0,
-                "best_trade": float(stats['best_trade']) if stats['best_trade'] else 0.0,
-                "worst_trade": float(stats['worst_trade']) if stats['worst_trade'] else 0.0
-            }
+        if not trade_evaluator:
+            raise HTTPException(status_code=503, detail="Trade evaluator not initialized")
         
-        return {
-            "total_trades": 0,
-            "successful_trades": 0,
-            "failed_trades": 0,
-            "neutral_trades": 0,
-            "success_rate": 0.0,
-            "avg_return": 0.0,
-            "total_profit_loss": 0.0,
-            "best_trade": 0.0,
-            "worst_trade": 0.0
-        }
+        return trade_evaluator.get_overall_performance()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
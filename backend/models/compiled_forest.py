@@ -0,0 +1,323 @@
+"""
+تقييم مُجمَّع (compiled) لنماذج الأشجار
+
+يحوّل أشجار RandomForest / LightGBM / VotingClassifier(soft) المدربة إلى
+مصفوفات NumPy متصلة (feature, threshold, left, right, leaf values) ويقيّم كل
+الأشجار معاً خطوة عمق واحدة في كل مرة، بدون حمل predict_proba في sklearn
+(التحقق من المدخلات، joblib threads، ...). الاحتمالات تطابق النموذج الأصلي
+(فروق تقريب float64 فقط).
+
+مناسب للتنبؤ بزمن استجابة منخفض (صف واحد أو دفعات صغيرة). الدفعات الكبيرة
+تبقى أسرع في تنفيذ C الأصلي (انظر COMPILED_MAX_ROWS و CompiledForest.max_rows).
+"""
+
+import os
+import numpy as np
+from typing import Dict, List, Optional
+
+# أنواع القيم المفقودة (كما في LightGBM)
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_ZERO_THRESHOLD = 1e-35
+
+# أقصى عدد صفوف يكون فيه المُجمَّع أسرع من predict_proba الأصلي (benchmark_inference.py):
+# RF (200 شجرة) 1.3x عند 128 صف، أما LightGBM فأبطأ من 32 صف (0.8x) لأن تنفيذه الأصلي خفيف،
+# و Voting (RF + LGBM) 1.6x عند 64 صف ويتعادل عند 128
+COMPILED_MAX_ROWS = {'forest': 128, 'boosting': 16, 'mixed': 64}
+
+
+class TreeBlock:
+    """
+    مجموعة أشجار مسطحة في مصفوفات متصلة
+
+    الأوراق تشير إلى نفسها (left = right = self) فيكفي تكرار خطوة الانتقال
+    max_depth مرة لكل الأشجار والصفوف دفعة واحدة.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, missing_type,
+                 values, roots, tree_class, max_depth, float32_inputs):
+        self.feature = feature              # int32 [n_nodes]
+        self.threshold = threshold          # float64 [n_nodes]
+        self.left = left                    # int32 [n_nodes] (فهارس عامة)
+        self.right = right                  # int32 [n_nodes]
+        self.default_left = default_left    # bool [n_nodes]
+        self.missing_type = missing_type    # int8 [n_nodes]
+        self.values = values                # float64 [n_nodes, n_outputs]
+        self.roots = roots                  # int32 [n_trees]
+        self.tree_class = tree_class        # int32 [n_trees] (-1 = كل الفئات)
+        self.max_depth = max_depth
+        self.float32_inputs = float32_inputs
+        self.has_missing = bool((missing_type != MISSING_NONE).any())
+        self.has_zero_missing = bool((missing_type == MISSING_ZERO).any())
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """فهارس الأوراق [n_trees, n_rows]"""
+        if self.float32_inputs:
+            # sklearn يحوّل المدخلات إلى float32 قبل المقارنة
+            X = X.astype(np.float32).astype(np.float64)
+
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[None, :]
+        idx = np.repeat(self.roots[:, None], n_rows, axis=1)
+        check_missing = self.has_missing and np.isnan(flat_X).any() or self.has_zero_missing
+
+        for _ in range(self.max_depth):
+            val = flat_X[row_offsets + self.feature[idx]]
+
+            if check_missing:
+                mt = self.missing_type[idx]
+                nan = np.isnan(val)
+                is_missing = ((mt == MISSING_NAN) & nan) | \
+                             ((mt == MISSING_ZERO) & (nan | (np.abs(val) <= _ZERO_THRESHOLD)))
+                val = np.where(nan, 0.0, val)
+                go_left = np.where(is_missing, self.default_left[idx], val <= self.threshold[idx])
+            else:
+                go_left = val <= self.threshold[idx]
+
+            next_idx = np.where(go_left, self.left[idx], self.right[idx])
+            if np.array_equal(next_idx, idx):
+                break  # كل الصفوف وصلت إلى الأوراق
+            idx = next_idx
+
+        return idx
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {
+            f"{prefix}feature": self.feature, f"{prefix}threshold": self.threshold,
+            f"{prefix}left": self.left, f"{prefix}right": self.right,
+            f"{prefix}default_left": self.default_left, f"{prefix}missing_type": self.missing_type,
+            f"{prefix}values": self.values, f"{prefix}roots": self.roots,
+            f"{prefix}tree_class": self.tree_class,
+            f"{prefix}meta": np.array([self.max_depth, int(self.float32_inputs)])
+        }
+
+    @classmethod
+    def from_arrays(cls, data, prefix: str) -> 'TreeBlock':
+        max_depth, float32_inputs = data[f"{prefix}meta"]
+        return cls(
+            data[f"{prefix}feature"], data[f"{prefix}threshold"],
+            data[f"{prefix}left"], data[f"{prefix}right"],
+            data[f"{prefix}default_left"], data[f"{prefix}missing_type"],
+            data[f"{prefix}values"], data[f"{prefix}roots"], data[f"{prefix}tree_class"],
+            int(max_depth), bool(float32_inputs)
+        )
+
+
+class _BlockBuilder:
+    """تجميع العقد من عدة أشجار في مصفوفات واحدة"""
+
+    def __init__(self, n_outputs: int):
+        self.n_outputs = n_outputs
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.default_left, self.missing_type, self.values = [], [], []
+        self.roots, self.tree_class = [], []
+        self.max_depth = 0
+
+    def add_node(self) -> int:
+        self.feature.append(0)
+        self.threshold.append(np.inf)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.default_left.append(True)
+        self.missing_type.append(MISSING_NONE)
+        self.values.append(np.zeros(self.n_outputs))
+        return len(self.feature) - 1
+
+    def make_leaf(self, node: int, value):
+        self.left[node] = node
+        self.right[node] = node
+        self.values[node] = np.asarray(value, dtype=float)
+
+    def build(self, float32_inputs: bool) -> TreeBlock:
+        return TreeBlock(
+            np.array(self.feature, dtype=np.int32),
+            np.array(self.threshold, dtype=np.float64),
+            np.array(self.left, dtype=np.int32),
+            np.array(self.right, dtype=np.int32),
+            np.array(self.default_left, dtype=bool),
+            np.array(self.missing_type, dtype=np.int8),
+            np.vstack(self.values) if self.values else np.zeros((0, self.n_outputs)),
+            np.array(self.roots, dtype=np.int32),
+            np.array(self.tree_class, dtype=np.int32),
+            self.max_depth, float32_inputs
+        )
+
+
+def _compile_sklearn_forest(forest) -> TreeBlock:
+    """RandomForest/ExtraTrees: احتمال كل ورقة مُطبّع مسبقاً كما في predict_proba"""
+    n_classes = len(forest.classes_)
+    builder = _BlockBuilder(n_classes)
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        offset = len(builder.feature)
+        builder.roots.append(offset)
+        builder.tree_class.append(-1)
+        builder.max_depth = max(builder.max_depth, tree.max_depth)
+
+        for node in range(tree.node_count):
+            builder.add_node()
+
+        for node in range(tree.node_count):
+            g = offset + node
+            if tree.children_left[node] == -1:
+                proba = tree.value[node, 0, :n_classes].astype(float)
+                normalizer = proba.sum()
+                builder.make_leaf(g, proba / (normalizer if normalizer != 0 else 1.0))
+            else:
+                builder.feature[g] = tree.feature[node]
+                builder.threshold[g] = tree.threshold[node]
+                builder.left[g] = offset + tree.children_left[node]
+                builder.right[g] = offset + tree.children_right[node]
+
+    return builder.build(float32_inputs=True)
+
+
+def _compile_lightgbm(model) -> TreeBlock:
+    """LGBMClassifier: قيم الأوراق (raw scores) لكل شجرة مع فئتها"""
+    dump = model.booster_.dump_model()
+    num_class = dump['num_class']
+    builder = _BlockBuilder(1)
+    missing_codes = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+    def add(node: Dict, depth: int) -> int:
+        g = builder.add_node()
+        builder.max_depth = max(builder.max_depth, depth)
+        if 'leaf_value' in node:
+            builder.make_leaf(g, [node['leaf_value']])
+            return g
+        if node['decision_type'] != '<=':
+            raise NotImplementedError("Categorical LightGBM splits are not supported")
+        builder.feature[g] = node['split_feature']
+        builder.threshold[g] = node['threshold']
+        builder.default_left[g] = node['default_left']
+        builder.missing_type[g] = missing_codes[node['missing_type']]
+        builder.left[g] = add(node['left_child'], depth + 1)
+        builder.right[g] = add(node['right_child'], depth + 1)
+        return g
+
+    for i, tree in enumerate(dump['tree_info']):
+        builder.roots.append(add(tree['tree_structure'], 0))
+        builder.tree_class.append(i % num_class if num_class > 1 else 0)
+
+    return builder.build(float32_inputs=False)
+
+
+class CompiledForest:
+    """
+    نموذج مُجمَّع: متوسط مرجّح لمكونات (forest / boosting)
+
+    kind = 'forest': متوسط احتمالات الأشجار
+    kind = 'boosting': مجموع قيم الأوراق لكل فئة ثم softmax (أو sigmoid لفئتين)
+    """
+
+    def __init__(self, classes: np.ndarray, blocks: List[TreeBlock], kinds: List[str],
+                 weights: List[float]):
+        self.classes_ = np.asarray(classes)
+        self.blocks = blocks
+        self.kinds = kinds
+        self.weights = np.asarray(weights, dtype=float)
+
+    @property
+    def max_rows(self) -> int:
+        """أقصى دفعة للتنبؤ المُجمَّع حسب نوع النموذج (Voting بأنواع مختلفة = 'mixed')"""
+        kinds = set(self.kinds)
+        return COMPILED_MAX_ROWS[kinds.pop() if len(kinds) == 1 else 'mixed']
+
+    # ==================== التصدير ====================
+
+    @classmethod
+    def from_model(cls, model) -> 'CompiledForest':
+        """تحويل نموذج مدرب (RF / LGBM / VotingClassifier soft)"""
+        name = type(model).__name__
+
+        if name == 'VotingClassifier':
+            if model.voting != 'soft':
+                raise NotImplementedError("Only soft voting can be compiled")
+            weights = model.weights if model.weights is not None else [1.0] * len(model.estimators_)
+            blocks, kinds = [], []
+            for estimator in model.estimators_:
+                part = cls.from_model(estimator)
+                blocks += part.blocks
+                kinds += part.kinds
+            # المكونات مدربة على الفئات المُرمّزة (0..n-1) بترتيب le_.classes_
+            return cls(model.le_.classes_, blocks, kinds, weights)
+
+        if hasattr(model, 'estimators_') and hasattr(model, 'n_outputs_'):
+            if model.n_outputs_ != 1:
+                raise NotImplementedError("Multi-output forests are not supported")
+            return cls(model.classes_, [_compile_sklearn_forest(model)], ['forest'], [1.0])
+
+        if name == 'LGBMClassifier':
+            return cls(model.classes_, [_compile_lightgbm(model)], ['boosting'], [1.0])
+
+        raise NotImplementedError(f"Cannot compile model type: {name}")
+
+    # ==================== التنبؤ ====================
+
+    def _block_proba(self, block: TreeBlock, kind: str, X: np.ndarray) -> np.ndarray:
+        leaves = block.leaves(X)
+
+        if kind == 'forest':
+            return block.values[leaves].mean(axis=0)
+
+        # boosting: مجموع raw scores لكل فئة
+        n_classes = len(self.classes_)
+        n_outputs = n_classes if n_classes > 2 else 1
+        leaf_values = block.values[leaves, 0]
+        raw = np.column_stack([leaf_values[block.tree_class == k].sum(axis=0) for k in range(n_outputs)])
+
+        if raw.shape[1] == 1:
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+
+        raw -= raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X, chunk_size: int = 256) -> np.ndarray:
+        """احتمالات الفئات بترتيب classes_"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        out = np.empty((X.shape[0], len(self.classes_)))
+        for start in range(0, X.shape[0], chunk_size):
+            chunk = X[start:start + chunk_size]
+            probas = [self._block_proba(b, k, chunk) for b, k in zip(self.blocks, self.kinds)]
+            out[start:start + chunk_size] = probas[0] if len(probas) == 1 \
+                else np.average(probas, axis=0, weights=self.weights)
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    # ==================== الحفظ ====================
+
+    def save(self, path: str):
+        arrays = {
+            'classes': self.classes_.astype(str) if self.classes_.dtype == object else self.classes_,
+            'kinds': np.array(self.kinds),
+            'weights': self.weights
+        }
+        for i, block in enumerate(self.blocks):
+            arrays.update(block.to_arrays(f"b{i}_"))
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        with np.load(path) as data:
+            kinds = [str(k) for k in data['kinds']]
+            blocks = [TreeBlock.from_arrays(data, f"b{i}_") for i in range(len(kinds))]
+            return cls(data['classes'], blocks, kinds, data['weights'])
+
+
+def compile_model(model) -> Optional[CompiledForest]:
+    """تحويل النموذج إن أمكن - يرجع None للأنواع غير المدعومة"""
+    try:
+        return CompiledForest.from_model(model)
+    except NotImplementedError as e:
+        print(f"⚠️  لا يمكن تجميع النموذج: {e}")
+        return None
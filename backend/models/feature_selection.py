@@ -0,0 +1,140 @@
+"""
+اختيار الميزات: حذف تدريجي حسب Permutation Importance على بيانات تحقق زمنية
+
+في كل خطوة يُدرب نموذج الاختيار على الميزات الحالية، وتُقاس أهمية كل ميزة
+بخلطها في بيانات التحقق (أيام لاحقة للتدريب)، ثم تُحذف الأقل أهمية.
+يتوقف الحذف عندما تنخفض الدقة عن دقة كل الميزات بأكثر من tolerance.
+
+التوصيات تحسب ميزات النموذج فقط (StockMLModel.required_features)،
+فالقائمة الأصغر تقلل زمن حساب المؤشرات لكل سهم.
+"""
+
+import math
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import accuracy_score
+
+from backend.models.indicators import compute_features
+
+# ميزات نص التحليل (تُحسب دائماً في التوصيات)
+ANALYSIS_FEATURES = ['rsi', 'macd']
+
+
+def _synthetic_history(n_bars: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """شموع عشوائية لقياس زمن حساب الميزات"""
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    return {
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n_bars)),
+        'low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n_bars)),
+        'close': close,
+        'volume': rng.integers(100_000, 5_000_000, n_bars).astype(float)
+    }
+
+
+def _best_ms(func: Callable, repeats: int, batches: int = 5) -> float:
+    """أقل متوسط زمن (مللي ثانية) من عدة دفعات - أقل تأثراً بضجيج الجهاز"""
+    func()  # تسخين
+    best = float('inf')
+    for _ in range(batches):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeats * 1000)
+    return best
+
+
+def feature_latency_ms(features: Sequence[str], n_bars: int = 100, repeats: int = 50) -> float:
+    """زمن حساب الميزات (مع اعتمادياتها وميزات التحليل) لسهم واحد بالمللي ثانية"""
+    inputs = _synthetic_history(n_bars)
+    required = list(dict.fromkeys(list(features) + ANALYSIS_FEATURES))
+    return _best_ms(lambda: compute_features(inputs, required), repeats)
+
+
+def predict_latency_ms(model, X_row, repeats: int = 10) -> float:
+    """زمن predict_proba لصف واحد بالمللي ثانية"""
+    return _best_ms(lambda: model.predict_proba(X_row), repeats)
+
+
+def _evaluate(model_factory: Callable, X_fit: pd.DataFrame, y_fit, X_val: pd.DataFrame, y_val,
+              features: List[str]) -> Tuple[object, float, float]:
+    """(النموذج, الدقة, زمن التدريب) لمجموعة ميزات"""
+    model = model_factory()
+    start = time.perf_counter()
+    model.fit(X_fit[features], y_fit)
+    fit_seconds = time.perf_counter() - start
+    return model, accuracy_score(y_val, model.predict(X_val[features])), fit_seconds
+
+
+def select_features(X_fit: pd.DataFrame, y_fit, X_val: pd.DataFrame, y_val,
+                    model_factory: Callable, features: Optional[List[str]] = None,
+                    tolerance: float = 0.005, drop_fraction: float = 0.15, min_features: int = 5,
+                    n_repeats: int = 5, random_state: int = 42) -> Tuple[List[str], pd.DataFrame]:
+    """
+    حذف تدريجي للميزات مع الإبقاء على الدقة ضمن tolerance من دقة كل الميزات
+
+    X_fit / X_val: التدريب والتحقق (التحقق بعد التدريب زمنياً)
+    model_factory: دالة ترجع نموذج اختيار جديد غير مدرب
+    drop_fraction: نسبة الميزات المحذوفة في كل خطوة (ميزة واحدة على الأقل)،
+      وعند فشل خطوة كبيرة تُجرب ميزة واحدة قبل التوقف
+    يرجع (أصغر قائمة مقبولة, جدول المجموعات المجربة: الميزات والدقة والزمن)
+    """
+    current = list(features or X_fit.columns)
+    model, base_accuracy, fit_seconds = _evaluate(model_factory, X_fit, y_fit, X_val, y_val, current)
+
+    candidates = []
+
+    def record(feature_list, model, accuracy, fit_seconds, dropped, accepted):
+        candidates.append({
+            'n_features': len(feature_list),
+            'accuracy': accuracy,
+            'accuracy_drop': base_accuracy - accuracy,
+            'accepted': accepted,
+            'fit_seconds': fit_seconds,
+            'feature_ms': feature_latency_ms(feature_list),
+            'predict_ms': predict_latency_ms(model, X_val[feature_list].iloc[:1]),
+            'dropped': dropped,
+            'features': list(feature_list)
+        })
+
+    record(current, model, base_accuracy, fit_seconds, [], True)
+    print(f"📊 كل الميزات ({len(current)}): دقة {base_accuracy*100:.2f}%")
+
+    while len(current) > min_features:
+        importance = permutation_importance(
+            model, X_val[current], y_val, scoring='accuracy',
+            n_repeats=n_repeats, random_state=random_state
+        ).importances_mean
+        ranked = [current[i] for i in np.argsort(importance, kind='stable')]
+
+        n_drop = min(max(1, math.floor(len(current) * drop_fraction)), len(current) - min_features)
+        accepted = False
+        for size in dict.fromkeys([n_drop, 1]):
+            dropped = ranked[:size]
+            candidate = [f for f in current if f not in dropped]
+            candidate_model, accuracy, fit_seconds = _evaluate(model_factory, X_fit, y_fit, X_val, y_val, candidate)
+            accepted = accuracy >= base_accuracy - tolerance
+            record(candidate, candidate_model, accuracy, fit_seconds, dropped, accepted)
+            print(f"  {'✅' if accepted else '❌'} {len(candidate)} ميزة: دقة {accuracy*100:.2f}% "
+                  f"(حذف {', '.join(dropped)})")
+            if accepted:
+                current, model = candidate, candidate_model
+                break
+        if not accepted:
+            break
+
+    return current, pd.DataFrame(candidates)
+
+
+def print_tradeoff(candidates: pd.DataFrame):
+    """جدول الدقة مقابل زمن حساب الميزات والتنبؤ لكل مجموعة مجربة"""
+    table = candidates[['n_features', 'accuracy', 'accuracy_drop', 'accepted',
+                        'feature_ms', 'predict_ms', 'fit_seconds']]
+    print("\n📊 الدقة مقابل الزمن لكل مجموعة ميزات:")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
@@ -0,0 +1,388 @@
+"""
+البحث عن المعاملات (Hyperparameter Search) موزعاً على عمليات محلية
+
+- random: عدد ثابت من التوليفات العشوائية، كل منها على كامل بيانات التدريب
+- halving (Successive Halving): كل التوليفات على جزء صغير من صفوف التدريب،
+  ثم أفضل 1/eta منها على جزء أكبر... حتى كامل الصفوف في الجولة الأخيرة
+كل توليفة تُقيَّم بمتوسط الدقة على folds زمنية (purged_walk_forward).
+
+مجلد البحث /tmp/hparam_search/<name>-<key>/ هو طابور المهام ونقطة الاستئناف معاً:
+    spec.json          إعدادات البحث ومسار المصفوفات
+    estimator.pkl      النموذج الأساسي (تُطبق عليه معاملات كل تجربة)
+    folds.npz          فهارس الـ folds
+    tasks/<id>.json    مهمة: توليفة + نسبة الصفوف
+    claims/<id>        مهمة قيد التنفيذ (host:pid) - تُنشأ بـ O_EXCL فلا تأخذها عمليتان
+    results/<id>.json  النتيجة (تُكتب ثم os.replace)
+    best.json          أفضل توليفة (يُكتب عند انتهاء البحث)
+<key> بصمة البيانات والإعدادات، فإعادة تشغيل نفس البحث تتخطى المهام المنتهية.
+
+X و y في FoldCache على /dev/shm (إن وُجد) وتقرأها كل العمليات عبر mmap بدون نسخ.
+عمليات إضافية تنضم للبحث بـ run_worker(search_dir, follow=True) - على أجهزة أخرى
+يجب أن يكون مجلد البحث ومجلد المصفوفات (cache_root) على قرص مشترك.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score
+
+from backend.models.training import core_budget, split_cores
+from backend.models.validation import CV_CACHE_DIR, FoldCache, purged_walk_forward
+
+SEARCH_DIR = "/tmp/hparam_search"
+SHARED_CACHE_DIR = "/dev/shm/hparam_search" if os.path.isdir("/dev/shm") else CV_CACHE_DIR
+
+# البحث المحمّل في كل عملية (المصفوفات تُفتح مرة واحدة لكل عملية)
+_loaded: Dict[str, tuple] = {}
+
+
+# ==================== فضاء البحث ====================
+
+def sample_params(space: Dict, rng: np.random.Generator) -> Dict:
+    """
+    توليفة عشوائية من فضاء البحث
+
+    space: {param: قائمة قيم | ('int', low, high) | ('float', low, high) | ('log', low, high)}
+    """
+    params = {}
+    for name, dist in space.items():
+        if isinstance(dist, list):
+            params[name] = dist[int(rng.integers(len(dist)))]
+            continue
+        kind, low, high = dist
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'float':
+            params[name] = float(rng.uniform(low, high))
+        elif kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            raise ValueError(f"Unknown distribution: {kind}")
+    return params
+
+
+def sample_trials(space: Dict, n_trials: int, seed: int = 42) -> List[Dict]:
+    """n_trials توليفة مختلفة (نفس البذرة = نفس التوليفات، وهذا ما يجعل الاستئناف ممكناً)"""
+    rng = np.random.default_rng(seed)
+    trials, seen = [], set()
+    for _ in range(n_trials * 20):
+        params = sample_params(space, rng)
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            trials.append(params)
+            if len(trials) == n_trials:
+                break
+    return trials
+
+
+def halving_schedule(n_trials: int, eta: int = 3, rungs: int = 3) -> List[Dict]:
+    """الجولات: عدد التوليفات ونسبة الصفوف لكل جولة (الأخيرة على كامل الصفوف)"""
+    return [{'rung': r, 'n_configs': max(1, math.ceil(n_trials / eta ** r)),
+             'fraction': float(eta ** (r - rungs + 1))}
+            for r in range(rungs)]
+
+
+# ==================== الملفات ====================
+
+def _write_json(path: str, data: Dict):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _result_path(search_dir: str, task_id: str) -> str:
+    return os.path.join(search_dir, "results", f"{task_id}.json")
+
+
+def _claim_path(search_dir: str, task_id: str) -> str:
+    return os.path.join(search_dir, "claims", task_id)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def release_stale_claims(search_dir: str) -> int:
+    """حذف مطالبات عمليات منتهية على هذا الجهاز (توقفت قبل كتابة النتيجة) - يرجع عددها"""
+    host = socket.gethostname()
+    released = 0
+    claims_dir = os.path.join(search_dir, "claims")
+    for task_id in os.listdir(claims_dir):
+        if os.path.exists(_result_path(search_dir, task_id)):
+            continue
+        try:
+            with open(os.path.join(claims_dir, task_id)) as f:
+                owner_host, _, pid = f.read().strip().rpartition(":")
+        except OSError:
+            continue
+        if owner_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+            try:
+                os.remove(os.path.join(claims_dir, task_id))
+                released += 1
+            except OSError:
+                pass
+    return released
+
+
+def _claim_next(search_dir: str) -> Optional[Dict]:
+    """أول مهمة بدون نتيجة ولا مطالبة (None إذا لم توجد)"""
+    for name in sorted(os.listdir(os.path.join(search_dir, "tasks"))):
+        task_id = name[:-len(".json")]
+        if os.path.exists(_result_path(search_dir, task_id)):
+            continue
+        try:
+            fd = os.open(_claim_path(search_dir, task_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(f"{socket.gethostname()}:{os.getpid()}")
+        return _read_json(os.path.join(search_dir, "tasks", name))
+    return None
+
+
+# ==================== التقييم ====================
+
+def _load_search(search_dir: str):
+    if search_dir not in _loaded:
+        spec = _read_json(os.path.join(search_dir, "spec.json"))
+        X, y_codes, classes = FoldCache.load(spec['cache_path'])
+        with np.load(os.path.join(search_dir, "folds.npz")) as data:
+            folds = [(data[f"train_{i}"], data[f"test_{i}"]) for i in range(spec['n_folds'])]
+        _loaded[search_dir] = (spec, joblib.load(os.path.join(search_dir, "estimator.pkl")),
+                               X, y_codes, folds)
+    return _loaded[search_dir]
+
+
+def evaluate_task(search_dir: str, task: Dict, n_cores: Optional[int] = None) -> Dict:
+    """تدريب وتقييم توليفة واحدة على كل الـ folds (بنسبة task['fraction'] من صفوف التدريب)"""
+    spec, estimator, X, y_codes, folds = _load_search(search_dir)
+    model = clone(estimator).set_params(**task['params'])
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=core_budget(n_cores))
+
+    scores, fit_seconds, n_train = [], 0.0, 0
+    for i, (train_idx, test_idx) in enumerate(folds):
+        if task['fraction'] < 1:
+            # نفس العينة لكل التوليفات في الجولة (المقارنة على نفس الصفوف)
+            rng = np.random.default_rng(spec['seed'] + i)
+            size = max(1, int(len(train_idx) * task['fraction']))
+            train_idx = np.sort(rng.choice(train_idx, size, replace=False))
+
+        # التدريب على أكواد الفئات (0..k-1) يناسب كل النماذج بما فيها XGBoost
+        start = time.perf_counter()
+        model.fit(X[train_idx], np.asarray(y_codes[train_idx], dtype=int))
+        fit_seconds += time.perf_counter() - start
+        n_train += len(train_idx)
+
+        y_test, y_pred = np.asarray(y_codes[test_idx], dtype=int), model.predict(X[test_idx])
+        if spec['scoring'] == 'f1_macro':
+            scores.append(f1_score(y_test, y_pred, average='macro', zero_division=0))
+        else:
+            scores.append(accuracy_score(y_test, y_pred))
+
+    return {
+        **task,
+        'score': float(np.mean(scores)),
+        'fold_scores': [float(s) for s in scores],
+        'fit_seconds': fit_seconds,
+        'n_train': n_train // len(folds),
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'finished_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def run_worker(search_dir: str, n_cores: Optional[int] = None, follow: bool = False,
+               poll_seconds: float = 5.0) -> int:
+    """
+    تنفيذ مهام البحث حتى نفاد الطابور - يرجع عدد المهام المنفذة
+
+    follow: انتظار مهام الجولات التالية حتى انتهاء البحث (للعمليات المنضمة من خارج المنسق)
+    """
+    done = 0
+    while True:
+        task = _claim_next(search_dir)
+        if task is None:
+            if not follow or os.path.exists(os.path.join(search_dir, "best.json")):
+                return done
+            time.sleep(poll_seconds)
+            continue
+
+        try:
+            result = evaluate_task(search_dir, task, n_cores)
+        except BaseException:
+            os.remove(_claim_path(search_dir, task['id']))  # تعود المهمة للطابور
+            raise
+        _write_json(_result_path(search_dir, task['id']), result)
+        done += 1
+        print(f"  ✅ {task['id']}: {result['score']:.4f} ({result['fit_seconds']:.1f}s)")
+
+
+# ==================== المنسق ====================
+
+class HyperparameterSearch:
+    """
+    بحث واحد: التوليفات والجولات والمهام في مجلد البحث
+
+    estimator: النموذج الأساسي غير المدرب (clone + set_params لكل توليفة)
+    space: فضاء البحث (انظر sample_params)
+    X / y / dates: بيانات التدريب فقط (الاختبار النهائي خارج البحث)
+    """
+
+    def __init__(self, name: str, estimator, space: Dict, X: np.ndarray, y, dates,
+                 method: str = 'halving', n_trials: int = 27, eta: int = 3, rungs: int = 3,
+                 n_folds: int = 3, horizon: int = 5, embargo: int = 0, scoring: str = 'accuracy',
+                 seed: int = 42, root: str = SEARCH_DIR, cache_root: str = SHARED_CACHE_DIR):
+        if method not in ('halving', 'random'):
+            raise ValueError(f"Unknown search method: {method}")
+
+        y = pd.Categorical(np.asarray(y))
+        self.cache = FoldCache(X, y.codes, list(y.categories), root=cache_root)
+        self.classes = list(y.categories)
+        self.trials = sample_trials(space, n_trials, seed)
+        self.schedule = (halving_schedule(len(self.trials), eta, rungs) if method == 'halving'
+                         else [{'rung': 0, 'n_configs': len(self.trials), 'fraction': 1.0}])
+
+        spec = {
+            'name': name,
+            'method': method,
+            'estimator': type(estimator).__name__,
+            'estimator_params': {k: v for k, v in estimator.get_params().items() if k != 'n_jobs'},
+            'space': space,
+            'n_trials': n_trials,
+            'schedule': self.schedule,
+            'n_folds': n_folds,
+            'horizon': horizon,
+            'embargo': embargo,
+            'scoring': scoring,
+            'seed': seed,
+            'data': os.path.basename(self.cache.path)
+        }
+        key = hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:10]
+        self.path = os.path.join(root, f"{name}-{key}")
+        self.spec = {**spec, 'cache_path': self.cache.path, 'classes': self.classes}
+
+        for sub in ("tasks", "claims", "results"):
+            os.makedirs(os.path.join(self.path, sub), exist_ok=True)
+        if not os.path.exists(os.path.join(self.path, "spec.json")):
+            folds = purged_walk_forward(dates, n_folds=n_folds, horizon=horizon, embargo=embargo)
+            self.spec['n_folds'] = len(folds)
+            np.savez(os.path.join(self.path, "folds.npz"),
+                     **{f"{kind}_{i}": fold[f"{kind}_idx"]
+                        for i, fold in enumerate(folds) for kind in ("train", "test")})
+            joblib.dump(estimator, os.path.join(self.path, "estimator.pkl"))
+            _write_json(os.path.join(self.path, "spec.json"), self.spec)  # آخر ملف: البحث جاهز
+        self.spec = _read_json(os.path.join(self.path, "spec.json"))
+
+    def release_cache(self):
+        """حذف المصفوفات المشتركة بعد انتهاء البحث (في /dev/shm تشغل الذاكرة)"""
+        shutil.rmtree(self.cache.path, ignore_errors=True)
+
+    def results(self) -> pd.DataFrame:
+        """كل النتائج المكتملة (من هذا التشغيل أو التشغيلات السابقة)"""
+        results_dir = os.path.join(self.path, "results")
+        rows = [_read_json(os.path.join(results_dir, name))
+                for name in sorted(os.listdir(results_dir)) if name.endswith(".json")]
+        return pd.DataFrame(rows)
+
+    def _execute(self, task_ids: List[str], n_workers: int, worker_cores: List[int],
+                 poll_seconds: float):
+        """تنفيذ مهام الجولة بعمليات محلية، وانتظار المهام المطالب بها من عمليات أخرى"""
+        while True:
+            release_stale_claims(self.path)
+            pending = [t for t in task_ids if not os.path.exists(_result_path(self.path, t))]
+            if not pending:
+                return
+
+            unclaimed = [t for t in pending if not os.path.exists(_claim_path(self.path, t))]
+            if not unclaimed:
+                time.sleep(poll_seconds)  # مهام قيد التنفيذ في عمليات أخرى
+                continue
+
+            workers = min(n_workers, len(unclaimed))
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(run_worker, [self.path] * workers, worker_cores[:workers]))
+            else:
+                run_worker(self.path, worker_cores[0])
+
+    def run(self, n_workers: Optional[int] = None, n_cores: Optional[int] = None,
+            poll_seconds: float = 5.0) -> Dict:
+        """
+        تنفيذ كل الجولات (أو إكمالها عند الاستئناف) - يرجع أفضل توليفة
+
+        n_workers: عدد العمليات المحلية (ميزانية الأنوية تُقسم بينها)
+        """
+        n_cores = core_budget(n_cores)
+        n_workers = max(1, min(n_workers or n_cores, n_cores))
+        worker_cores = split_cores(n_cores, n_workers)
+
+        done = len(self.results())
+        print(f"📁 مجلد البحث: {self.path}" + (f" (استئناف: {done} مهمة منتهية)" if done else ""))
+
+        configs = list(range(len(self.trials)))
+        rung_results = pd.DataFrame()
+        for rung in self.schedule:
+            if rung['rung'] > 0:
+                # ترقية أفضل التوليفات (ترتيب ثابت عند التعادل: رقم التجربة)
+                ranked = rung_results.sort_values(['score', 'trial'], ascending=[False, True])
+                configs = ranked['trial'].head(rung['n_configs']).tolist()
+
+            task_ids = []
+            for trial in configs:
+                task_id = f"t{trial:03d}-r{rung['rung']}"
+                task_path = os.path.join(self.path, "tasks", f"{task_id}.json")
+                if not os.path.exists(task_path):
+                    _write_json(task_path, {'id': task_id, 'trial': trial, 'rung': rung['rung'],
+                                            'fraction': rung['fraction'], 'params': self.trials[trial]})
+                task_ids.append(task_id)
+
+            print(f"\n⏳ الجولة {rung['rung']}: {len(configs)} توليفة على "
+                  f"{rung['fraction']*100:.0f}% من صفوف التدريب ({n_workers} عملية)...")
+            start = time.perf_counter()
+            self._execute(task_ids, n_workers, worker_cores, poll_seconds)
+
+            rung_results = pd.DataFrame([_read_json(_result_path(self.path, t)) for t in task_ids])
+            print(f"✅ الجولة {rung['rung']} في {time.perf_counter() - start:.1f} ثانية - "
+                  f"أفضل دقة {rung_results['score'].max():.4f}")
+
+        best_row = rung_results.sort_values(['score', 'trial'], ascending=[False, True]).iloc[0]
+        best = {
+            'params': best_row['params'],
+            'score': float(best_row['score']),
+            'fold_scores': best_row['fold_scores'],
+            'trial': int(best_row['trial']),
+            'scoring': self.spec['scoring'],
+            'method': self.spec['method'],
+            'n_trials': len(self.trials),
+            'n_tasks': len(self.results()),
+            'search_dir': self.path,
+            'finished_at': datetime.now().isoformat(timespec='seconds')
+        }
+        _write_json(os.path.join(self.path, "best.json"), best)  # يوقف العمليات المنضمة (follow)
+        return best
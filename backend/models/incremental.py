@@ -0,0 +1,94 @@
+"""
+التدريب التزايدي: توسيع نموذج مدرب بالأيام الجديدة بدلاً من إعادة التدريب من الصفر
+
+- RandomForest: إضافة أشجار جديدة (warm_start) مدربة على الأيام الجديدة،
+  وحذف أقدم الأشجار عند تجاوز max_trees (نافذة منزلقة)
+- LightGBM / XGBoost: متابعة الـ boosting (init_model / xgb_model) بجولات إضافية.
+  لا يمكن حذف الأشجار الأولى من boosting، فعند تجاوز max_trees يلزم تدريب كامل
+- VotingClassifier: توسيع كل نموذج ثم إعادة بناء الـ Voting بدون إعادة تدريب
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.data.training_dataset import TARGET_LABELS
+from backend.models.training import prefit_voting_classifier
+
+
+class FullRetrainRequired(Exception):
+    """لا يمكن توسيع النموذج تزايدياً - يلزم تدريب كامل"""
+
+
+def _check_classes(model, y):
+    """الأيام الجديدة يجب أن تحتوي كل الفئات (وإلا تختلف أعمدة predict_proba)"""
+    classes = np.asarray(model.classes_)
+    if classes.dtype.kind in 'iu':
+        return
+    missing = set(classes) - set(np.unique(np.asarray(y)))
+    if missing:
+        raise FullRetrainRequired(f"New data has no samples for classes: {sorted(missing)}")
+
+
+def _extend_forest(model, X, y, n_new: int, max_trees: Optional[int]):
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new)
+    model.fit(X, y)
+
+    # نافذة منزلقة: الإبقاء على أحدث max_trees شجرة
+    if max_trees and len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(n_estimators=max_trees)
+    model.set_params(warm_start=False)
+    return model
+
+
+def _boosting_trees(model) -> int:
+    if type(model).__name__ == 'LGBMClassifier':
+        return model.booster_.num_trees() // max(1, model.booster_.num_model_per_iteration())
+    return model.get_booster().num_boosted_rounds()
+
+
+def _extend_boosting(model, X, y, n_new: int, max_trees: Optional[int]):
+    if max_trees and _boosting_trees(model) + n_new > max_trees:
+        raise FullRetrainRequired(f"{type(model).__name__} would exceed {max_trees} boosting rounds")
+
+    params = dict(model.get_params(), n_estimators=n_new)
+    extended = type(model)(**params)
+
+    if type(model).__name__ == 'LGBMClassifier':
+        extended.fit(X, y, init_model=model.booster_)
+    else:
+        # XGBoost مدرب على أكواد الفئات (buy=0, hold=1, sell=2)
+        y = np.asarray(y)
+        if y.dtype.kind not in 'iu':
+            y = pd.Categorical(y, categories=TARGET_LABELS).codes.astype(int)
+        if len(np.unique(y)) != len(model.classes_):
+            raise FullRetrainRequired("New data has no samples for some classes")
+        extended.fit(X, y, xgb_model=model.get_booster())
+    return extended
+
+
+def extend_model(model, X, y, n_new: int = 20, max_trees: Optional[int] = None):
+    """
+    توسيع نموذج مدرب بعينات جديدة
+
+    n_new: عدد الأشجار (RF) أو جولات الـ boosting الجديدة
+    max_trees: حد النافذة المنزلقة (RF) أو الحد الأقصى للجولات (boosting)
+    يرجع النموذج الموسّع (قد يكون كائناً جديداً) أو يرفع FullRetrainRequired
+    """
+    name = type(model).__name__
+    _check_classes(model, y)
+
+    if name == 'VotingClassifier':
+        members = [(member_name, extend_model(member, X, y, n_new, max_trees))
+                   for member_name, member in model.named_estimators_.items()]
+        return prefit_voting_classifier(members, weights=model.weights)
+
+    if name in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        return _extend_forest(model, X, y, n_new, max_trees)
+
+    if name in ('LGBMClassifier', 'XGBClassifier'):
+        return _extend_boosting(model, X, y, n_new, max_trees)
+
+    raise FullRetrainRequired(f"Incremental training is not supported for {name}")
@@ -0,0 +1,418 @@
+"""
+حالة المؤشرات الفنية القابلة للتحديث شمعة بشمعة
+
+بدلاً من إعادة حساب كل المؤشرات على 100 شمعة عند وصول شمعة جديدة،
+تحتفظ IndicatorState بالمجاميع الجارية (EMA، مجاميع RSI/ATR/ADX، OBV)
+ونوافذ دائرية (SMA، Bollinger، Stochastic، الدعم/المقاومة) بحيث يكلف
+update(bar) زمناً ثابتاً. النتائج تطابق compute_indicators على نفس الشموع
+منذ إنشاء الحالة (ضمن هامش الدقة العددية).
+
+شمعة اليوم الجاري قد تتغير بعد تطبيقها: update_many يحفظ الحالة قبل آخر شمعة
+(checkpoint) و revise يعيد تطبيق آخر شمعة بقيمها الجديدة بدلاً من البناء عليها.
+"""
+
+import math
+from collections import deque
+from typing import Dict, List, Optional
+
+from backend.models.indicators import INDICATOR_COLUMNS
+
+NAN = float('nan')
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _div(a: float, b: float) -> float:
+    """قسمة بنفس سلوك NumPy (inf/NaN بدلاً من استثناء)"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+class RollingWindow:
+    """نافذة دائرية بمجموع جارٍ - جاهزة عند امتلائها بدون NaN"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: List[float] = []
+        self.pos = 0
+        self.total = 0.0
+        self.nans = 0
+
+    def push(self, x: float):
+        """إضافة قيمة جديدة وإخراج الأقدم"""
+        if len(self.values) < self.window:
+            self.values.append(x)
+        else:
+            old = self.values[self.pos]
+            if old != old:
+                self.nans -= 1
+            else:
+                self.total -= old
+            self.values[self.pos] = x
+            self.pos = (self.pos + 1) % self.window
+
+        if x != x:
+            self.nans += 1
+        else:
+            self.total += x
+
+        # إعادة المزامنة مرة كل دورة لمنع تراكم أخطاء التقريب
+        if self.pos == 0 and len(self.values) == self.window:
+            self.total = math.fsum(v for v in self.values if v == v)
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.window and self.nans == 0
+
+    def mean(self) -> float:
+        return self.total / self.window if self.ready else NAN
+
+    def std(self) -> float:
+        """انحراف معياري بـ ddof=1"""
+        if not self.ready:
+            return NAN
+        m = math.fsum(self.values) / self.window
+        return math.sqrt(math.fsum((v - m) ** 2 for v in self.values) / (self.window - 1))
+
+    def to_dict(self) -> Dict:
+        return {'window': self.window, 'values': list(self.values), 'pos': self.pos,
+                'total': self.total, 'nans': self.nans}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RollingWindow':
+        obj = cls(data['window'])
+        obj.values = list(data['values'])
+        obj.pos = data['pos']
+        obj.total = data['total']
+        obj.nans = data['nans']
+        return obj
+
+
+class RollingExtreme:
+    """أدنى/أعلى قيمة متحركة بطابور رتيب (O(1) مستهلك)"""
+
+    def __init__(self, window: int, mode: str = 'min'):
+        self.window = window
+        self.mode = mode
+        self.queue = deque()      # (index, value) بترتيب رتيب
+        self.count = 0
+        self.last_nan = -1
+
+    def push(self, x: float):
+        i = self.count
+        self.count += 1
+
+        if x != x:
+            self.last_nan = i
+        else:
+            if self.mode == 'min':
+                while self.queue and self.queue[-1][1] >= x:
+                    self.queue.pop()
+            else:
+                while self.queue and self.queue[-1][1] <= x:
+                    self.queue.pop()
+            self.queue.append((i, x))
+
+        while self.queue and self.queue[0][0] <= i - self.window:
+            self.queue.popleft()
+
+    def value(self) -> float:
+        if self.count < self.window or self.last_nan > self.count - 1 - self.window:
+            return NAN
+        return self.queue[0][1]
+
+    def to_dict(self) -> Dict:
+        return {'window': self.window, 'mode': self.mode, 'queue': [list(q) for q in self.queue],
+                'count': self.count, 'last_nan': self.last_nan}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RollingExtreme':
+        obj = cls(data['window'], data['mode'])
+        obj.queue = deque(tuple(q) for q in data['queue'])
+        obj.count = data['count']
+        obj.last_nan = data['last_nan']
+        return obj
+
+
+class EmaState:
+    """EMA تكراري (مثل ewm(span=span, adjust=False).mean())"""
+
+    def __init__(self, span: int):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+
+    def push(self, x: float) -> float:
+        if self.weighted != self.weighted:
+            if x == x:
+                self.weighted = x
+        else:
+            self.old_wt *= 1.0 - self.alpha
+            if x == x:
+                self.weighted = (self.old_wt * self.weighted + self.alpha * x) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        return self.weighted
+
+    def to_dict(self) -> Dict:
+        return {'span': self.span, 'weighted': self.weighted, 'old_wt': self.old_wt}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'EmaState':
+        obj = cls(data['span'])
+        obj.weighted = data['weighted']
+        obj.old_wt = data['old_wt']
+        return obj
+
+
+class IndicatorState:
+    """حالة جميع المؤشرات لسهم واحد"""
+
+    # الحقول القابلة للتسلسل وأنواعها
+    _WINDOWS = {
+        'gain_14': 14, 'loss_14': 14, 'close_20': 20, 'close_50': 50,
+        'tr_14': 14, 'volume_20': 20, 'stoch_k_3': 3,
+        'plus_dm_14': 14, 'minus_dm_14': 14, 'dx_14': 14, 'body2_10': 10
+    }
+    _EXTREMES = {
+        'low_14': (14, 'min'), 'high_14': (14, 'max'),
+        'low_20': (20, 'min'), 'high_20': (20, 'max')
+    }
+    _EMAS = {'ema_12': 12, 'ema_26': 26, 'macd_signal': 9, 'obv_ema': 20}
+
+    def __init__(self):
+        self.windows = {name: RollingWindow(w) for name, w in self._WINDOWS.items()}
+        self.extremes = {name: RollingExtreme(w, mode) for name, (w, mode) in self._EXTREMES.items()}
+        self.emas = {name: EmaState(span) for name, span in self._EMAS.items()}
+        self.obv = 0.0
+        self.prev_bars: deque = deque(maxlen=2)     # (open, high, low, close) لآخر شمعتين
+        self.prev_closes: deque = deque(maxlen=5)   # لحساب price_change_5d
+        self.last_date: Optional[str] = None
+        self.last_bar: Optional[tuple] = None       # OHLCV لآخر شمعة (لاكتشاف تعديلها)
+        self.latest: Optional[Dict[str, float]] = None
+        self.bars = 0
+        self.checkpoint: Optional[Dict] = None      # الحالة قبل آخر شمعة (to_dict بدونها)
+
+    @property
+    def last_close(self) -> float:
+        """سعر إغلاق آخر شمعة تمت معالجتها"""
+        return self.prev_bars[-1][3] if self.prev_bars else NAN
+
+    def update(self, bar: Dict) -> Dict[str, float]:
+        """تحديث الحالة بشمعة جديدة وإرجاع قيم المؤشرات لها"""
+        o = float(bar['open'])
+        h = float(bar['high'])
+        l = float(bar['low'])
+        c = float(bar['close'])
+        v = float(bar['volume'])
+        self.checkpoint = None  # لا تُعرف الحالة قبل هذه الشمعة إلا عبر update_many
+
+        if self.prev_bars:
+            o1, h1, l1, c1 = self.prev_bars[-1]
+        else:
+            o1 = h1 = l1 = c1 = NAN
+        if len(self.prev_bars) == 2:
+            o2, _, _, c2 = self.prev_bars[0]
+        else:
+            o2 = c2 = NAN
+
+        w = self.windows
+        e = self.extremes
+        out = {}
+
+        # RSI
+        delta = c - c1
+        w['gain_14'].push(delta if delta > 0 else 0.0)
+        w['loss_14'].push(-delta if delta < 0 else 0.0)
+        out['rsi'] = 100 - _div(100, 1 + _div(w['gain_14'].mean(), w['loss_14'].mean()))
+
+        # MACD
+        ema_12 = self.emas['ema_12'].push(c)
+        macd = ema_12 - self.emas['ema_26'].push(c)
+        macd_signal = self.emas['macd_signal'].push(macd)
+        out['macd'] = macd
+        out['macd_signal'] = macd_signal
+        out['macd_diff'] = macd - macd_signal
+
+        # Moving Averages
+        w['close_20'].push(c)
+        w['close_50'].push(c)
+        sma_20 = w['close_20'].mean()
+        out['sma_20'] = sma_20
+        out['sma_50'] = w['close_50'].mean()
+        out['ema_12'] = ema_12
+
+        # Bollinger Bands
+        std_20 = w['close_20'].std()
+        out['bb_middle'] = sma_20
+        out['bb_upper'] = sma_20 + std_20 * 2
+        out['bb_lower'] = sma_20 - std_20 * 2
+        out['bb_width'] = _div(out['bb_upper'] - out['bb_lower'], sma_20)
+
+        # ATR
+        tr = h - l
+        if c1 == c1:
+            tr = max(tr, abs(h - c1), abs(l - c1))
+        w['tr_14'].push(tr)
+        atr = w['tr_14'].mean()
+        out['atr'] = atr
+
+        # Volume Ratio
+        w['volume_20'].push(v)
+        out['volume_ratio'] = _div(v, w['volume_20'].mean())
+
+        # Price Changes
+        out['price_change'] = _div(c, c1) - 1
+        c5 = self.prev_closes[0] if len(self.prev_closes) == 5 else NAN
+        out['price_change_5d'] = _div(c, c5) - 1
+
+        # Stochastic Oscillator
+        e['low_14'].push(l)
+        e['high_14'].push(h)
+        lowest_low = e['low_14'].value()
+        stoch_k = _div(100 * (c - lowest_low), e['high_14'].value() - lowest_low)
+        w['stoch_k_3'].push(stoch_k)
+        out['stoch_k'] = stoch_k
+        out['stoch_d'] = w['stoch_k_3'].mean()
+
+        # ADX
+        plus_dm = h - h1
+        minus_dm = l - l1
+        if plus_dm < 0:
+            plus_dm = 0.0
+        if minus_dm > 0:
+            minus_dm = 0.0
+        w['plus_dm_14'].push(plus_dm)
+        w['minus_dm_14'].push(abs(minus_dm))
+        plus_di = 100 * _div(w['plus_dm_14'].mean(), atr)
+        minus_di = 100 * _div(w['minus_dm_14'].mean(), atr)
+        w['dx_14'].push(_div(100 * abs(plus_di - minus_di), plus_di + minus_di))
+        out['adx'] = w['dx_14'].mean()
+
+        # OBV
+        if delta > 0:
+            self.obv += v
+        elif delta < 0:
+            self.obv += -v
+        out['obv'] = self.obv
+        out['obv_ema'] = self.emas['obv_ema'].push(self.obv)
+
+        # أنماط الشموع اليابانية
+        body = abs(c - o)
+        upper_shadow = h - max(c, o)
+        lower_shadow = min(c, o) - l
+        body1 = abs(c1 - o1)
+        body2 = abs(c2 - o2)
+        w['body2_10'].push(body2)
+
+        bullish = c > o
+        bearish = c < o
+        large_first = body2 > w['body2_10'].mean()
+        second_small = body1 < body2 * 0.5
+        first_mid = (o2 + c2) / 2
+
+        out['doji'] = int(_div(body, h - l + 0.001) < 0.1)
+        out['hammer'] = int(lower_shadow > body * 2 and upper_shadow < body * 0.5 and bullish)
+        out['shooting_star'] = int(upper_shadow > body * 2 and lower_shadow < body * 0.5 and bearish)
+        out['bullish_engulfing'] = int(c1 < o1 and bullish and o < c1 and c > o1)
+        out['bearish_engulfing'] = int(c1 > o1 and bearish and o > c1 and c < o1)
+        out['morning_star'] = int(c2 < o2 and large_first and second_small and bullish and c > first_mid)
+        out['evening_star'] = int(c2 > o2 and large_first and second_small and bearish and c < first_mid)
+
+        # مستويات الدعم والمقاومة
+        e['low_20'].push(l)
+        e['high_20'].push(h)
+        support = e['low_20'].value()
+        resistance = e['high_20'].value()
+        dist_from_support = _div(c - support, support) * 100
+        dist_from_resistance = _div(resistance - c, c) * 100
+        out['support'] = support
+        out['resistance'] = resistance
+        out['dist_from_support'] = dist_from_support
+        out['dist_from_resistance'] = dist_from_resistance
+        out['sr_position'] = _div(c - support, resistance - support + 0.001)
+        out['near_support'] = int(dist_from_support < 2)
+        out['near_resistance'] = int(dist_from_resistance < 2)
+
+        # تقديم الحالة
+        self.prev_bars.append((o, h, l, c))
+        self.prev_closes.append(c)
+        self.last_bar = (o, h, l, c, v)
+        self.bars += 1
+        if 'date' in bar:
+            self.last_date = str(bar['date'])
+
+        self.latest = {col: out[col] for col in INDICATOR_COLUMNS}
+        return self.latest
+
+    def update_many(self, bars: List[Dict]) -> List[Dict[str, float]]:
+        """update لعدة شموع بالترتيب مع حفظ الحالة قبل آخرها (لـ revise)"""
+        rows = [self.update(bar) for bar in bars[:-1]]
+        if bars:
+            checkpoint = self._state_dict()
+            rows.append(self.update(bars[-1]))
+            self.checkpoint = checkpoint
+        return rows
+
+    def last_bar_changed(self, bar: Dict) -> bool:
+        """هل تختلف OHLCV للشمعة عن آخر شمعة مُطبقة (True إذا لم تُحفظ آخر شمعة)"""
+        return self.last_bar is None or tuple(float(bar[f]) for f in BAR_FIELDS) != tuple(self.last_bar)
+
+    def revise(self, bar: Dict) -> Optional[Dict[str, float]]:
+        """
+        استبدال آخر شمعة بقيمها الجديدة: الرجوع للحالة قبلها ثم update
+
+        يرجع مؤشرات الشمعة، أو None إذا لم تُحفظ الحالة قبلها (يلزم إعادة البناء)
+        """
+        if self.checkpoint is None:
+            return None
+        checkpoint = self.checkpoint
+        self._restore(checkpoint)
+        latest = self.update(bar)
+        self.checkpoint = checkpoint
+        return latest
+
+    def to_dict(self) -> Dict:
+        """تحويل الحالة إلى dict قابل للحفظ (JSON/joblib)"""
+        data = self._state_dict()
+        data['checkpoint'] = self.checkpoint
+        return data
+
+    def _state_dict(self) -> Dict:
+        return {
+            'windows': {name: win.to_dict() for name, win in self.windows.items()},
+            'extremes': {name: ext.to_dict() for name, ext in self.extremes.items()},
+            'emas': {name: ema.to_dict() for name, ema in self.emas.items()},
+            'obv': self.obv,
+            'prev_bars': [list(b) for b in self.prev_bars],
+            'prev_closes': list(self.prev_closes),
+            'last_date': self.last_date,
+            'last_bar': list(self.last_bar) if self.last_bar is not None else None,
+            'latest': dict(self.latest) if self.latest is not None else None,
+            'bars': self.bars
+        }
+
+    def _restore(self, data: Dict):
+        self.windows = {name: RollingWindow.from_dict(d) for name, d in data['windows'].items()}
+        self.extremes = {name: RollingExtreme.from_dict(d) for name, d in data['extremes'].items()}
+        self.emas = {name: EmaState.from_dict(d) for name, d in data['emas'].items()}
+        self.obv = data['obv']
+        self.prev_bars = deque((tuple(b) for b in data['prev_bars']), maxlen=2)
+        self.prev_closes = deque(data['prev_closes'], maxlen=5)
+        self.last_date = data['last_date']
+        # الحالات المحفوظة قبل last_bar/checkpoint: تُعامل كأن آخر شمعة غير معروفة
+        self.last_bar = tuple(data['last_bar']) if data.get('last_bar') is not None else None
+        self.latest = dict(data['latest']) if data['latest'] is not None else None
+        self.bars = data['bars']
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'IndicatorState':
+        """استعادة الحالة من to_dict"""
+        obj = cls()
+        obj._restore(data)
+        obj.checkpoint = data.get('checkpoint')
+        return obj
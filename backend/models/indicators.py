@@ -0,0 +1,321 @@
+"""
+محرك المؤشرات الفنية باستخدام NumPy فقط
+
+يعطي نفس مخرجات سلسلة pandas في StockMLModel (ضمن هامش الدقة العددية)
+لكن بدون إنشاء Series وسيطة لكل عملية:
+- المتوسطات المتحركة عبر المجموع التراكمي (cumsum)
+- EMA عبر حلقة تكرارية بسيطة على قيم float
+- أدنى/أعلى قيمة متحركة بخوارزمية van Herk/Gil-Werman بتكلفة O(n)
+"""
+
+import numpy as np
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# ترتيب الأعمدة كما تضيفها StockMLModel.calculate_technical_indicators
+INDICATOR_COLUMNS = [
+    'rsi', 'macd', 'macd_signal', 'macd_diff',
+    'sma_20', 'sma_50', 'ema_12',
+    'bb_middle', 'bb_upper', 'bb_lower', 'bb_width',
+    'atr', 'volume_ratio', 'price_change', 'price_change_5d',
+    'stoch_k', 'stoch_d', 'adx', 'obv', 'obv_ema',
+    'doji', 'hammer', 'shooting_star',
+    'bullish_engulfing', 'bearish_engulfing',
+    'morning_star', 'evening_star',
+    'support', 'resistance', 'dist_from_support', 'dist_from_resistance',
+    'sr_position', 'near_support', 'near_resistance'
+]
+
+
+# ==================== أدوات أساسية ====================
+
+def shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """إزاحة المصفوفة للأمام (مثل Series.shift) مع NaN في البداية"""
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    """الفرق عن القيمة السابقة (مثل Series.diff)"""
+    return x - shift(x)
+
+
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """مجموع متحرك عبر cumsum - يرجع NaN إذا كانت النافذة ناقصة أو تحتوي NaN"""
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+
+    missing = np.isnan(x)
+    # الطرح من المتوسط يبقي المجموع التراكمي صغيراً فلا تتراكم أخطاء التقريب مع طول السلسلة
+    offset = x[~missing].mean() if not missing.all() else 0.0
+    values = np.where(missing, 0.0, x - offset)
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    cmiss = np.concatenate(([0], np.cumsum(missing)))
+
+    sums = csum[window:] - csum[:-window] + offset * window
+    valid = (cmiss[window:] - cmiss[:-window]) == 0
+    out[window - 1:] = np.where(valid, sums, np.nan)
+    return out
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """متوسط متحرك (مثل rolling(window).mean())"""
+    return rolling_sum(x, window) / window
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """انحراف معياري متحرك بـ ddof=1 (مثل rolling(window).std())"""
+    # الطرح من المتوسط العام يقلل فقدان الدقة في sum(x^2) - sum(x)^2/n
+    finite = x[~np.isnan(x)]
+    centered = x - (finite.mean() if len(finite) else 0.0)
+
+    s1 = rolling_sum(centered, window)
+    s2 = rolling_sum(centered * centered, window)
+    var = (s2 - s1 * s1 / window) / (window - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def _rolling_extreme(x: np.ndarray, window: int, func, fill: float) -> np.ndarray:
+    """أدنى/أعلى قيمة متحركة بخوارزمية van Herk/Gil-Werman (O(n))"""
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+
+    # تقسيم المصفوفة إلى كتل بطول النافذة
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, fill)
+    padded[:n] = x
+    padded = padded.reshape(blocks, window)
+
+    # أفضل قيمة من بداية الكتلة حتى i ومن i حتى نهاية الكتلة
+    prefix = func.accumulate(padded, axis=1).ravel()
+    suffix = func.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    # النافذة [i, i+window-1] تمتد على كتلتين على الأكثر
+    out[window - 1:] = func(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    """أدنى قيمة متحركة (مثل rolling(window).min())"""
+    return _rolling_extreme(x, window, np.minimum, np.inf)
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """أعلى قيمة متحركة (مثل rolling(window).max())"""
+    return _rolling_extreme(x, window, np.maximum, -np.inf)
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """EMA تكراري (مثل ewm(span=span, adjust=False).mean())"""
+    alpha = 2.0 / (span + 1)
+    beta = 1.0 - alpha
+
+    out = []
+    weighted = np.nan
+    old_wt = 1.0
+
+    for value in x.tolist():
+        if weighted != weighted:
+            # لم تبدأ السلسلة بعد (NaN في البداية)
+            if value == value:
+                weighted = value
+        else:
+            old_wt *= beta
+            if value == value:
+                weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+                old_wt = 1.0
+        out.append(weighted)
+
+    return np.array(out, dtype=float)
+
+
+def pct_change(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """نسبة التغير (مثل pct_change(periods))"""
+    return x / shift(x, periods) - 1
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """المدى الحقيقي (أول صف = high - low لأن الإغلاق السابق غير موجود)"""
+    prev_close = shift(close)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+# ==================== سجل الميزات ====================
+#
+# كل ميزة (نهائية أو وسيطة) تُسجَّل مع الميزات/المدخلات التي تعتمد عليها.
+# compute_features يحسب الإغلاق المتعدي (transitive closure) للميزات
+# المطلوبة فقط، فيتناسب زمن الحساب مع ميزات النموذج الفعلية.
+
+PRICE_INPUTS = ('open', 'high', 'low', 'close', 'volume')
+
+FEATURE_REGISTRY: Dict[str, Tuple[Tuple[str, ...], Callable]] = {}
+
+
+def feature(name: str, *deps: str):
+    """تسجيل دالة تحسب الميزة `name` من الميزات `deps` (بالترتيب)"""
+    def decorator(func):
+        FEATURE_REGISTRY[name] = (deps, func)
+        return func
+    return decorator
+
+
+def _flag(x: np.ndarray) -> np.ndarray:
+    return x.astype(np.int64)
+
+
+# RSI
+feature('delta', 'close')(diff)
+feature('rsi_gain', 'delta')(lambda d: rolling_mean(np.where(d > 0, d, 0.0), 14))
+feature('rsi_loss', 'delta')(lambda d: rolling_mean(np.where(d < 0, -d, 0.0), 14))
+feature('rsi', 'rsi_gain', 'rsi_loss')(lambda gain, loss: 100 - (100 / (1 + gain / loss)))
+
+# MACD
+feature('ema_12', 'close')(lambda c: ema(c, 12))
+feature('ema_26', 'close')(lambda c: ema(c, 26))
+feature('macd', 'ema_12', 'ema_26')(lambda e12, e26: e12 - e26)
+feature('macd_signal', 'macd')(lambda m: ema(m, 9))
+feature('macd_diff', 'macd', 'macd_signal')(lambda m, s: m - s)
+
+# Moving Averages
+feature('sma_20', 'close')(lambda c: rolling_mean(c, 20))
+feature('sma_50', 'close')(lambda c: rolling_mean(c, 50))
+
+# Bollinger Bands
+feature('std_20', 'close')(lambda c: rolling_std(c, 20))
+feature('bb_middle', 'sma_20')(lambda m: m)
+feature('bb_upper', 'sma_20', 'std_20')(lambda m, sd: m + sd * 2)
+feature('bb_lower', 'sma_20', 'std_20')(lambda m, sd: m - sd * 2)
+feature('bb_width', 'bb_upper', 'bb_lower', 'sma_20')(lambda u, lo, m: (u - lo) / m)
+
+# ATR
+feature('true_range', 'high', 'low', 'close')(true_range)
+feature('atr', 'true_range')(lambda tr: rolling_mean(tr, 14))
+
+# Volume Ratio
+feature('volume_ratio', 'volume')(lambda v: v / rolling_mean(v, 20))
+
+# Price Changes
+feature('price_change', 'close')(pct_change)
+feature('price_change_5d', 'close')(lambda c: pct_change(c, 5))
+
+# Stochastic Oscillator
+feature('lowest_low_14', 'low')(lambda l: rolling_min(l, 14))
+feature('highest_high_14', 'high')(lambda h: rolling_max(h, 14))
+feature('stoch_k', 'close', 'lowest_low_14', 'highest_high_14')(
+    lambda c, ll, hh: 100 * (c - ll) / (hh - ll))
+feature('stoch_d', 'stoch_k')(lambda k: rolling_mean(k, 3))
+
+
+# ADX
+@feature('adx', 'high', 'low', 'atr')
+def _adx(h, l, atr):
+    plus_dm = diff(h)
+    minus_dm = diff(l)
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm > 0] = 0
+    plus_di = 100 * (rolling_mean(plus_dm, 14) / atr)
+    minus_di = 100 * (rolling_mean(np.abs(minus_dm), 14) / atr)
+    dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return rolling_mean(dx, 14)
+
+
+# OBV
+feature('obv', 'delta', 'volume')(lambda d, v: np.cumsum(np.nan_to_num(np.sign(d) * v, nan=0.0)))
+feature('obv_ema', 'obv')(lambda obv: ema(obv, 20))
+
+# أنماط الشموع اليابانية
+feature('body', 'open', 'close')(lambda o, c: np.abs(c - o))
+feature('upper_shadow', 'open', 'high', 'close')(lambda o, h, c: h - np.fmax(c, o))
+feature('lower_shadow', 'open', 'low', 'close')(lambda o, l, c: np.fmin(c, o) - l)
+
+feature('doji', 'body', 'high', 'low')(lambda body, h, l: _flag(body / (h - l + 0.001) < 0.1))
+feature('hammer', 'open', 'close', 'body', 'upper_shadow', 'lower_shadow')(
+    lambda o, c, body, us, ls: _flag((ls > body * 2) & (us < body * 0.5) & (c > o)))
+feature('shooting_star', 'open', 'close', 'body', 'upper_shadow', 'lower_shadow')(
+    lambda o, c, body, us, ls: _flag((us > body * 2) & (ls < body * 0.5) & (c < o)))
+
+
+@feature('bullish_engulfing', 'open', 'close')
+def _bullish_engulfing(o, c):
+    o1, c1 = shift(o), shift(c)
+    return _flag((c1 < o1) & (c > o) & (o < c1) & (c > o1))
+
+
+@feature('bearish_engulfing', 'open', 'close')
+def _bearish_engulfing(o, c):
+    o1, c1 = shift(o), shift(c)
+    return _flag((c1 > o1) & (c < o) & (o > c1) & (c < o1))
+
+
+@feature('star_setup', 'body')
+def _star_setup(body):
+    """شمعة أولى كبيرة (أكبر من متوسط 10) تليها شمعة صغيرة - مشتركة بين نجمتي الصباح والمساء"""
+    body1, body2 = shift(body), shift(body, 2)
+    return (body2 > rolling_mean(body2, 10)) & (body1 < body2 * 0.5)
+
+
+@feature('morning_star', 'open', 'close', 'star_setup')
+def _morning_star(o, c, setup):
+    o2, c2 = shift(o, 2), shift(c, 2)
+    return _flag((c2 < o2) & setup & (c > o) & (c > (o2 + c2) / 2))
+
+
+@feature('evening_star', 'open', 'close', 'star_setup')
+def _evening_star(o, c, setup):
+    o2, c2 = shift(o, 2), shift(c, 2)
+    return _flag((c2 > o2) & setup & (c < o) & (c < (o2 + c2) / 2))
+
+
+# مستويات الدعم والمقاومة
+feature('support', 'low')(lambda l: rolling_min(l, 20))
+feature('resistance', 'high')(lambda h: rolling_max(h, 20))
+feature('dist_from_support', 'close', 'support')(lambda c, s: ((c - s) / s) * 100)
+feature('dist_from_resistance', 'close', 'resistance')(lambda c, r: ((r - c) / c) * 100)
+feature('sr_position', 'close', 'support', 'resistance')(lambda c, s, r: (c - s) / (r - s + 0.001))
+feature('near_support', 'dist_from_support')(lambda d: _flag(d < 2))
+feature('near_resistance', 'dist_from_resistance')(lambda d: _flag(d < 2))
+
+
+def resolve_features(features: Iterable[str]) -> List[str]:
+    """ترتيب طوبولوجي للإغلاق المتعدي للميزات المطلوبة (بدون مدخلات الأسعار)"""
+    order: List[str] = []
+    visited = set()
+
+    def visit(name):
+        if name in visited or name in PRICE_INPUTS:
+            return
+        if name not in FEATURE_REGISTRY:
+            raise KeyError(f"Unknown feature: {name}")
+        visited.add(name)
+        for dep in FEATURE_REGISTRY[name][0]:
+            visit(dep)
+        order.append(name)
+
+    for name in features:
+        visit(name)
+    return order
+
+
+def compute_features(inputs: Dict[str, np.ndarray], features: Iterable[str]) -> Dict[str, np.ndarray]:
+    """حساب الميزات المطلوبة واعتمادياتها فقط - يرجع الميزات المطلوبة بنفس ترتيبها"""
+    features = list(features)
+    values = {name: np.asarray(inputs[name], dtype=float) for name in PRICE_INPUTS if name in inputs}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in resolve_features(features):
+            deps, func = FEATURE_REGISTRY[name]
+            values[name] = func(*(values[dep] for dep in deps))
+
+    return {name: values[name] for name in features}
+
+
+def compute_indicators(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                       close: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """حساب جميع المؤشرات الفنية - يرجع dict بنفس ترتيب INDICATOR_COLUMNS"""
+    inputs = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+    return compute_features(inputs, INDICATOR_COLUMNS)
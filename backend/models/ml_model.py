@@ -4,19 +4,38 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
 import joblib
 import os
 from typing import Dict, List, Optional
 
+from backend.models.indicators import compute_features, INDICATOR_COLUMNS, PRICE_INPUTS
+from backend.models.compiled_forest import CompiledForest, compile_model
+from backend.models.prediction_cache import PredictionCache
+from backend.data.feature_store import FEATURE_SET_VERSION
+from backend.strategy import ENTRY_OFFSET_PCT, STOP_PCT, TARGET_PCT
+
 class StockMLModel:
     """فئة نموذج ML للتوصيات"""
     
-    def __init__(self, model_path: str = "/tmp/stock_model.pkl"):
-        """تهيئة النموذج"""
+    def __init__(self, model_path: str = "/tmp/stock_model.pkl",
+                 feature_store=None, prediction_cache: Optional[PredictionCache] = None):
+        """
+        تهيئة النموذج
+        
+        feature_store: مخزن ميزات اختياري (backend.data.feature_store.FeatureStore)
+        يُحدَّث بالشموع الجديدة فقط عند incremental=True
+        prediction_cache: ذاكرة التوصيات (افتراضياً LRU في الذاكرة فقط)
+        """
         self.model_path = model_path
+        self.compiled_path = os.path.splitext(model_path)[0] + ".compiled.npz"
         self.model = None
+        self.compiled = None
+        self.version = None     # إصدار النموذج في ModelRegistry
+        self.metadata = {}
         self.features = None
+        self.feature_store = feature_store
+        self.prediction_cache = prediction_cache if prediction_cache is not None else PredictionCache()
+        self._file_version = None  # بديل للإصدار للنماذج خارج السجل (وقت تعديل الملف)
         
     def load_model(self):
         """تحميل النموذج المدرب"""
@@ -24,7 +43,9 @@ class StockMLModel:
             model_data = joblib.load(self.model_path)
             self.model = model_data['model']
             self.features = model_data['features']
+            self._file_version = f"file-{os.path.getmtime(self.model_path):.0f}"
             print(f"✅ تم تحميل النموذج من {self.model_path}")
+            self.load_compiled()
         else:
             print(f"⚠️  النموذج غير موجود في {self.model_path}")
             
@@ -37,6 +58,40 @@ class StockMLModel:
             }
             joblib.dump(model_data, self.model_path)
             print(f"✅ تم حفظ النموذج في {self.model_path}")
+            self.save_compiled()
+    
+    def load_compiled(self):
+        """تحميل النسخة المُجمَّعة إن وُجدت وكانت أحدث من ملف النموذج"""
+        self.compiled = None
+        if os.path.exists(self.compiled_path) and \
+                os.path.getmtime(self.compiled_path) >= os.path.getmtime(self.model_path):
+            self.compiled = CompiledForest.load(self.compiled_path)
+            print(f"✅ تم تحميل النموذج المُجمَّع من {self.compiled_path}")
+    
+    def save_compiled(self):
+        """تصدير النموذج كأشجار مُجمَّعة (للأنواع المدعومة فقط)"""
+        self.compiled = compile_model(self.model)
+        if self.compiled is not None:
+            self.compiled.save(self.compiled_path)
+            print(f"✅ تم حفظ النموذج المُجمَّع في {self.compiled_path}")
+        elif os.path.exists(self.compiled_path):
+            os.remove(self.compiled_path)
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """احتمالات الفئات (النسخة المُجمَّعة للدفعات الصغيرة إن وُجدت)"""
+        if self._use_compiled(X):
+            return self.compiled.predict_proba(X)
+        return self.model.predict_proba(X)
+    
+    def predict_with_proba(self, X: np.ndarray) -> tuple:
+        """الفئات المتوقعة والاحتمالات باستدعاء واحد"""
+        probabilities = self.predict_proba(X)
+        classes = self.compiled.classes_ if self._use_compiled(X) else self.model.classes_
+        return classes[np.argmax(probabilities, axis=1)], probabilities
+    
+    def _use_compiled(self, X: np.ndarray) -> bool:
+        """المُجمَّع فقط للدفعات التي يكون فيها أسرع لهذا النوع من النماذج (CompiledForest.max_rows)"""
+        return self.compiled is not None and len(X) <= self.compiled.max_rows
     
     def calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
         """حساب RSI"""
@@ -178,8 +233,29 @@ class StockMLModel:
         
         return df
     
-    def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """حساب جميع المؤشرات الفنية"""
+    def calculate_technical_indicators(self, df: pd.DataFrame,
+                                       features: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        حساب المؤشرات الفنية (محرك NumPy - انظر backend/models/indicators.py)
+        
+        features: الميزات المطلوبة فقط (تُحسب مع اعتمادياتها) - الافتراضي كل المؤشرات
+        """
+        if features is None:
+            features = INDICATOR_COLUMNS
+        
+        inputs = {col: df[col].to_numpy(dtype=float) for col in PRICE_INPUTS}
+        indicators = compute_features(inputs, features)
+        
+        # إضافة كل الأعمدة دفعة واحدة بدلاً من عمود بعد عمود
+        base = df.drop(columns=[col for col in indicators if col in df.columns])
+        return pd.concat([base, pd.DataFrame(indicators, index=df.index)], axis=1)
+    
+    def required_features(self) -> List[str]:
+        """الميزات التي يحتاجها النموذج المحمّل + المستخدمة في نص التحليل"""
+        return list(dict.fromkeys(list(self.features or []) + ['rsi', 'macd']))
+    
+    def calculate_technical_indicators_pandas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """حساب جميع المؤشرات الفنية بسلسلة pandas (التطبيق المرجعي للمقارنة)"""
         # RSI
         df['rsi'] = self.calculate_rsi(df['close'])
         
@@ -223,34 +299,76 @@ class StockMLModel:
         
         return df
     
-    def generate_recommendation(self, symbol: str, history: List[Dict]) -> Optional[Dict]:
-        """توليد توصية لسهم"""
+    def prediction_key(self, symbol: str, history: List[Dict],
+                       incremental: bool = False) -> Optional[tuple]:
+        """
+        مفتاح الذاكرة المؤقتة: (symbol, آخر شمعة, الإغلاق, إصدار النموذج, إصدار الميزات, الوضع)
+        
+        الإغلاق جزء من المفتاح لأن شمعة اليوم قد تُحدَّث أكثر من مرة بنفس التاريخ.
+        الوضع (incremental/full) جزء منه لأن الحساب التراكمي قد يختلف في الخانات الأخيرة
+        (أو يبدأ من حالة محفوظة أطول من history) فلا تُرجع توصية وضع لطلب الوضع الآخر.
+        يرجع None للنماذج غير المحفوظة (بدون إصدار)
+        """
+        model_version = self.version or self._file_version
+        if model_version is None or not history:
+            return None
+        last_bar = max(history, key=lambda bar: bar['date'])
+        return (symbol, str(last_bar['date']), float(last_bar['close']),
+                model_version, FEATURE_SET_VERSION, 'incremental' if incremental else 'full')
+    
+    def generate_recommendation(self, symbol: str, history: List[Dict],
+                                incremental: bool = False) -> Optional[Dict]:
+        """
+        توليد توصية لسهم
+        
+        incremental=True: تحديث مخزن الميزات بالشموع الجديدة فقط بدلاً من إعادة حساب
+        كل المؤشرات على كامل history (بدون feature_store يُستخدم الحساب الكامل)
+        
+        إذا لم تتغير آخر شمعة منذ آخر استدعاء تُرجع التوصية المحفوظة مباشرة
+        """
         try:
             if not self.model or not self.features:
                 return None
             
-            # تحويل البيانات إلى DataFrame
-            df = pd.DataFrame(history)
-            df = df.sort_values('date')
+            incremental = incremental and self.feature_store is not None
+            cache_key = self.prediction_key(symbol, history, incremental)
+            if cache_key is not None:
+                cached = self.prediction_cache.get(cache_key)
+                if cached is not None:
+                    return dict(cached)
             
-            # حساب المؤشرات
-            df = self.calculate_technical_indicators(df)
+            latest = None
             
-            # إزالة NaN
-            df = df.dropna()
+            if incremental:
+                latest = self.feature_store.update_latest(symbol, history)
+                # الرجوع للحساب الكامل إذا كانت الحالة لم تكتمل بعد (NaN)
+                if latest is not None and any(latest[f] != latest[f] for f in self.features):
+                    latest = None
             
-            if len(df) < 1:
-                return None
-            
-            # آخر صف
-            latest = df.iloc[-1]
+            if latest is None:
+                # تحويل البيانات إلى DataFrame
+                df = pd.DataFrame(history)
+                df = df.sort_values('date')
+                
+                # حساب ميزات النموذج واعتمادياتها فقط
+                df = self.calculate_technical_indicators(df, self.required_features())
+                
+                # إزالة NaN
+                df = df.dropna()
+                
+                if len(df) < 1:
+                    return None
+                
+                # آخر صف
+                latest = df.iloc[-1]
             
             # استخراج الميزات
-            X = latest[self.features].values.reshape(1, -1)
+            X = np.array([[float(latest[f]) for f in self.features]])
             
             # التنبؤ
-            prediction = self.model.predict(X)[0]
-            probabilities = self.model.predict_proba(X)[0]
+            predictions, probabilities = self.predict_with_proba(X)
+            prediction = str(predictions[0])
+            probabilities = probabilities[0]
             
             # الثقة
             confidence = float(max(probabilities) * 100)
@@ -258,21 +376,21 @@ class StockMLModel:
             # السعر الحالي
             current_price = float(latest['close'])
             
-            # حساب نقاط الدخول والخروج (مُحسّن: 4% هدف, 2% وقف)
+            # حساب نقاط الدخول والخروج (backend/strategy.py: 4% هدف, 2% وقف)
             if prediction == 'buy':
-                entry_price = current_price * 0.99  # 1% أقل
-                target_price = current_price * 1.04  # 4% ربح
-                stop_loss = current_price * 0.98     # 2% وقف خسارة
+                entry_price = current_price * (1 - ENTRY_OFFSET_PCT)  # 1% أقل
+                target_price = current_price * (1 + TARGET_PCT)       # 4% ربح
+                stop_loss = current_price * (1 - STOP_PCT)            # 2% وقف خسارة
             elif prediction == 'sell':
-                entry_price = current_price * 1.01  # 1% أعلى
-                target_price = current_price * 0.96  # 4% ربح
-                stop_loss = current_price * 1.02     # 2% وقف خسارة
+                entry_price = current_price * (1 + ENTRY_OFFSET_PCT)  # 1% أعلى
+                target_price = current_price * (1 - TARGET_PCT)       # 4% ربح
+                stop_loss = current_price * (1 + STOP_PCT)            # 2% وقف خسارة
             else:  # hold
                 entry_price = current_price
                 target_price = current_price
-                stop_loss = current_price * 0.98
+                stop_loss = current_price * (1 - STOP_PCT)
             
-            return {
+            recommendation = {
                 'type': prediction,
                 'entry_price': round(entry_price, 2),
                 'target_price': round(target_price, 2),
@@ -281,6 +399,11 @@ class StockMLModel:
                 'analysis': f"RSI: {latest['rsi']:.1f}, MACD: {latest['macd']:.2f}"
             }
             
+            if cache_key is not None:
+                self.prediction_cache.put(cache_key, recommendation)
+            
+            return dict(recommendation)
+            
         except Exception as e:
             print(f"❌ خطأ في توليد توصية لـ {symbol}: {e}")
             return None
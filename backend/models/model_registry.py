@@ -0,0 +1,182 @@
+"""
+سجل النماذج (Model Registry)
+
+كل نموذج مدرب يُحفظ في مجلد إصدار مستقل:
+    /tmp/model_registry/<version>/model.pkl
+    /tmp/model_registry/<version>/model.compiled.npz
+    /tmp/model_registry/<version>/metadata.json
+والملف CURRENT يحدد الإصدار الفعّال. الكتابة تتم في مجلد مؤقت ثم os.rename
+وتحديث CURRENT عبر os.replace، فلا يرى القارئ نموذجاً نصف مكتوب.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from backend.models.ml_model import StockMLModel
+from backend.data.feature_store import FEATURE_SET_VERSION
+
+DEFAULT_REGISTRY_ROOT = "/tmp/model_registry"
+LEGACY_MODEL_PATH = "/tmp/stock_model.pkl"
+
+
+class ModelRegistry:
+    """سجل إصدارات النماذج على القرص"""
+
+    def __init__(self, root: str = DEFAULT_REGISTRY_ROOT):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def current_file(self) -> str:
+        return os.path.join(self.root, "CURRENT")
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def model_path(self, version: str) -> str:
+        return os.path.join(self._version_dir(version), "model.pkl")
+
+    # ==================== القراءة ====================
+
+    def current_version(self) -> Optional[str]:
+        """الإصدار الفعّال (None إذا كان السجل فارغاً)"""
+        if not os.path.exists(self.current_file):
+            return None
+        with open(self.current_file) as f:
+            version = f.read().strip()
+        return version or None
+
+    def current_mtime(self) -> Optional[float]:
+        """وقت آخر تعديل لـ CURRENT (لمراقبة الإصدارات الجديدة)"""
+        try:
+            return os.path.getmtime(self.current_file)
+        except OSError:
+            return None
+
+    def list_versions(self) -> List[str]:
+        """كل الإصدارات المكتملة (الأقدم أولاً)"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.endswith(".tmp") and os.path.exists(os.path.join(self.root, name, "metadata.json"))
+        )
+
+    def metadata(self, version: str) -> Dict:
+        with open(os.path.join(self._version_dir(version), "metadata.json")) as f:
+            return json.load(f)
+
+    def load(self, version: Optional[str] = None, **model_kwargs) -> StockMLModel:
+        """
+        تحميل إصدار (الفعّال افتراضياً)
+
+        إذا كان السجل فارغاً يُحمَّل النموذج القديم من /tmp/stock_model.pkl
+        model_kwargs: تمرر إلى StockMLModel (مثل feature_store)
+        """
+        version = version or self.current_version()
+
+        if version is None:
+            ml_model = StockMLModel(model_path=LEGACY_MODEL_PATH, **model_kwargs)
+            ml_model.load_model()
+            return ml_model
+
+        ml_model = StockMLModel(model_path=self.model_path(version), **model_kwargs)
+        ml_model.load_model()
+        if ml_model.model is None:
+            raise FileNotFoundError(f"Model version not found: {version}")
+        ml_model.version = version
+        ml_model.metadata = self.metadata(version)
+        return ml_model
+
+    # ==================== التسجيل ====================
+
+    def register(self, ml_model: StockMLModel, metadata: Optional[Dict] = None,
+                 activate: bool = True) -> str:
+        """حفظ نموذج مدرب كإصدار جديد وتفعيله"""
+        version = datetime.now().strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while os.path.exists(self._version_dir(version)):
+            suffix += 1
+            version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}"
+
+        tmp_dir = self._version_dir(version) + ".tmp"
+        os.makedirs(tmp_dir)
+
+        model_path, compiled_path = ml_model.model_path, ml_model.compiled_path
+        ml_model.model_path = os.path.join(tmp_dir, "model.pkl")
+        ml_model.compiled_path = os.path.join(tmp_dir, "model.compiled.npz")
+        try:
+            ml_model.save_model()
+        finally:
+            ml_model.model_path, ml_model.compiled_path = model_path, compiled_path
+
+        metadata = {
+            'version': version,
+            'trained_at': datetime.now().isoformat(),
+            'model_type': type(ml_model.model).__name__,
+            'features': list(ml_model.features),
+            'feature_set_version': FEATURE_SET_VERSION,
+            'compiled': ml_model.compiled is not None,
+            **(metadata or {})
+        }
+        with open(os.path.join(tmp_dir, "metadata.json"), 'w') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+
+        os.rename(tmp_dir, self._version_dir(version))
+        ml_model.version = version
+        ml_model.metadata = metadata
+        print(f"✅ تم تسجيل النموذج كإصدار {version}")
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """تفعيل إصدار (يُستخدم أيضاً للرجوع لإصدار سابق)"""
+        if version not in self.list_versions():
+            raise ValueError(f"Unknown model version: {version}")
+
+        tmp_file = self.current_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(version)
+        os.replace(tmp_file, self.current_file)
+        print(f"✅ الإصدار الفعّال: {version}")
+
+    # ==================== المعاملات ====================
+
+    def hyperparameters_path(self, model_name: str) -> str:
+        return os.path.join(self.root, "hyperparameters", f"{model_name}.json")
+
+    def save_hyperparameters(self, model_name: str, params: Dict, metadata: Optional[Dict] = None) -> str:
+        """
+        حفظ أفضل معاملات نموذج (rf / hgb / xgb / lgb) من البحث - يستخدمها التدريب مع --tuned
+
+        النسخة السابقة تبقى بجانبها باسم <model_name>.<saved_at>.json
+        """
+        path = self.hyperparameters_path(model_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        previous = self.hyperparameters(model_name)
+        if previous is not None:
+            stamp = previous['saved_at'].replace(':', '').replace('-', '')
+            os.replace(path, path[:-len(".json")] + f".{stamp}.json")
+
+        artifact = {
+            'model': model_name,
+            'params': params,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            **(metadata or {})
+        }
+        with open(path + ".tmp", 'w') as f:
+            json.dump(artifact, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(path + ".tmp", path)
+        print(f"✅ تم حفظ معاملات {model_name} في {path}")
+        return path
+
+    def hyperparameters(self, model_name: str) -> Optional[Dict]:
+        """آخر معاملات محفوظة لنموذج (None إن لم يُجرَ بحث)"""
+        path = self.hyperparameters_path(model_name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
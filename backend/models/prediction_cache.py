@@ -0,0 +1,144 @@
+"""
+ذاكرة مؤقتة للتوصيات (Prediction Cache)
+
+المفتاح = (symbol, تاريخ آخر شمعة, سعر الإغلاق الأخير, إصدار النموذج, إصدار الميزات)
+فالسهم الذي لم تتغير بياناته خلال اليوم لا يُعاد حساب مؤشراته ولا التنبؤ له.
+الطبقة الأولى LRU في الذاكرة، والثانية (اختيارية) ملفات JSON على القرص
+مشتركة بين عمليات الـ API و daily_evaluation.py.
+أخطاء القرص لا تُفشل التنبؤ: تُتجاهل ويبقى الحساب كما لو لم توجد ذاكرة مؤقتة.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+PREDICTION_CACHE_DIR = "/tmp/prediction_cache"
+
+
+class PredictionCache:
+    """LRU محدود الحجم مع طبقة قرص اختيارية"""
+
+    def __init__(self, max_size: int = 1024, disk_path: Optional[str] = None,
+                 max_disk_entries: int = 20000):
+        self.max_size = max_size
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+
+    def _disk_file(self, key: Tuple) -> str:
+        digest = hashlib.sha1(json.dumps(key, default=str).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_path, f"{digest}.json")
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        if self.disk_path:
+            try:
+                with open(self._disk_file(key)) as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: Tuple, value: Dict):
+        self._remember(key, value)
+
+        if self.disk_path:
+            try:
+                self._write_disk(key, value)
+            except OSError as e:
+                print(f"⚠️  تعذر حفظ التوصية في {self.disk_path}: {e}")
+                return
+
+            self._disk_writes += 1
+            if self._disk_writes % 100 == 0:
+                self._prune_disk()
+
+    def _write_disk(self, key: Tuple, value: Dict):
+        """كتابة ذرية باسم مؤقت فريد (عدة عمليات وخيوط قد تكتب نفس المفتاح)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp_path, self._disk_file(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _remember(self, key: Tuple, value: Dict):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _prune_disk(self):
+        """حذف أقدم الملفات عند تجاوز max_disk_entries (عملية أخرى قد تحذف نفس الملفات)"""
+        try:
+            names = os.listdir(self.disk_path)
+        except OSError:
+            return
+        files = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.disk_path, name)
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            for name in os.listdir(self.disk_path):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.disk_path, name))
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk': self.disk_path is not None
+            }
@@ -0,0 +1,239 @@
+"""
+أدوات تدريب النماذج
+
+- fit_models_parallel: تدريب عدة نماذج بالتوازي ضمن ميزانية أنوية محددة
+- prefit_voting_classifier: بناء VotingClassifier (soft) من نماذج مدربة مسبقاً
+  بدلاً من VotingClassifier.fit الذي يعيد تدريب كل النماذج من الصفر
+- fit_with_budget: تدريب ضمن مهلة زمنية (TimeBudget) مع early stopping على بيانات تحقق زمنية
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import VotingClassifier
+from sklearn.metrics import log_loss
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import Bunch
+
+
+def core_budget(n_cores: Optional[int] = None) -> int:
+    """عدد الأنوية المتاحة للتدريب (TRAINING_CORES أو كل الأنوية)"""
+    if n_cores is None:
+        n_cores = int(os.environ.get("TRAINING_CORES", "0")) or os.cpu_count() or 1
+    return max(1, n_cores)
+
+
+def split_cores(n_cores: int, n_models: int) -> List[int]:
+    """توزيع الأنوية على النماذج (الباقي للنماذج الأولى)"""
+    base, extra = divmod(n_cores, n_models)
+    return [max(1, base + (1 if i < extra else 0)) for i in range(n_models)]
+
+
+class TimeBudget:
+    """مهلة تدريب بالثواني تشترك فيها كل النماذج (None = بدون حد)"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds if seconds else None
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return float('inf')
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+
+def _lgbm_time_limit(budget: TimeBudget):
+    """callback لـ LightGBM يوقف الـ boosting عند انتهاء المهلة (مع الإبقاء على أفضل جولة)"""
+    import lightgbm
+    best = {'score': None, 'iteration': 0, 'results': None}
+
+    def callback(env):
+        if env.evaluation_result_list:
+            _, _, score, higher_better = env.evaluation_result_list[0]
+            if best['score'] is None or (score > best['score'] if higher_better else score < best['score']):
+                best.update(score=score, iteration=env.iteration, results=env.evaluation_result_list)
+        if budget.expired():
+            if best['score'] is None:
+                raise lightgbm.callback.EarlyStopException(env.iteration, env.evaluation_result_list)
+            raise lightgbm.callback.EarlyStopException(best['iteration'], best['results'])
+
+    callback.order = 40
+    return callback
+
+
+def _xgb_time_limit(budget: TimeBudget):
+    """callback لـ XGBoost يوقف الـ boosting عند انتهاء المهلة"""
+    from xgboost.callback import TrainingCallback
+
+    class TimeLimit(TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            return budget.expired()
+
+    return TimeLimit()
+
+
+def _fit_staged_boosting(model, X, y, eval_set, budget: TimeBudget, rounds: int, step: int):
+    """HistGradientBoosting على مراحل (warm_start) مع early stopping على log loss بيانات التحقق"""
+    max_iter = model.max_iter
+    model.set_params(warm_start=True, early_stopping=False)
+    best_loss, best_iter, n_iter = np.inf, 0, 0
+    while True:
+        n_iter = min(max_iter, n_iter + step)
+        model.set_params(max_iter=n_iter)
+        model.fit(X, y)
+        if eval_set is not None and rounds:
+            loss = log_loss(eval_set[1], model.predict_proba(eval_set[0]), labels=model.classes_)
+            if loss < best_loss:
+                best_loss, best_iter = loss, n_iter
+            elif n_iter - best_iter >= rounds:
+                break
+        if n_iter >= max_iter or budget.expired():
+            break
+    model.set_params(warm_start=False)
+
+
+def _fit_staged_forest(model, X, y, budget: TimeBudget, step: int):
+    """إضافة أشجار الغابة على دفعات حتى n_estimators أو انتهاء المهلة"""
+    n_estimators = model.n_estimators
+    step = max(step, n_estimators // 10)
+    model.set_params(warm_start=True)
+    n_trees = 0
+    while True:
+        n_trees = min(n_estimators, n_trees + step)
+        model.set_params(n_estimators=n_trees)
+        model.fit(X, y)
+        if n_trees >= n_estimators or budget.expired():
+            break
+    model.set_params(warm_start=False)
+
+
+def fit_with_budget(model, X, y, eval_set: Optional[Tuple] = None, budget: Optional[TimeBudget] = None,
+                    early_stopping_rounds: int = 20, step: int = 25):
+    """
+    تدريب نموذج واحد ضمن المهلة مع early stopping
+
+    eval_set: (X_val, y_val) بيانات تحقق لاحقة زمنياً لبيانات التدريب، أو None
+    - LightGBM / XGBoost: callback يوقف الـ boosting عند انتهاء المهلة + early stopping
+    - HistGradientBoosting: مراحل من `step` جولة مع early stopping على log loss
+      (كل مرحلة تعيد حساب تنبؤات الجولات السابقة، فالمراحل الصغيرة أبطأ)
+    - RandomForest / ExtraTrees: الأشجار على دفعات حتى n_estimators أو انتهاء المهلة
+    النموذج يبقى صالحاً دائماً (دفعة/جولة واحدة على الأقل)
+    """
+    budget = budget or TimeBudget()
+    rounds = early_stopping_rounds if eval_set is not None else 0
+    name = type(model).__name__
+
+    if budget.deadline is None and not rounds:
+        model.fit(X, y)
+    elif name == 'LGBMClassifier':
+        import lightgbm
+        callbacks = [_lgbm_time_limit(budget)]
+        if rounds:
+            callbacks.append(lightgbm.early_stopping(rounds, verbose=False))
+        model.fit(X, y, eval_set=[eval_set] if rounds else None, callbacks=callbacks)
+    elif name == 'XGBClassifier':
+        model.set_params(early_stopping_rounds=rounds or None, callbacks=[_xgb_time_limit(budget)])
+        try:
+            model.fit(X, y, eval_set=[eval_set] if rounds else None, verbose=False)
+        finally:
+            # أفضل جولة محفوظة في الـ booster - المعاملات تعود لتبقى صالحة للتدريب التزايدي والحفظ
+            model.set_params(early_stopping_rounds=None, callbacks=None)
+    elif name == 'HistGradientBoostingClassifier':
+        _fit_staged_boosting(model, X, y, eval_set, budget, rounds, step)
+    elif name in ('RandomForestClassifier', 'ExtraTreesClassifier') and budget.deadline is not None:
+        _fit_staged_forest(model, X, y, budget, step)
+    else:
+        model.fit(X, y)
+    return model
+
+
+def model_iterations(model) -> Optional[int]:
+    """عدد الأشجار/الجولات المستخدمة فعلياً في التنبؤ"""
+    name = type(model).__name__
+    if name == 'LGBMClassifier':
+        return model.best_iteration_ or model.booster_.current_iteration()
+    if name == 'XGBClassifier':
+        try:
+            return model.best_iteration + 1
+        except AttributeError:
+            return model.get_booster().num_boosted_rounds()
+    if name == 'HistGradientBoostingClassifier':
+        return model.n_iter_
+    if hasattr(model, 'estimators_') and name != 'VotingClassifier':
+        return len(model.estimators_)
+    return None
+
+
+def fit_models_parallel(models: Dict, X, y, targets: Optional[Dict] = None,
+                        n_cores: Optional[int] = None, eval_set: Optional[Tuple] = None,
+                        eval_targets: Optional[Dict] = None, budget: Optional[TimeBudget] = None,
+                        early_stopping_rounds: int = 20) -> Tuple[Dict, Dict[str, float]]:
+    """
+    تدريب النماذج معاً، كل نموذج بـ n_jobs من حصته في ميزانية الأنوية
+
+    models: {name: estimator}
+    targets: أهداف بديلة لبعض النماذج (مثل الأرقام لـ XGBoost) {name: y}
+    eval_set / eval_targets: بيانات التحقق لـ early stopping (بنفس شكل X, y / targets)
+    budget: مهلة مشتركة - كل النماذج تتوقف عند انتهائها
+    يعمل في threads: مكتبات الأشجار تحرر GIL أثناء التدريب فلا تُنسخ البيانات
+    يرجع (النماذج المدربة, زمن تدريب كل نموذج بالثواني)
+    """
+    targets = targets or {}
+    eval_targets = eval_targets or {}
+    n_cores = core_budget(n_cores)
+    names = list(models)
+    n_workers = min(len(names), n_cores)
+
+    for name, cores in zip(names, split_cores(n_cores, len(names))):
+        if 'n_jobs' in models[name].get_params():
+            models[name].set_params(n_jobs=cores)
+
+    def fit(name):
+        start = time.perf_counter()
+        model_eval_set = None
+        if eval_set is not None:
+            model_eval_set = (eval_set[0], eval_targets.get(name, eval_set[1]))
+        fit_with_budget(models[name], X, targets.get(name, y), eval_set=model_eval_set,
+                        budget=budget, early_stopping_rounds=early_stopping_rounds)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        timings = dict(zip(names, executor.map(fit, names)))
+
+    return models, timings
+
+
+def prefit_voting_classifier(estimators: List[Tuple[str, object]],
+                             weights: Optional[List[float]] = None) -> VotingClassifier:
+    """
+    VotingClassifier (soft) من نماذج مدربة على نفس الفئات - بدون إعادة تدريب
+
+    مكافئ لـ VotingClassifier.fit (الذي يدرب نسخاً جديدة على الفئات المُرمّزة)
+    لأن ترتيب أعمدة predict_proba هو نفس ترتيب classes_ المرتبة
+    """
+    classes = estimators[0][1].classes_
+    for name, estimator in estimators:
+        if not np.array_equal(estimator.classes_, classes):
+            raise ValueError(f"Estimator '{name}' was trained on different classes")
+
+    ensemble = VotingClassifier(estimators=estimators, voting='soft', weights=weights)
+    ensemble.le_ = LabelEncoder().fit(classes)
+    ensemble.classes_ = ensemble.le_.classes_
+    ensemble.estimators_ = [estimator for _, estimator in estimators]
+    ensemble.named_estimators_ = Bunch(**dict(estimators))
+    return ensemble
+
+
+def print_timings(timings: Dict[str, float], models: Optional[Dict] = None):
+    """طباعة زمن تدريب كل نموذج (وعدد الأشجار/الجولات إن مُررت النماذج)"""
+    print("\n⏱️  زمن التدريب:")
+    for name, seconds in timings.items():
+        iterations = model_iterations(models[name]) if models and name in models else None
+        suffix = f"  ({iterations} شجرة/جولة)" if iterations else ""
+        print(f"  {name:<10} {seconds:>8.2f} s{suffix}")
@@ -0,0 +1,203 @@
+"""
+التحقق الزمني (Walk-Forward) للنماذج
+
+التقسيم العشوائي (train_test_split) يضع أياماً من المستقبل في التدريب، والهدف
+future_return يغطي 5 أيام قادمة، فتتسرب معلومات الاختبار للتدريب.
+هنا تُقسم البيانات حسب التاريخ:
+- التدريب دائماً قبل فترة الاختبار
+- purge: حذف آخر `horizon` يوم من التدريب (أهدافها تتداخل مع فترة الاختبار)
+- embargo: فجوة إضافية بالأيام بين التدريب والاختبار
+
+مصفوفات الميزات تُحفظ مرة واحدة على القرص (npy) وتقرأها عمليات التقييم
+المتوازية عبر mmap بدلاً من نسخ البيانات لكل عملية.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score
+
+from backend.models.training import core_budget, fit_models_parallel, prefit_voting_classifier, split_cores
+
+CV_CACHE_DIR = "/tmp/cv_cache"
+
+
+# ==================== التقسيم ====================
+
+def purged_walk_forward(dates, n_folds: int = 5, horizon: int = 5, embargo: int = 0,
+                        test_fraction: float = 0.5) -> List[Dict]:
+    """
+    فترات اختبار متتالية تغطي آخر `test_fraction` من الأيام، والتدريب يتوسع
+    مع كل fold (كل الأيام قبل فترة الاختبار ناقص horizon + embargo يوم)
+
+    dates: تاريخ كل صف (أي ترتيب)
+    يرجع قائمة dicts: fold, train_idx, test_idx, train_end, test_start, test_end
+    """
+    dates = pd.to_datetime(np.asarray(dates)).values
+    unique_dates = np.unique(dates)
+    day_index = np.searchsorted(unique_dates, dates)
+
+    n_days = len(unique_dates)
+    first_test_day = int(n_days * (1 - test_fraction))
+    boundaries = np.linspace(first_test_day, n_days, n_folds + 1).astype(int)
+    gap = horizon + embargo
+
+    folds = []
+    for fold, (test_start, test_end) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+        train_end = test_start - gap
+        if train_end <= 0 or test_end <= test_start:
+            continue
+        folds.append({
+            'fold': fold,
+            'train_idx': np.flatnonzero(day_index < train_end),
+            'test_idx': np.flatnonzero((day_index >= test_start) & (day_index < test_end)),
+            'train_end': str(unique_dates[train_end - 1])[:10],
+            'test_start': str(unique_dates[test_start])[:10],
+            'test_end': str(unique_dates[test_end - 1])[:10]
+        })
+    return folds
+
+
+def time_holdout_split(dates, test_fraction: float = 0.2, horizon: int = 5, embargo: int = 0):
+    """
+    بديل train_test_split العشوائي: آخر test_fraction من الأيام للاختبار
+    مع حذف horizon + embargo يوم قبلها من التدريب. يرجع (train_idx, test_idx)
+    """
+    fold = purged_walk_forward(dates, n_folds=1, horizon=horizon, embargo=embargo,
+                               test_fraction=test_fraction)[0]
+    return fold['train_idx'], fold['test_idx']
+
+
+# ==================== ذاكرة المصفوفات ====================
+
+class FoldCache:
+    """
+    X (float32) و y (أكواد int8) على القرص مرة واحدة لكل dataset
+
+    المفتاح بصمة المحتوى، فتشغيل التقييم مرة أخرى على نفس البيانات لا يعيد الكتابة
+    """
+
+    def __init__(self, X: np.ndarray, y_codes: np.ndarray, classes: Sequence[str],
+                 root: str = CV_CACHE_DIR):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        y_codes = np.ascontiguousarray(y_codes, dtype=np.int8)
+
+        digest = hashlib.sha1()
+        digest.update(X.tobytes())
+        digest.update(y_codes.tobytes())
+        digest.update(",".join(classes).encode('utf-8'))
+        self.path = os.path.join(root, digest.hexdigest()[:12])
+        self.classes = np.asarray(classes)
+
+        if not os.path.exists(self.path):
+            tmp_path = self.path + f".tmp{os.getpid()}"
+            os.makedirs(tmp_path, exist_ok=True)
+            np.save(os.path.join(tmp_path, "X.npy"), X)
+            np.save(os.path.join(tmp_path, "y.npy"), y_codes)
+            np.save(os.path.join(tmp_path, "classes.npy"), self.classes)
+            try:
+                os.rename(tmp_path, self.path)
+            except OSError:
+                shutil.rmtree(tmp_path, ignore_errors=True)  # عملية أخرى كتبته أولاً
+
+    @staticmethod
+    def load(path: str):
+        """(X, y_codes, classes) - X و y للقراءة فقط عبر mmap"""
+        return (np.load(os.path.join(path, "X.npy"), mmap_mode='r'),
+                np.load(os.path.join(path, "y.npy"), mmap_mode='r'),
+                np.load(os.path.join(path, "classes.npy")))
+
+
+# ==================== التقييم ====================
+
+def _evaluate_fold(task) -> List[Dict]:
+    """تدريب وتقييم كل النماذج على fold واحد (يعمل في عملية منفصلة)"""
+    cache_path, fold, model_factory, numeric_targets, ensemble_members, n_cores = task
+    X, y_codes, classes = FoldCache.load(cache_path)
+
+    X_train, X_test = X[fold['train_idx']], X[fold['test_idx']]
+    y_train_codes = np.asarray(y_codes[fold['train_idx']])
+    y_train, y_test = classes[y_train_codes], classes[y_codes[fold['test_idx']]]
+
+    models = model_factory()
+    models, fit_seconds = fit_models_parallel(
+        models, X_train, y_train,
+        targets={name: y_train_codes.astype(int) for name in numeric_targets if name in models},
+        n_cores=n_cores
+    )
+    if ensemble_members:
+        models['ensemble'] = prefit_voting_classifier([(name, models[name]) for name in ensemble_members])
+        fit_seconds['ensemble'] = 0.0
+
+    rows = []
+    for name, model in models.items():
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        predict_seconds = time.perf_counter() - start
+        if name in numeric_targets:
+            y_pred = classes[np.asarray(y_pred, dtype=int)]
+
+        rows.append({
+            'fold': fold['fold'],
+            'model': name,
+            'train_end': fold['train_end'],
+            'test_start': fold['test_start'],
+            'test_end': fold['test_end'],
+            'n_train': len(fold['train_idx']),
+            'n_test': len(fold['test_idx']),
+            'accuracy': accuracy_score(y_test, y_pred),
+            'f1_macro': f1_score(y_test, y_pred, average='macro', zero_division=0),
+            'precision_buy': precision_score(y_test, y_pred, labels=['buy'], average='macro', zero_division=0),
+            'precision_sell': precision_score(y_test, y_pred, labels=['sell'], average='macro', zero_division=0),
+            'fit_seconds': fit_seconds[name],
+            'predict_seconds': predict_seconds
+        })
+    return rows
+
+
+def run_walk_forward(X: np.ndarray, y, dates, model_factory: Callable[[], Dict],
+                     n_folds: int = 5, horizon: int = 5, embargo: int = 0,
+                     test_fraction: float = 0.5, numeric_targets: Sequence[str] = (),
+                     ensemble_members: Sequence[str] = (), n_workers: Optional[int] = None,
+                     n_cores: Optional[int] = None, cache_root: str = CV_CACHE_DIR) -> pd.DataFrame:
+    """
+    تقييم Walk-Forward لكل النماذج في model_factory
+
+    model_factory: دالة (على مستوى الوحدة) ترجع {name: estimator} جديدة
+    numeric_targets: نماذج تُدرب على أكواد الفئات (مثل XGBoost)
+    ensemble_members: نماذج يُبنى منها Voting (soft) بدون إعادة تدريب
+    n_workers: عدد الـ folds المتوازية (ميزانية الأنوية تُقسم بينها)
+    يرجع DataFrame بصف لكل (fold, model)
+    """
+    y = pd.Categorical(np.asarray(y))
+    cache = FoldCache(X, y.codes, list(y.categories), root=cache_root)
+    folds = purged_walk_forward(dates, n_folds=n_folds, horizon=horizon, embargo=embargo,
+                                test_fraction=test_fraction)
+
+    n_cores = core_budget(n_cores)
+    n_workers = max(1, min(n_workers or n_cores, len(folds), n_cores))
+    worker_cores = split_cores(n_cores, n_workers)
+    tasks = [(cache.path, fold, model_factory, tuple(numeric_targets), tuple(ensemble_members),
+              worker_cores[i % n_workers]) for i, fold in enumerate(folds)]
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_evaluate_fold, tasks))
+    else:
+        results = [_evaluate_fold(task) for task in tasks]
+
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def summarize_walk_forward(results: pd.DataFrame) -> pd.DataFrame:
+    """متوسط وانحراف المقاييس لكل نموذج عبر الـ folds"""
+    metrics = ['accuracy', 'f1_macro', 'precision_buy', 'precision_sell', 'fit_seconds']
+    summary = results.groupby('model', sort=False)[metrics].agg(['mean', 'std'])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    return summary
@@ -0,0 +1,209 @@
+"""
+محاكاة محفظة لكل السوق برأس مال محدود (بدلاً من تقييم كل صفقة مستقلة)
+
+الأحداث في كومة (heapq) مرتبة زمنياً:
+- دخول: إشارة buy/sell بإغلاق يومها (نفس قواعد simulate_trades)، وفي نفس اليوم بالأعلى ثقة أولاً
+- خروج: الهدف أو الوقف أو انتهاء المدة (الشمعة محسوبة مسبقاً بـ resolve_exits لكل الإشارات معاً)
+  ويُنفذ قبل دخول نفس اليوم فيحرر رأس المال له
+كل دخول مقبول يضيف حدث خروجه للكومة: O(الأحداث × log الأحداث) مهما كان عدد الأسهم والسنوات.
+
+القيود: حجم الصفقة نسبة من قيمة المحفظة (بسعر الدخول) ولا يتجاوز النقد المتاح، أقصى عدد صفقات
+مفتوحة، وصفقة واحدة لكل سهم. البيع على المكشوف يحجز قيمته من النقد مثل الشراء.
+منحنى القيمة يومي بإغلاق كل سهم مفتوح (آخر إغلاق متاح إذا لم يتداول السهم ذلك اليوم).
+"""
+
+import heapq
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from backend.backtesting import resolve_exits
+from backend.data.labels import BUY, HOLD
+from backend.strategy import (COMMISSION_PCT, HOLD_DAYS, MAX_POSITIONS, MIN_CONFIDENCE, POSITION_PCT,
+                              STOP_PCT, TARGET_PCT, WARMUP_BARS)
+
+# ترتيب الأحداث في نفس اليوم: الخروج قبل الدخول
+EXIT, ENTRY = 0, 1
+
+TRADE_COLUMNS = ['symbol', 'type', 'entry_date', 'exit_date', 'entry_price', 'exit_price', 'shares',
+                 'profit_loss', 'confidence', 'exit_reason']
+
+
+def _signals(panel, hold_days: int, min_confidence: float, warmup: int) -> np.ndarray:
+    """فهارس (في panel) أيام الإشارات القابلة للتداول - نفس signal_rows لكل سهم"""
+    sizes = np.diff(panel.bounds)
+    position = np.arange(len(panel)) - np.repeat(panel.bounds[:-1], sizes)
+    remaining = np.repeat(sizes, sizes) - position - 1
+    keep = ((panel.prediction != HOLD) & (position >= warmup) & (remaining >= hold_days) &
+            (panel.confidence >= min_confidence))
+    return np.flatnonzero(keep)
+
+
+def _open_days(trades: pd.DataFrame):
+    """(الصفقة، اليوم) لكل يوم مفتوح: من يوم الدخول حتى ما قبل يوم الخروج"""
+    first = trades['entry_day'].to_numpy()
+    lengths = trades['exit_day'].to_numpy() - first
+    owner = np.repeat(np.arange(len(trades)), lengths)
+    return owner, first[owner] + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+def _equity_curve(panel, calendar: np.ndarray, day_of_row: np.ndarray, symbol_of_row: np.ndarray,
+                  trades: pd.DataFrame, cash_days: np.ndarray, cash_values: np.ndarray,
+                  initial_capital: float):
+    """
+    قيمة المحفظة بإغلاق كل يوم: النقد + (المحجوز + الربح غير المحقق) لكل صفقة مفتوحة
+
+    يرجع (القيمة، قيمة الصفقات المفتوحة بسعر الدخول) لكل يوم في calendar
+    """
+    n_days = len(calendar)
+    cash = np.full(n_days, np.nan)
+    cash[cash_days] = cash_values  # آخر حدث في اليوم يكتب فوق ما قبله
+    cash = pd.Series(cash).ffill().fillna(initial_capital).to_numpy()
+
+    open_value, exposure = np.zeros(n_days), np.zeros(n_days)
+    if len(trades):
+        owner, days = _open_days(trades)
+
+        # آخر شمعة للسهم في ذلك اليوم أو قبله (الصفوف مرتبة حسب (symbol, date) فالمفتاح تصاعدي)
+        key = symbol_of_row.astype(np.int64) * (n_days + 1) + day_of_row
+        symbols = trades['symbol_index'].to_numpy()[owner]
+        rows = np.searchsorted(key, symbols * (n_days + 1) + days, side='right') - 1
+
+        entry = trades['entry_price'].to_numpy()[owner]
+        shares = trades['shares'].to_numpy()[owner]
+        direction = np.where(trades['type'].to_numpy()[owner] == 'buy', 1.0, -1.0)
+        np.add.at(open_value, days, shares * entry + direction * shares * (panel.close[rows] - entry))
+        np.add.at(exposure, days, shares * entry)
+
+    equity = pd.Series(cash + open_value, index=pd.DatetimeIndex(calendar.astype('datetime64[ns]')),
+                       name='equity')
+    return equity, exposure
+
+
+def _summary(equity: pd.Series, exposure: np.ndarray, fills: pd.DataFrame, rejected: Dict[str, int],
+             initial_capital: float) -> Dict:
+    final = float(equity.iloc[-1]) if len(equity) else initial_capital
+    returns = equity.pct_change().dropna().to_numpy() if len(equity) > 1 else np.zeros(1)
+    drawdown = (equity / equity.cummax() - 1).min() * 100 if len(equity) else 0.0
+    years = max((equity.index[-1] - equity.index[0]).days / 365.25, 1e-9) if len(equity) > 1 else 0
+    total = len(fills)
+    summary = {
+        'initial_capital': initial_capital,
+        'final_equity': final,
+        'total_return_pct': (final / initial_capital - 1) * 100,
+        'cagr_pct': ((final / initial_capital) ** (1 / years) - 1) * 100 if years and final > 0 else 0.0,
+        'sharpe_ratio': float(np.mean(returns) / np.std(returns) * np.sqrt(252)) if np.std(returns) > 0 else 0.0,
+        'max_drawdown_pct': float(drawdown),
+        'total_trades': total,
+        'successful_trades': int((fills['exit_reason'] == 'target').sum()) if total else 0,
+        'failed_trades': int((fills['exit_reason'] == 'stop').sum()) if total else 0,
+        'win_rate': float((fills['profit_loss'] > 0).mean() * 100) if total else 0.0,
+        'total_profit': float(fills['profit_loss'].sum()) if total else 0.0,
+        'avg_exposure_pct': float(np.mean(exposure / equity.to_numpy()) * 100) if len(equity) else 0.0,
+        'signals': total + sum(rejected.values())
+    }
+    summary.update({f'rejected_{reason}': count for reason, count in rejected.items()})
+    return summary
+
+
+def simulate_portfolio(panel, initial_capital: float = 100000, position_pct: float = POSITION_PCT,
+                       max_positions: int = MAX_POSITIONS, target_pct: float = TARGET_PCT,
+                       stop_pct: float = STOP_PCT, hold_days: int = HOLD_DAYS,
+                       min_confidence: float = MIN_CONFIDENCE, commission_pct: float = COMMISSION_PCT,
+                       warmup: int = WARMUP_BARS) -> Dict:
+    """
+    محاكاة المحفظة على تنبؤات كل الأسهم (backend/strategy_sweep.PredictionPanel)
+
+    position_pct: حجم الصفقة من قيمة المحفظة الدفترية (النقد + المحجوز للصفقات المفتوحة)
+    commission_pct: عمولة كل طرف (دخول وخروج) من قيمة الصفقة
+    يرجع {'trades': الصفقات المنفذة، 'equity': القيمة اليومية، 'summary': المقاييس}
+    """
+    calendar, day_of_row = np.unique(panel.date, return_inverse=True)
+    symbol_of_row = np.repeat(np.arange(len(panel.symbols)), np.diff(panel.bounds))
+
+    rows = _signals(panel, hold_days, min_confidence, warmup)
+    if len(rows) == 0:
+        # لا إشارات (أو لا تنبؤات أصلاً): رأس المال ثابت بلا صفقات
+        equity = pd.Series(float(initial_capital), index=pd.DatetimeIndex(calendar.astype('datetime64[ns]')),
+                           name='equity')
+        rejected = {'max_positions': 0, 'symbol_open': 0, 'cash': 0}
+        trades = pd.DataFrame(columns=TRADE_COLUMNS)
+        return {'trades': trades, 'equity': equity,
+                'summary': _summary(equity, np.zeros(len(calendar)), trades, rejected, initial_capital)}
+
+    is_buy = panel.prediction[rows] == BUY
+    exits = resolve_exits(panel.high, panel.low, panel.close, rows, is_buy, target_pct, stop_pct, hold_days)
+    exit_reason = np.where(exits['hit_target'], 'target', np.where(exits['hit_stop'], 'stop', 'time'))
+    entry_day, exit_day = day_of_row[rows], day_of_row[exits['exit_bar']]
+    symbol, confidence = symbol_of_row[rows], panel.confidence[rows]
+
+    # (اليوم، النوع، -الثقة، التسلسل، الإشارة) - التسلسل يحسم التعادل بترتيب الأسهم
+    events = [(int(entry_day[k]), ENTRY, -float(confidence[k]), k, k) for k in range(len(rows))]
+    heapq.heapify(events)
+    sequence = len(rows)
+
+    cash, invested = float(initial_capital), 0.0
+    open_symbols, shares_of, reserved_of = set(), {}, {}
+    rejected = {'max_positions': 0, 'symbol_open': 0, 'cash': 0}
+    fills, cash_days, cash_values = [], [], []
+
+    while events:
+        day, kind, _, _, k = heapq.heappop(events)
+        entry = float(exits['entry_price'][k])
+
+        if kind == EXIT:
+            shares, reserved = shares_of.pop(k), reserved_of.pop(k)
+            exit_price = float(exits['exit_price'][k])
+            gross = shares * (exit_price - entry) if is_buy[k] else shares * (entry - exit_price)
+            cash += reserved + gross - commission_pct * shares * exit_price
+            invested -= reserved
+            open_symbols.discard(symbol[k])
+            fills.append((k, shares, gross - commission_pct * shares * (entry + exit_price)))
+        else:
+            if len(open_symbols) >= max_positions:
+                rejected['max_positions'] += 1
+                continue
+            if symbol[k] in open_symbols:
+                rejected['symbol_open'] += 1
+                continue
+            budget = min((cash + invested) * position_pct, cash / (1 + commission_pct))
+            shares = int(budget // entry)
+            if shares < 1:
+                rejected['cash'] += 1
+                continue
+            reserved = shares * entry
+            cash -= reserved + commission_pct * reserved
+            invested += reserved
+            open_symbols.add(symbol[k])
+            shares_of[k], reserved_of[k] = shares, reserved
+            heapq.heappush(events, (int(exit_day[k]), EXIT, 0.0, sequence, k))
+            sequence += 1
+
+        cash_days.append(day)
+        cash_values.append(cash)
+
+    index = np.array([k for k, _, _ in fills], dtype=np.int64)
+    trades = pd.DataFrame({
+        'symbol': np.asarray(panel.symbols, dtype=object)[symbol[index]] if len(index) else [],
+        'symbol_index': symbol[index],
+        'type': np.where(is_buy[index], 'buy', 'sell'),
+        'entry_date': calendar[entry_day[index]].astype('datetime64[ns]'),
+        'exit_date': calendar[exit_day[index]].astype('datetime64[ns]'),
+        'entry_day': entry_day[index],
+        'exit_day': exit_day[index],
+        'entry_price': exits['entry_price'][index],
+        'exit_price': exits['exit_price'][index],
+        'shares': np.array([s for _, s, _ in fills], dtype=np.int64),
+        'profit_loss': np.array([p for _, _, p in fills], dtype=np.float64),
+        'confidence': confidence[index],
+        'exit_reason': exit_reason[index]
+    }).sort_values(['entry_day', 'exit_day'], kind='stable').reset_index(drop=True)
+
+    equity, exposure = _equity_curve(panel, calendar, day_of_row, symbol_of_row, trades,
+                                     np.asarray(cash_days, dtype=np.int64), np.asarray(cash_values),
+                                     initial_capital)
+    summary = _summary(equity, exposure, trades, rejected, initial_capital)
+
+    return {'trades': trades.drop(columns=['symbol_index', 'entry_day', 'exit_day']),
+            'equity': equity, 'summary': summary}
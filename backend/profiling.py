@@ -0,0 +1,226 @@
+"""
+قياس مراحل سكربتات التدريب والـ Backtesting
+
+لكل مرحلة: زمن فعلي (wall) + زمن المعالج (CPU للعملية والعمليات الفرعية) + ذروة الذاكرة (RSS)
+وتقرير JSON لكل تشغيل في /tmp/profiles لمقارنة التشغيلات (python_scripts/compare_profiles.py)
+
+الاستخدام:
+    profiler = RunProfiler("train_model", args=vars(args)).start()
+    with stage("fetch"):
+        ...
+    profiler.save()
+
+stage / profiled بدون RunProfiler فعّال لا تفعل شيئاً، فيمكن استخدامها داخل الوحدات المشتركة.
+المرحلة المتكررة (داخل حلقة) تُجمع في صف واحد مع عدد الاستدعاءات،
+والمراحل المتداخلة تُسمى بالمسار (مثل backtest/predict).
+ذروة الذاكرة لكل مرحلة من VmHWM في Linux (يُعاد ضبطها عند بداية كل مرحلة عبر clear_refs)،
+وفي الأنظمة الأخرى ذروة العملية منذ البداية (ru_maxrss).
+"""
+
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+PROFILE_DIR = "/tmp/profiles"
+
+_active: Optional['RunProfiler'] = None
+
+
+# ==================== الذاكرة ====================
+
+def _read_status_kb(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _maxrss_mb(who=resource.RUSAGE_SELF) -> float:
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss / 1024 ** 2 if sys.platform == 'darwin' else maxrss / 1024  # bytes في macOS
+
+
+def current_rss_mb() -> Optional[float]:
+    kb = _read_status_kb("VmRSS")
+    return kb / 1024 if kb is not None else None
+
+
+def peak_rss_mb() -> float:
+    kb = _read_status_kb("VmHWM")
+    return kb / 1024 if kb is not None else _maxrss_mb()
+
+
+def _reset_peak() -> bool:
+    """إعادة ضبط ذروة الذاكرة إلى الاستهلاك الحالي (Linux فقط)"""
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _cpu_seconds():
+    times = os.times()
+    return times.user + times.system, times.children_user + times.children_system
+
+
+# ==================== التقرير ====================
+
+class RunProfiler:
+    """قياسات تشغيل واحد لسكربت"""
+
+    def __init__(self, name: str, root: str = PROFILE_DIR, args: Optional[Dict] = None):
+        self.name = name
+        self.root = root
+        self.args = args or {}
+        self.meta: Dict = {}
+        self.stages: Dict[str, Dict] = {}
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._started_at = datetime.now()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = _cpu_seconds()
+        self._run_peak = peak_rss_mb()  # clear_refs يعيد ضبط ru_maxrss أيضاً، فتُحفظ ذروة التشغيل هنا
+
+    def start(self) -> 'RunProfiler':
+        """تفعيل المقياس لـ stage / profiled"""
+        global _active
+        _active = self
+        return self
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        """قياس مرحلة (info: معلومات إضافية مثل عدد الصفوف)"""
+        if threading.get_ident() != self._thread:
+            yield  # المراحل من threads أخرى تتداخل في زمن المعالج والذاكرة - انظر record
+            return
+
+        path = "/".join([frame['path'] for frame in self._stack[-1:]] + [name])
+        self._run_peak = max(self._run_peak, peak_rss_mb())
+        if self._stack:
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak_rss_mb())
+        reset = _reset_peak()
+        frame = {'path': path, 'peak': peak_rss_mb() if reset else 0.0}
+        self._stack.append(frame)
+
+        rss_start = current_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start, children_start = _cpu_seconds()
+        try:
+            yield
+        finally:
+            cpu_end, children_end = _cpu_seconds()
+            wall = time.perf_counter() - wall_start
+            self._stack.pop()
+            peak = max(frame['peak'], peak_rss_mb())
+            self._run_peak = max(self._run_peak, peak)
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            rss_end = current_rss_mb()
+
+            self._add(path, wall, cpu_end - cpu_start, children_end - children_start, peak,
+                      (rss_end - rss_start) if rss_start is not None and rss_end is not None else None,
+                      info)
+
+    def record(self, name: str, wall_seconds: float, **info):
+        """مرحلة مقاسة خارجياً (مثل زمن كل نموذج في fit_models_parallel) - الزمن الفعلي فقط"""
+        prefix = self._stack[-1]['path'] + "/" if self._stack else ""
+        self._add(prefix + name, wall_seconds, None, None, None, None, info)
+
+    def _add(self, path, wall, cpu, children_cpu, peak, rss_delta, info):
+        entry = self.stages.setdefault(path, {
+            'stage': path, 'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': None,
+            'children_cpu_seconds': None, 'peak_rss_mb': None, 'rss_delta_mb': None
+        })
+        entry['calls'] += 1
+        entry['wall_seconds'] += wall
+        for key, value in (('cpu_seconds', cpu), ('children_cpu_seconds', children_cpu),
+                           ('rss_delta_mb', rss_delta)):
+            if value is not None:
+                entry[key] = (entry[key] or 0.0) + value
+        if peak is not None:
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, peak)
+        entry.update(info)
+
+    def report(self) -> Dict:
+        cpu_end, children_end = _cpu_seconds()
+        return {
+            'run': self.name,
+            'started_at': self._started_at.isoformat(timespec='seconds'),
+            'wall_seconds': time.perf_counter() - self._start_wall,
+            'cpu_seconds': cpu_end - self._start_cpu[0],
+            'children_cpu_seconds': children_end - self._start_cpu[1],
+            'peak_rss_mb': max(self._run_peak, peak_rss_mb()),
+            'children_peak_rss_mb': _maxrss_mb(resource.RUSAGE_CHILDREN),
+            'cpu_count': os.cpu_count(),
+            'pid': os.getpid(),
+            'args': self.args,
+            'meta': self.meta,
+            'stages': list(self.stages.values())
+        }
+
+    def print_summary(self):
+        print("\n⏱️  المراحل:")
+        print(f"  {'stage':<28} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'peak MB':>9}")
+        for entry in self.stages.values():
+            cpu = entry['cpu_seconds']
+            peak = entry['peak_rss_mb']
+            print(f"  {entry['stage']:<28} {entry['calls']:>5} {entry['wall_seconds']:>9.2f} "
+                  f"{cpu if cpu is not None else float('nan'):>9.2f} "
+                  f"{peak if peak is not None else float('nan'):>9.1f}")
+
+    def save(self) -> str:
+        """كتابة التقرير وإيقاف التفعيل - يرجع مسار الملف"""
+        global _active
+        if _active is self:
+            _active = None
+
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, f"{self.name}_{self._started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path + ".tmp", 'w') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2, default=str)
+        os.replace(path + ".tmp", path)
+
+        self.print_summary()
+        print(f"📄 تقرير القياس: {path}")
+        return path
+
+
+# ==================== الواجهة العامة ====================
+
+@contextmanager
+def stage(name: str, **info):
+    """مرحلة في المقياس الفعّال (لا شيء إن لم يوجد)"""
+    if _active is None:
+        yield
+    else:
+        with _active.stage(name, **info):
+            yield
+
+
+def record_stage(name: str, wall_seconds: float, **info):
+    if _active is not None:
+        _active.record(name, wall_seconds, **info)
+
+
+def profiled(name: Optional[str] = None):
+    """decorator: قياس الدالة كمرحلة (الاسم الافتراضي اسم الدالة)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+"""
+معاملات استراتيجية التوصيات (مصدر واحد للقيم)
+
+تستخدمها StockMLModel.generate_recommendation و daily_evaluation.py و Backtester،
+و python_scripts/strategy_sweep.py يقارن بدائلها على تنبؤات محفوظة قبل تغييرها هنا.
+"""
+
+TARGET_PCT = 0.04        # الهدف (4%)
+STOP_PCT = 0.02          # وقف الخسارة (2%)
+ENTRY_OFFSET_PCT = 0.01  # الدخول أقل من الإغلاق للشراء (أعلى للبيع) بـ 1%
+MIN_CONFIDENCE = 55      # أقل ثقة (%) لحفظ التوصية أو دخول الصفقة
+HOLD_DAYS = 5            # مدة الصفقة في Backtesting (شموع)
+WARMUP_BARS = 50         # شموع قبل أول إشارة في Backtesting
+
+# محاكاة المحفظة (backend/portfolio.py)
+POSITION_PCT = 0.10      # حجم الصفقة من قيمة المحفظة
+MAX_POSITIONS = 10       # أقصى عدد صفقات مفتوحة
+COMMISSION_PCT = 0.0     # عمولة كل طرف من قيمة الصفقة
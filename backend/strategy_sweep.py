@@ -0,0 +1,242 @@
+"""
+مقارنة معاملات الاستراتيجية (الهدف، الوقف، أقل ثقة، مدة الصفقة) على تنبؤات محفوظة
+
+التنبؤ هو الجزء المكلف في Backtesting ولا يتغير بتغير المعاملات، لذلك:
+- PredictionPanel: تنبؤات وثقة كل (سهم، يوم) مرة واحدة مع high/low/close، في مصفوفات متصلة
+  مرتبة حسب (symbol, date) وتُحفظ npz في /tmp/backtest_predictions (مفتاحها إصدار النموذج والأسعار)
+- sweep_strategies: كل التوليفات على المصفوفات بنفس قواعد backend/backtesting.py:
+  أعلى/أدنى سعر تراكمي للشموع التالية يُحسب مرة واحدة لأطول مدة، أول شمعة يتحقق فيها كل
+  مستوى هدف/وقف مرة واحدة لكل مستوى، وكل مدة وكل عتبة ثقة مجرد قناع على هذه المصفوفات
+
+التوليفة الافتراضية (backend/strategy.py) تعطي نفس مقاييس Backtester تماماً.
+"""
+
+import hashlib
+import itertools
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backend.data.labels import BUY, HOLD, TARGET_LABELS
+from backend.strategy import HOLD_DAYS, MIN_CONFIDENCE, STOP_PCT, TARGET_PCT, WARMUP_BARS
+
+PANEL_DIR = "/tmp/backtest_predictions"
+
+RANK_METRICS = ['sharpe_ratio', 'total_profit_pct', 'avg_profit_pct', 'success_rate', 'max_drawdown']
+
+
+class PredictionPanel:
+    """
+    تنبؤات كل الأسهم في مصفوفات متصلة (صف لكل سهم × يوم)
+
+    bounds: حدود كل سهم (السهم i في الصفوف bounds[i]:bounds[i+1])
+    prediction: أكواد int8 بترتيب TARGET_LABELS، confidence: الثقة بالنسبة المئوية
+    """
+
+    ARRAYS = ['date', 'high', 'low', 'close', 'prediction', 'confidence']
+
+    def __init__(self, symbols: Sequence[str], bounds: np.ndarray, date: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, prediction: np.ndarray, confidence: np.ndarray):
+        self.symbols = list(symbols)
+        self.bounds = np.asarray(bounds, dtype=np.int64)
+        self.date = np.asarray(date, dtype='datetime64[D]')
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.prediction = np.asarray(prediction, dtype=np.int8)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.close)
+
+    @classmethod
+    def from_scored(cls, scored: Sequence[Tuple[str, pd.DataFrame]]) -> 'PredictionPanel':
+        """من [(symbol, score_symbol(...))] بترتيب الصفقات المطلوب"""
+        frames = [df for _, df in scored]
+        sizes = [len(df) for df in frames]
+        if not frames:
+            empty = np.empty(0)
+            return cls([], np.zeros(1), empty, empty, empty, empty, empty, empty)
+
+        data = pd.concat(frames, ignore_index=True)
+        codes = {label: code for code, label in enumerate(TARGET_LABELS)}
+        return cls(
+            [symbol for symbol, _ in scored], np.r_[0, np.cumsum(sizes)],
+            pd.to_datetime(data['date']).to_numpy().astype('datetime64[D]'),
+            data['high'].to_numpy(), data['low'].to_numpy(), data['close'].to_numpy(),
+            data['prediction'].astype(str).map(codes).to_numpy(), data['confidence'].to_numpy()
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, symbols=np.array(self.symbols), bounds=self.bounds,
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PredictionPanel':
+        with np.load(path) as data:
+            return cls(data['symbols'].tolist(), data['bounds'], *(data[name] for name in cls.ARRAYS))
+
+
+def panel_path(model_version: str, prices: pd.DataFrame, root: str = PANEL_DIR) -> str:
+    """ملف التنبؤات لإصدار النموذج وهذه الأسعار بالضبط (أي شمعة جديدة = ملف جديد)"""
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(prices[['symbol', 'date', 'high', 'low', 'close']],
+                                             index=False).to_numpy().tobytes())
+    return os.path.join(root, f"{model_version or 'model'}_{digest.hexdigest()[:16]}.npz")
+
+
+def load_or_score(prices: pd.DataFrame, ml_model, feature_store, symbols: Optional[Sequence[str]] = None,
+                  n_workers: Optional[int] = None, root: str = PANEL_DIR) -> Tuple[PredictionPanel, bool]:
+    """
+    التنبؤات من الملف إن وُجد، وإلا score_parallel ثم الحفظ
+
+    يرجع (panel, من الملف؟)
+    """
+    from backend.backtesting import score_parallel
+
+    path = panel_path(ml_model.version, prices, root)
+    if os.path.exists(path):
+        return PredictionPanel.load(path), True
+
+    panel = PredictionPanel.from_scored(score_parallel(prices, ml_model, feature_store, symbols, n_workers))
+    panel.save(path)
+    return panel, False
+
+
+# ==================== المقاييس ====================
+
+def _summary(profit: np.ndarray, pct: np.ndarray, hit_target: np.ndarray, hit_stop: np.ndarray) -> Dict:
+    """نفس summarize_trades على مصفوفات صفقات توليفة واحدة (بترتيب الصفقات)"""
+    total = len(profit)
+    successful = int(hit_target.sum())
+    failed = int(hit_stop.sum())
+    # التراكمي بالترتيب مثل sum في summarize_trades (np.sum يجمع بترتيب مختلف)
+    cumulative_profit = np.cumsum(profit)
+    summary = {
+        'total_trades': total,
+        'successful_trades': successful,
+        'failed_trades': failed,
+        'neutral_trades': total - successful - failed,
+        'total_profit': float(cumulative_profit[-1]) if total else 0.0,
+        'success_rate': np.nan,
+        'avg_profit': np.nan,
+        'total_profit_pct': 0.0,
+        'avg_profit_pct': np.nan,
+        'sharpe_ratio': np.nan,
+        'max_drawdown': np.nan
+    }
+    if total == 0:
+        return summary
+
+    cumulative_returns = np.cumsum(pct)
+    std = np.std(pct)
+    summary.update({
+        'success_rate': successful / total * 100,
+        'avg_profit': summary['total_profit'] / total,
+        'total_profit_pct': float(cumulative_returns[-1]),
+        'avg_profit_pct': float(np.mean(pct)),
+        'sharpe_ratio': float((np.mean(pct) / std) * np.sqrt(252)) if std > 0 else 0.0,
+        'max_drawdown': float(np.min(cumulative_returns - np.maximum.accumulate(cumulative_returns)))
+    })
+    return summary
+
+
+# ==================== المقارنة ====================
+
+def _first_hit(reached: np.ndarray) -> np.ndarray:
+    """أول شمعة تحقق فيها المستوى (المسار تراكمي فيكفي عدّ الشموع قبله)"""
+    return (~reached).sum(axis=1)
+
+
+def sweep_strategies(panel: PredictionPanel, targets: Sequence[float] = (TARGET_PCT,),
+                     stops: Sequence[float] = (STOP_PCT,), thresholds: Sequence[float] = (MIN_CONFIDENCE,),
+                     holds: Sequence[int] = (HOLD_DAYS,), warmup: int = WARMUP_BARS) -> pd.DataFrame:
+    """
+    مقاييس Backtester لكل توليفة (target_pct, stop_pct, min_confidence, hold_days)
+
+    الإشارات والخروج بنفس قواعد simulate_trades لكل سهم، والصفقات بترتيب الأسهم في panel
+    يرجع صفاً لكل توليفة (بدون ترتيب - rank_strategies)
+    """
+    holds = sorted(set(int(h) for h in holds))
+    max_hold = holds[-1]
+
+    # موقع كل صف داخل سهمه وعدد الشموع بعده (لا تتجاوز الصفقة آخر بيانات السهم)
+    sizes = np.diff(panel.bounds)
+    position = np.arange(len(panel)) - np.repeat(panel.bounds[:-1], sizes)
+    remaining = np.repeat(sizes, sizes) - position - 1
+
+    candidates = ((panel.prediction != HOLD) & (position >= warmup) & (remaining >= holds[0]) &
+                  (panel.confidence >= min(thresholds)))
+    rows = np.flatnonzero(candidates)
+    entry, confidence, remaining = panel.close[rows], panel.confidence[rows], remaining[rows]
+    buy = panel.prediction[rows] == BUY
+
+    # الشموع t+1 .. t+max_hold؛ ما بعد حدود السهم لا يُستخدم لأي مدة صالحة
+    # (الحشو بآخر قيمة لا NaN: يبقى المسار التراكمي رتيباً فيصح عدّ الشموع في _first_hit)
+    def windows(values):
+        padded = np.concatenate([values[1:], np.full(max_hold, values[-1] if len(values) else np.nan)])
+        return sliding_window_view(padded, max_hold)[rows]
+
+    running_high = np.maximum.accumulate(windows(panel.high), axis=1)
+    running_low = np.minimum.accumulate(windows(panel.low), axis=1)
+
+    def first_hits(level_pct, favourable):
+        """أول شمعة لمستوى الهدف (favourable) أو الوقف لكل صفقة"""
+        up = (entry * (1 + level_pct))[:, None]
+        down = (entry * (1 - level_pct))[:, None]
+        if favourable:
+            reached = np.where(buy[:, None], running_high >= up, running_low <= down)
+        else:
+            reached = np.where(buy[:, None], running_low <= down, running_high >= up)
+        return _first_hit(reached)
+
+    target_prices = {t: np.where(buy, entry * (1 + t), entry * (1 - t)) for t in targets}
+    stop_prices = {s: np.where(buy, entry * (1 - s), entry * (1 + s)) for s in stops}
+    target_bars = {t: first_hits(t, True) for t in targets}
+    stop_bars = {s: first_hits(s, False) for s in stops}
+    last_close = {h: panel.close[np.minimum(rows + h, len(panel) - 1)] for h in holds}
+    confidence_masks = {th: confidence >= th for th in thresholds}
+
+    results = []
+    for hold in holds:
+        valid = remaining >= hold
+        for target, stop in itertools.product(targets, stops):
+            # الهدف أولاً إذا تحقق الاثنان في نفس الشمعة
+            hit_target = (target_bars[target] < hold) & (target_bars[target] <= stop_bars[stop])
+            hit_stop = ~hit_target & (stop_bars[stop] < hold)
+            exit_price = np.where(hit_target, target_prices[target],
+                                  np.where(hit_stop, stop_prices[stop], last_close[hold]))
+            profit = np.where(buy, exit_price - entry, entry - exit_price)
+            pct = (profit / entry) * 100
+
+            for threshold in thresholds:
+                keep = valid & confidence_masks[threshold]
+                row = {'target_pct': target, 'stop_pct': stop, 'min_confidence': threshold, 'hold_days': hold}
+                row.update(_summary(profit[keep], pct[keep], hit_target[keep], hit_stop[keep]))
+                results.append(row)
+
+    return pd.DataFrame(results)
+
+
+def rank_strategies(results: pd.DataFrame, by: str = 'sharpe_ratio', min_trades: int = 30) -> pd.DataFrame:
+    """
+    ترتيب التوليفات تنازلياً حسب by (max_drawdown: الأقل هبوطاً أولاً)
+
+    التوليفات بأقل من min_trades صفقة في آخر الجدول بدون رتبة (مقاييسها غير موثوقة)
+    is_default: التوليفة الحالية في backend/strategy.py
+    """
+    table = results.copy()
+    table['is_default'] = ((table['target_pct'] == TARGET_PCT) & (table['stop_pct'] == STOP_PCT) &
+                           (table['min_confidence'] == MIN_CONFIDENCE) & (table['hold_days'] == HOLD_DAYS))
+    eligible = table['total_trades'] >= min_trades
+    ranked = table[eligible].sort_values([by, 'total_trades'], ascending=False, kind='stable')
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    rest = table[~eligible].sort_values('total_trades', ascending=False, kind='stable')
+    rest.insert(0, 'rank', pd.NA)
+    return pd.concat([ranked, rest], ignore_index=True)
@@ -13,6 +13,21 @@ sys.path.insert(0, parent_dir)
 
 from backend.data.database import Database
 
+# تجميع كامل لجدول trade_performance بنفس أعمدة trade_performance_summary
+PERFORMANCE_SUMMARY_SELECT = """
+SELECT 
+    COUNT(*) as total_trades,
+    COALESCE(SUM(CASE WHEN status = 'target_hit' THEN 1 ELSE 0 END), 0) as successful_trades,
+    COALESCE(SUM(CASE WHEN status = 'stop_loss_hit' THEN 1 ELSE 0 END), 0) as failed_trades,
+    COALESCE(SUM(CASE WHEN status = 'closed_neutral' THEN 1 ELSE 0 END), 0) as neutral_trades,
+    COALESCE(SUM(profit_loss_percent), 0) as sum_return,
+    COALESCE(SUM(profit_loss_percent * profit_loss_percent), 0) as sum_sq_return,
+    COALESCE(SUM(profit_loss), 0) as total_profit_loss,
+    MAX(profit_loss_percent) as best_trade,
+    MIN(profit_loss_percent) as worst_trade
+FROM trade_performance
+"""
+
 class TradeEvaluator:
     def __init__(self, db: Database):
         self.db = db
@@ -47,11 +62,16 @@ class TradeEvaluator:
             'target_hit': 0,
             'stop_loss_hit': 0,
             'closed_neutral': 0,
+            'failed': 0,
             'trades': []
         }
         
         for trade in open_trades:
             evaluation = self._evaluate_single_trade(trade)
+            if not evaluation['saved']:
+                # لم تُحفظ (المعاملة أُلغيت): تبقى التوصية غير مُقيّمة وتُعاد غداً
+                results['failed'] += 1
+                continue
             results['trades'].append(evaluation)
             results['total'] += 1
             
@@ -116,8 +136,8 @@ class TradeEvaluator:
         profit_loss = exit_price - entry_price
         profit_loss_percent = round(((exit_price - entry_price) / entry_price) * 100, 2)
         
-        # حفظ النتيجة في قاعدة البيانات
-        self._save_trade_performance(
+        # حفظ النتيجة وتحديث الإحصائيات التراكمية وحالة التوصية في معاملة واحدة
+        saved = self._save_trade_performance(
             recommendation_id=trade['id'],
             symbol=symbol,
             entry_price=entry_price,
@@ -133,16 +153,6 @@ class TradeEvaluator:
             lowest=lowest
         )
         
-        # تحديث حالة التوصية
-        update_query = """
-        UPDATE recommendations
-        SET is_evaluated = 1,
-            evaluation_date = NOW(),
-            status = 'evaluated'
-        WHERE id = %s
-        """
-        self.db.execute_query(update_query, (trade['id'],))
-        
         return {
             'recommendation_id': trade['id'],
             'symbol': symbol,
@@ -156,12 +166,17 @@ class TradeEvaluator:
             'highest': highest,
             'lowest': lowest,
             'entry_date': entry_date,
-            'exit_date': datetime.now()
+            'exit_date': datetime.now(),
+            'saved': saved
         }
     
-    def _save_trade_performance(self, **kwargs):
+    def _save_trade_performance(self, **kwargs) -> bool:
         """
         حفظ أداء الصفقة في قاعدة البيانات
+        
+        يتم إدراج الصفقة وتحديث trade_performance_summary ووسم التوصية
+        كمُقيّمة في نفس المعاملة حتى تبقى الإحصائيات مطابقة للجدول
+        يرجع False إذا أُلغيت المعاملة (مثلاً لم يُطبق add_performance_summary.sql)
         """
         query = """
         INSERT INTO trade_performance (
@@ -171,21 +186,127 @@ class TradeEvaluator:
         ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         
-        self.db.execute_query(query, (
-            kwargs['recommendation_id'],
-            kwargs['symbol'],
-            kwargs['entry_price'],
-            kwargs['target_price'],
-            kwargs['stop_loss'],
-            kwargs['exit_price'],
-            kwargs['entry_date'],
-            kwargs['exit_date'],
-            kwargs['status'],
-            kwargs['profit_loss'],
-            kwargs['profit_loss_percent'],
-            kwargs['highest'],
-            kwargs['lowest']
-        ))
+        # القيم تُقرّب كما تُخزّن في trade_performance (DECIMAL بمنزلتين)
+        profit_loss = round(kwargs['profit_loss'], 2)
+        profit_loss_percent = round(kwargs['profit_loss_percent'], 2)
+        status = kwargs['status']
+        
+        summary_query = """
+        INSERT INTO trade_performance_summary (
+            id, total_trades, successful_trades, failed_trades, neutral_trades,
+            sum_return, sum_sq_return, total_profit_loss, best_trade, worst_trade
+        ) VALUES (1, 1, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        total_trades = total_trades + 1,
+        successful_trades = successful_trades + VALUES(successful_trades),
+        failed_trades = failed_trades + VALUES(failed_trades),
+        neutral_trades = neutral_trades + VALUES(neutral_trades),
+        sum_return = sum_return + VALUES(sum_return),
+        sum_sq_return = sum_sq_return + VALUES(sum_sq_return),
+        total_profit_loss = total_profit_loss + VALUES(total_profit_loss),
+        best_trade = GREATEST(COALESCE(best_trade, VALUES(best_trade)), VALUES(best_trade)),
+        worst_trade = LEAST(COALESCE(worst_trade, VALUES(worst_trade)), VALUES(worst_trade))
+        """
+        
+        update_query = """
+        UPDATE recommendations
+        SET is_evaluated = 1,
+            evaluation_date = NOW(),
+            status = 'evaluated'
+        WHERE id = %s
+        """
+        
+        saved = self.db.execute_transaction([
+            (query, (
+                kwargs['recommendation_id'],
+                kwargs['symbol'],
+                kwargs['entry_price'],
+                kwargs['target_price'],
+                kwargs['stop_loss'],
+                kwargs['exit_price'],
+                kwargs['entry_date'],
+                kwargs['exit_date'],
+                kwargs['status'],
+                kwargs['profit_loss'],
+                kwargs['profit_loss_percent'],
+                kwargs['highest'],
+                kwargs['lowest']
+            )),
+            (summary_query, (
+                1 if status == 'target_hit' else 0,
+                1 if status == 'stop_loss_hit' else 0,
+                1 if status == 'closed_neutral' else 0,
+                profit_loss_percent,
+                profit_loss_percent * profit_loss_percent,
+                profit_loss,
+                profit_loss_percent,
+                profit_loss_percent
+            )),
+            (update_query, (kwargs['recommendation_id'],))
+        ])
+        if not saved:
+            print(f"⚠️  لم يُحفظ تقييم التوصية {kwargs['recommendation_id']} ({kwargs['symbol']}) - "
+                  f"تأكد من تطبيق add_performance_summary.sql")
+        return saved
+    
+    def rebuild_performance_summary(self) -> bool:
+        """
+        إعادة بناء trade_performance_summary من كامل جدول trade_performance
+        (تُستخدم بعد إضافة بيانات قديمة أو تعديلها يدوياً)
+        """
+        query = f"""
+        REPLACE INTO trade_performance_summary (
+            id, total_trades, successful_trades, failed_trades, neutral_trades,
+            sum_return, sum_sq_return, total_profit_loss, best_trade, worst_trade
+        )
+        SELECT 1, s.* FROM ({PERFORMANCE_SUMMARY_SELECT}) s
+        """
+        return self.db.execute_query(query)
+    
+    def get_overall_performance(self) -> Dict:
+        """
+        جلب الأداء الإجمالي من صف الإحصائيات التراكمية (O(1))
+        """
+        stats = self.db.fetch_one("SELECT * FROM trade_performance_summary WHERE id = 1")
+        
+        if stats is None:
+            # الجدول لم يُبنَ بعد - الرجوع للتجميع الكامل
+            stats = self.db.fetch_one(PERFORMANCE_SUMMARY_SELECT)
+        
+        total = int(stats['total_trades']) if stats and stats['total_trades'] else 0
+        
+        if total == 0:
+            return {
+                "total_trades": 0,
+                "successful_trades": 0,
+                "failed_trades": 0,
+                "neutral_trades": 0,
+                "success_rate": 0.0,
+                "avg_return": 0.0,
+                "return_std": 0.0,
+                "total_profit_loss": 0.0,
+                "best_trade": 0.0,
+                "worst_trade": 0.0
+            }
+        
+        successful = int(stats['successful_trades'] or 0)
+        sum_return = float(stats['sum_return'] or 0)
+        sum_sq_return = float(stats['sum_sq_return'] or 0)
+        avg_return = sum_return / total
+        variance = max(sum_sq_return / total - avg_return ** 2, 0.0)
+        
+        return {
+            "total_trades": total,
+            "successful_trades": successful,
+            "failed_trades": int(stats['failed_trades'] or 0),
+            "neutral_trades": int(stats['neutral_trades'] or 0),
+            "success_rate": round((successful / total) * 100, 2),
+            "avg_return": avg_return,
+            "return_std": variance ** 0.5,
+            "total_profit_loss": float(stats['total_profit_loss'] or 0),
+            "best_trade": float(stats['best_trade']) if stats['best_trade'] is not None else 0.0,
+            "worst_trade": float(stats['worst_trade']) if stats['worst_trade'] is not None else 0.0
+        }
     
     def get_daily_stats(self, date=None) -> Dict:
         """
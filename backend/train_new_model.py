@@ -16,6 +16,7 @@ from datetime import datetime, timedelta
 sys.path.append('/home/ubuntu/projects/saudi-stock-ai/backend')
 
 from data.database import Database
+from data.price_snapshot import PriceSnapshot
 
 def calculate_technical_indicators(df):
     """حساب المؤشرات الفنية"""
@@ -82,15 +83,8 @@ def prepare_training_data(db):
     """تحضير بيانات التدريب"""
     print("📊 جلب البيانات التاريخية من قاعدة البيانات...")
     
-    # جلب آخر 500 يوم من البيانات لكل سهم
-    query = """
-    SELECT symbol, date, open, high, low, close, volume
-    FROM historicalDailyPrices
-    WHERE date >= DATE_SUB(CURDATE(), INTERVAL 500 DAY)
-    ORDER BY symbol, date
-    """
-    
-    df = pd.read_sql(query, db.connection)
+    # آخر 500 يوم من النسخة المحلية (يُجلب من قاعدة البيانات الجديد/المعدل فقط)
+    df = PriceSnapshot().load_prices(db, days=500)
     
     if df.empty:
         print("❌ لا توجد بيانات تاريخية!")
@@ -25,9 +25,11 @@ CREATE TABLE IF NOT EXISTS historicalDailyPrices (
     low DECIMAL(10,2),
     close DECIMAL(10,2),
     volume BIGINT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     UNIQUE KEY unique_symbol_date (symbol, date),
     INDEX idx_symbol (symbol),
     INDEX idx_date (date),
+    INDEX idx_updated_at (updated_at),
     FOREIGN KEY (symbol) REFERENCES stocks(symbol) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """
 Backtesting للنموذج على البيانات التاريخية
+التنبؤ لكل صفوف السهم دفعة واحدة، والصفقات من محرك NumPy (backend/backtesting.py)
+--parallel: كل أسهم السوق (بدلاً من أول 30) موزعة على عمليات تقرأ الأسعار من ذاكرة مشتركة
+المحفظة: نفس الإشارات برأس المال الأولي وحجم الصفقة وأقصى عدد صفقات مفتوحة (backend/portfolio.py)
 """
 
 import sys
+import argparse
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 
 import os
@@ -13,184 +16,127 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
+from backend.backtesting import score_parallel, score_symbol, scored_trades, summarize_trades
 from backend.data.database import Database
-from backend.models.ml_model import StockMLModel
+from backend.models.model_registry import ModelRegistry
+from backend.data.feature_store import FeatureStore
+from backend.data.training_dataset import compact_prices
+from backend.portfolio import simulate_portfolio
+from backend.profiling import RunProfiler, stage
+from backend.strategy import MAX_POSITIONS, POSITION_PCT
+from backend.strategy_sweep import PredictionPanel
 
 class Backtester:
     """فئة Backtesting"""
     
-    def __init__(self, db, ml_model):
+    def __init__(self, db, ml_model, feature_store=None):
         self.db = db
         self.ml_model = ml_model
+        self.feature_store = feature_store or FeatureStore()
         self.trades = []
+        self.scored = []       # [(symbol, تنبؤات كل يوم)] لمحاكاة المحفظة
+        self.portfolio = None  # نتيجة simulate_portfolio
         
-    def backtest(self, start_date, end_date, initial_capital=100000):
-        """تشغيل Backtesting"""
+    def backtest(self, start_date, end_date, initial_capital=100000, parallel=False, n_workers=None,
+                 position_pct=POSITION_PCT, max_positions=MAX_POSITIONS):
+        """
+        تشغيل Backtesting
+
+        parallel: كل أسهم السوق - الأسعار باستعلام واحد في ذاكرة مشتركة والأسهم موزعة على عمليات
+        (بدونه: أول 30 سهم، استعلام لكل سهم)
+        initial_capital / position_pct / max_positions: محاكاة المحفظة (self.portfolio)
+        الصفقات المرجعة مستقلة (بدون قيود رأس المال) كما كانت
+        """
         print(f"\n📊 Backtesting من {start_date} إلى {end_date}")
         print(f"💰 رأس المال الأولي: {initial_capital:,.2f} ريال")
         print("=" * 70)
         
-        # جلب الأسهم
-        stocks = self.db.get_all_stocks()[:30]
+        if parallel:
+            self._backtest_parallel(n_workers)
+        else:
+            self._backtest_serial()
+        
+        with stage("portfolio"):
+            self.portfolio = simulate_portfolio(PredictionPanel.from_scored(self.scored), initial_capital,
+                                                position_pct=position_pct, max_positions=max_positions)
+        
+        with stage("report"):
+            # النتائج
+            summary = summarize_trades(self.trades)
+            total_trades = summary['total_trades']
+            print(f"\n📊 نتائج Backtesting:")
+            print(f"  ✅ إجمالي الصفقات: {total_trades}")
+            print(f"  🎯 وصلت للهدف: {summary['successful_trades']}")
+            print(f"  ❌ وصلت لوقف الخسارة: {summary['failed_trades']}")
+            print(f"  ⚠️  أغلقت محايدة: {summary['neutral_trades']}")
+        
+            if total_trades > 0:
+                print(f"  📈 نسبة النجاح: {summary['success_rate']:.2f}%")
+                print(f"  💰 إجمالي الربح/الخسارة: {summary['total_profit']:,.2f} ريال")
+                print(f"  📊 متوسط الربح لكل صفقة: {summary['avg_profit']:,.2f} ريال")
+                print(f"  📈 Sharpe Ratio: {summary['sharpe_ratio']:.2f}")
+                print(f"  📉 Max Drawdown: {summary['max_drawdown']:.2f}%")
+        
+            portfolio = self.portfolio['summary']
+            rejected = portfolio['signals'] - portfolio['total_trades']
+            print(f"\n💼 المحفظة ({position_pct*100:g}% لكل صفقة، حتى {max_positions} صفقات مفتوحة):")
+            print(f"  ✅ صفقات منفذة: {portfolio['total_trades']} من {portfolio['signals']} إشارة "
+                  f"({rejected} مرفوضة لقيود رأس المال)")
+            print(f"  💰 القيمة النهائية: {portfolio['final_equity']:,.2f} ريال "
+                  f"({portfolio['total_return_pct']:+.2f}%)")
+            print(f"  📈 Sharpe Ratio (يومي): {portfolio['sharpe_ratio']:.2f}")
+            print(f"  📉 Max Drawdown: {portfolio['max_drawdown_pct']:.2f}%")
+            print(f"  📊 متوسط التعرض: {portfolio['avg_exposure_pct']:.1f}%")
         
-        total_trades = 0
-        successful_trades = 0
-        failed_trades = 0
-        total_profit = 0
+        return self.trades
+
+    def _backtest_serial(self):
+        # جلب الأسهم
+        with stage("fetch"):
+            stocks = self.db.get_all_stocks()[:30]
         
         for stock in stocks:
             symbol = stock['symbol']
             
             try:
                 # جلب البيانات التاريخية
-                history = self.db.get_historical_prices(symbol, limit=500)
-                
-                if len(history) < 100:
-                    continue
-                
-                # تحويل لـ DataFrame
-                df = pd.DataFrame(history)
-                
-                # تحويل Decimal إلى float
-                for col in ['open', 'high', 'low', 'close', 'volume']:
-                    if col in df.columns:
-                        df[col] = df[col].astype(float)
+                with stage("fetch"):
+                    history = self.db.get_historical_prices(symbol, limit=500)
                 
-                df = df.sort_values('date')
-                
-                # حساب المؤشرات
-                df = self.ml_model.calculate_technical_indicators(df)
-                df = df.dropna()
-                
-                if len(df) < 50:
-                    continue
-                
-                # محاكاة التداول
-                for i in range(50, len(df) - 5):
-                    current_row = df.iloc[i]
-                    
-                    # استخراج الميزات
-                    if not self.ml_model.features:
-                        continue
-                    
-                    X = current_row[self.ml_model.features].values.reshape(1, -1)
-                    
-                    # التنبؤ
-                    prediction = self.ml_model.model.predict(X)[0]
-                    confidence = self.ml_model.model.predict_proba(X)[0].max() * 100
-                    
-                    # تجاهل Hold أو ثقة منخفضة (رفع العتبة إلى 55%)
-                    if prediction == 'hold' or confidence < 55:
-                        continue
-                    
-                    # نقاط الدخول والخروج
-                    entry_price = current_row['close']
-                    
-                    # تحسين نقاط الدخول/الخروج (4% هدف, 2% وقف)
-                    if prediction == 'buy':
-                        target_price = entry_price * 1.04
-                        stop_loss = entry_price * 0.98
-                    else:  # sell
-                        target_price = entry_price * 0.96
-                        stop_loss = entry_price * 1.02
-                    
-                    # محاكاة الصفقة (5 أيام)
-                    future_data = df.iloc[i+1:i+6]
-                    
-                    if len(future_data) == 0:
-                        continue
-                    
-                    # تحقق من وصول الهدف أو وقف الخسارة
-                    hit_target = False
-                    hit_stop = False
-                    exit_price = future_data.iloc[-1]['close']
-                    
-                    for _, row in future_data.iterrows():
-                        if prediction == 'buy':
-                            if row['high'] >= target_price:
-                                hit_target = True
-                                exit_price = target_price
-                                break
-                            elif row['low'] <= stop_loss:
-                                hit_stop = True
-                                exit_price = stop_loss
-                                break
-                        else:  # sell
-                            if row['low'] <= target_price:
-                                hit_target = True
-                                exit_price = target_price
-                                break
-                            elif row['high'] >= stop_loss:
-                                hit_stop = True
-                                exit_price = stop_loss
-                                break
-                    
-                    # حساب الربح/الخسارة
-                    if prediction == 'buy':
-                        profit_loss = exit_price - entry_price
-                    else:  # sell
-                        profit_loss = entry_price - exit_price
-                    
-                    profit_loss_percent = (profit_loss / entry_price) * 100
-                    
-                    # حفظ الصفقة
-                    trade = {
-                        'symbol': symbol,
-                        'type': prediction,
-                        'entry_price': entry_price,
-                        'exit_price': exit_price,
-                        'target_price': target_price,
-                        'stop_loss': stop_loss,
-                        'profit_loss': profit_loss,
-                        'profit_loss_percent': profit_loss_percent,
-                        'confidence': confidence,
-                        'hit_target': hit_target,
-                        'hit_stop': hit_stop,
-                        'entry_date': current_row['date'],
-                        'exit_date': future_data.iloc[-1]['date']
-                    }
-                    
-                    self.trades.append(trade)
-                    total_trades += 1
-                    total_profit += profit_loss
-                    
-                    if hit_target:
-                        successful_trades += 1
-                    elif hit_stop:
-                        failed_trades += 1
+                scored = score_symbol(symbol, pd.DataFrame(history), self.ml_model, self.feature_store)
+                if scored is not None:
+                    self.scored.append((symbol, scored))
+                    self.trades.extend(scored_trades(symbol, scored))
                 
             except Exception as e:
                 print(f"⚠️  خطأ في {symbol}: {e}")
                 continue
+    
+    def _backtest_parallel(self, n_workers=None):
+        # آخر 500 شمعة لكل الأسهم باستعلام واحد
+        with stage("fetch"):
+            symbols = [stock['symbol'] for stock in self.db.get_all_stocks()]
+            history = self.db.get_historical_prices_batch(symbols, limit=500)
+            prices = compact_prices([row for symbol in symbols for row in history.get(symbol, [])])
         
-        # النتائج
-        print(f"\n📊 نتائج Backtesting:")
-        print(f"  ✅ إجمالي الصفقات: {total_trades}")
-        print(f"  🎯 وصلت للهدف: {successful_trades}")
-        print(f"  ❌ وصلت لوقف الخسارة: {failed_trades}")
-        print(f"  ⚠️  أغلقت محايدة: {total_trades - successful_trades - failed_trades}")
-        
-        if total_trades > 0:
-            success_rate = (successful_trades / total_trades) * 100
-            print(f"  📈 نسبة النجاح: {success_rate:.2f}%")
-            print(f"  💰 إجمالي الربح/الخسارة: {total_profit:,.2f} ريال")
-            print(f"  📊 متوسط الربح لكل صفقة: {total_profit/total_trades:,.2f} ريال")
-            
-            # حساب Sharpe Ratio
-            returns = [t['profit_loss_percent'] for t in self.trades]
-            sharpe_ratio = (np.mean(returns) / np.std(returns)) * np.sqrt(252) if np.std(returns) > 0 else 0
-            print(f"  📈 Sharpe Ratio: {sharpe_ratio:.2f}")
-            
-            # حساب Max Drawdown
-            cumulative_returns = np.cumsum(returns)
-            running_max = np.maximum.accumulate(cumulative_returns)
-            drawdown = cumulative_returns - running_max
-            max_drawdown = np.min(drawdown)
-            print(f"  📉 Max Drawdown: {max_drawdown:.2f}%")
-        
-        return self.trades
+        print(f"⚡ {len(symbols)} سهم ({len(prices)} شمعة) على {n_workers or os.cpu_count()} عملية...")
+        with stage("backtest", symbols=len(symbols), rows=len(prices)):
+            self.scored = score_parallel(prices, self.ml_model, self.feature_store,
+                                         symbols=symbols, n_workers=n_workers)
+            for symbol, scored in self.scored:
+                self.trades.extend(scored_trades(symbol, scored))
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the current model")
+    parser.add_argument('--parallel', action='store_true', help="كل أسهم السوق بالتوازي")
+    parser.add_argument('--workers', type=int, default=None, help="عدد العمليات (افتراضياً كل الأنوية)")
+    parser.add_argument('--capital', type=float, default=100000, help="رأس المال الأولي للمحفظة")
+    parser.add_argument('--position-pct', type=float, default=POSITION_PCT, help="حجم الصفقة من قيمة المحفظة")
+    parser.add_argument('--max-positions', type=int, default=MAX_POSITIONS, help="أقصى عدد صفقات مفتوحة")
+    args = parser.parse_args(argv)
+    
+    profiler = RunProfiler("backtest_model", args=vars(args)).start()
+    
     print("=" * 70)
     print("🔬 Backtesting نموذج ML")
     print("=" * 70)
@@ -199,8 +145,9 @@ def main():
     
     try:
         # تحميل النموذج
-        ml_model = StockMLModel()
-        ml_model.load_model()
+        with stage("load_model"):
+            ml_model = ModelRegistry().load()
+        profiler.meta['model_version'] = ml_model.version
         
         if not ml_model.model:
             print("❌ النموذج غير موجود! قم بتدريبه أولاً.")
@@ -212,14 +159,26 @@ def main():
         
         # تشغيل Backtesting
         backtester = Backtester(db, ml_model)
-        trades = backtester.backtest(start_date, end_date)
+        trades = backtester.backtest(start_date, end_date, initial_capital=args.capital,
+                                     parallel=args.parallel, n_workers=args.workers,
+                                     position_pct=args.position_pct, max_positions=args.max_positions)
         
         # حفظ النتائج
+        profiler.meta['trades'] = len(trades)
         if trades:
-            df = pd.DataFrame(trades)
-            output_file = f"/tmp/backtest_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            df.to_csv(output_file, index=False)
+            with stage("save"):
+                stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                df = pd.DataFrame(trades)
+                output_file = f"/tmp/backtest_results_{stamp}.csv"
+                df.to_csv(output_file, index=False)
+                
+                # المحفظة: القيمة اليومية والصفقات المنفذة
+                equity_file = f"/tmp/backtest_equity_{stamp}.csv"
+                portfolio_file = f"/tmp/backtest_portfolio_{stamp}.csv"
+                backtester.portfolio['equity'].to_csv(equity_file, index_label='date')
+                backtester.portfolio['trades'].to_csv(portfolio_file, index=False)
             print(f"\n✅ تم حفظ النتائج في: {output_file}")
+            print(f"✅ المحفظة في: {equity_file} و {portfolio_file}")
         
         print("\n" + "=" * 70)
         print("✅ اكتمل Backtesting بنجاح!")
@@ -232,6 +191,7 @@ def main():
     
     finally:
         db.close()
+        profiler.save()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+قياس محرك Backtesting المتجه مقابل الحلقة السابقة
+- legacy: predict_with_proba لكل يوم + df.iloc و iterrows لكل صفقة
+- vectorized: predict_with_proba واحد لكل سهم + backend/backtesting.py
+التحقق من تطابق الصفقات والمقاييس (على نفس التنبؤات)، وزمن كل مرحلة
+بيانات عشوائية (30 سهم × 500 شمعة افتراضياً مثل backtest_model.py) - لا يحتاج قاعدة بيانات
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.backtesting import simulate_trades, summarize_trades
+from backend.data.feature_store import FeatureStore
+from backend.data.labels import create_target
+from backend.data.training_dataset import compact_prices, build_training_dataset, group_by_symbol
+from backend.models.compiled_forest import compile_model
+from backend.models.ml_model import StockMLModel
+from benchmark_training_data import make_market_rows
+from train_ensemble import FEATURES, make_models
+
+
+def legacy_simulate(symbol, df, predictions, confidences):
+    """حلقة Backtester السابقة (للمقارنة)"""
+    trades = []
+    for i in range(50, len(df) - 5):
+        current_row = df.iloc[i]
+        prediction = str(predictions[i])
+        confidence = float(confidences[i])
+
+        if prediction == 'hold' or confidence < 55:
+            continue
+
+        entry_price = current_row['close']
+        if prediction == 'buy':
+            target_price = entry_price * 1.04
+            stop_loss = entry_price * 0.98
+        else:
+            target_price = entry_price * 0.96
+            stop_loss = entry_price * 1.02
+
+        future_data = df.iloc[i+1:i+6]
+        if len(future_data) == 0:
+            continue
+
+        hit_target = False
+        hit_stop = False
+        exit_price = future_data.iloc[-1]['close']
+
+        for _, row in future_data.iterrows():
+            if prediction == 'buy':
+                if row['high'] >= target_price:
+                    hit_target = True
+                    exit_price = target_price
+                    break
+                elif row['low'] <= stop_loss:
+                    hit_stop = True
+                    exit_price = stop_loss
+                    break
+            else:
+                if row['low'] <= target_price:
+                    hit_target = True
+                    exit_price = target_price
+                    break
+                elif row['high'] >= stop_loss:
+                    hit_stop = True
+                    exit_price = stop_loss
+                    break
+
+        if prediction == 'buy':
+            profit_loss = exit_price - entry_price
+        else:
+            profit_loss = entry_price - exit_price
+
+        trades.append({
+            'symbol': symbol,
+            'type': prediction,
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'target_price': target_price,
+            'stop_loss': stop_loss,
+            'profit_loss': profit_loss,
+            'profit_loss_percent': (profit_loss / entry_price) * 100,
+            'confidence': confidence,
+            'hit_target': hit_target,
+            'hit_stop': hit_stop,
+            'entry_date': current_row['date'],
+            'exit_date': future_data.iloc[-1]['date']
+        })
+    return trades
+
+
+def legacy_predict(ml_model, X):
+    """تنبؤ لكل يوم على حدة (للمقارنة)"""
+    predictions, confidences = [], []
+    for i in range(len(X)):
+        labels, probabilities = ml_model.predict_with_proba(X[i:i + 1])
+        predictions.append(labels[0])
+        confidences.append(probabilities[0].max() * 100)
+    return np.array(predictions), np.array(confidences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized backtest benchmark")
+    parser.add_argument('--symbols', type=int, default=30)
+    parser.add_argument('--years', type=int, default=2)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⚡ Backtesting: الحلقة السابقة مقابل المحرك المتجه")
+    print("=" * 70)
+
+    prices = compact_prices(make_market_rows(args.symbols, args.years))
+    store = FeatureStore(root=tempfile.mkdtemp())
+    dataset = build_training_dataset(prices, create_target, store)
+    features = [f for f in FEATURES if f in dataset.columns]
+
+    ml_model = StockMLModel(model_path=os.path.join(tempfile.mkdtemp(), "model.pkl"))
+    ml_model.model = make_models()['lgb'].set_params(n_estimators=50)
+    ml_model.model.fit(dataset[features], dataset['target'])
+    ml_model.features = features
+    ml_model.compiled = compile_model(ml_model.model)
+
+    symbols = []
+    for symbol, stock_df in group_by_symbol(prices):
+        df = store.update(symbol, stock_df.reset_index(drop=True)).dropna()
+        symbols.append((symbol, df, df[features].to_numpy(dtype=float)))
+    print(f"📊 {len(symbols)} سهم، {sum(len(df) for _, df, _ in symbols)} شمعة")
+
+    timings = {}
+    legacy_trades, vector_trades = [], []
+    for symbol, df, X in symbols:
+        start = time.perf_counter()
+        legacy_predict(ml_model, X)
+        timings['predict_legacy'] = timings.get('predict_legacy', 0) + time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictions, probabilities = ml_model.predict_with_proba(X)
+        confidences = probabilities.max(axis=1) * 100
+        timings['predict_vectorized'] = timings.get('predict_vectorized', 0) + time.perf_counter() - start
+
+        # نفس التنبؤات للطريقتين: المقارنة على المحاكاة فقط
+        start = time.perf_counter()
+        legacy_trades.extend(legacy_simulate(symbol, df, predictions, confidences))
+        timings['simulate_legacy'] = timings.get('simulate_legacy', 0) + time.perf_counter() - start
+
+        start = time.perf_counter()
+        vector_trades.extend(simulate_trades(symbol, df, predictions, confidences))
+        timings['simulate_vectorized'] = timings.get('simulate_vectorized', 0) + time.perf_counter() - start
+
+    legacy_df, vector_df = pd.DataFrame(legacy_trades), pd.DataFrame(vector_trades)
+    identical = len(legacy_df) == len(vector_df) and (len(legacy_df) == 0 or legacy_df.equals(vector_df))
+    legacy_summary, vector_summary = summarize_trades(legacy_trades), summarize_trades(vector_trades)
+
+    print(f"\n📊 الصفقات: {len(legacy_df)} (legacy) / {len(vector_df)} (vectorized)")
+    print(f"{'✅' if identical else '❌'} الصفقات متطابقة: {identical}")
+    print(f"{'✅' if legacy_summary == vector_summary else '❌'} المقاييس متطابقة: "
+          f"{legacy_summary == vector_summary}")
+
+    print(f"\n{'stage':<12} {'legacy s':>10} {'vector s':>10} {'speedup':>9}")
+    for name in ('predict', 'simulate'):
+        legacy, vector = timings[f'{name}_legacy'], timings[f'{name}_vectorized']
+        print(f"{name:<12} {legacy:>10.3f} {vector:>10.3f} {legacy / vector:>8.1f}x")
+    legacy = timings['predict_legacy'] + timings['simulate_legacy']
+    vector = timings['predict_vectorized'] + timings['simulate_vectorized']
+    print(f"{'total':<12} {legacy:>10.3f} {vector:>10.3f} {legacy / vector:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+مقارنة زمن تدريب الـ Ensemble
+- legacy: RF ثم XGBoost ثم LightGBM بالتتابع ثم VotingClassifier.fit (يعيد تدريب RF و LightGBM)
+- parallel: fit_models_parallel + prefit_voting_classifier (بدون إعادة تدريب)
+والتحقق من تطابق احتمالات الـ Ensemble. لا يحتاج قاعدة بيانات (بيانات عشوائية)
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from xgboost import XGBClassifier
+from lightgbm import LGBMClassifier
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.models.training import core_budget, fit_models_parallel, prefit_voting_classifier, print_timings
+
+
+def make_dataset(n_rows, n_features=28, seed=0):
+    """بيانات تصنيف عشوائية بثلاث فئات (buy/hold/sell)"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)).astype(np.float32),
+                     columns=[f"f{i}" for i in range(n_features)])
+    score = X['f0'] + 0.5 * X['f1'] - 0.3 * X['f2'] + rng.normal(0, 1.0, n_rows)
+    y = pd.Series(np.where(score > 1, 'buy', np.where(score < -1, 'sell', 'hold')))
+    return X, y
+
+
+def make_models(n_jobs=-1):
+    """نفس إعدادات train_ensemble.py"""
+    return {
+        'rf': RandomForestClassifier(n_estimators=200, max_depth=15, min_samples_split=10,
+                                     min_samples_leaf=5, class_weight='balanced',
+                                     random_state=42, n_jobs=n_jobs),
+        'xgb': XGBClassifier(n_estimators=200, max_depth=10, learning_rate=0.1, subsample=0.8,
+                             colsample_bytree=0.8, random_state=42, n_jobs=n_jobs,
+                             eval_metric='mlogloss'),
+        'lgb': LGBMClassifier(n_estimators=200, max_depth=10, learning_rate=0.1, subsample=0.8,
+                              colsample_bytree=0.8, class_weight='balanced', random_state=42,
+                              n_jobs=n_jobs, verbose=-1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ensemble training")
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--cores', type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"⚡ تدريب الـ Ensemble: {args.rows} عينة، {core_budget(args.cores)} نواة")
+    print("=" * 70)
+
+    X, y = make_dataset(args.rows)
+    y_num = y.map({'buy': 0, 'hold': 1, 'sell': 2}).astype(int)
+    X_test, _ = make_dataset(5000, seed=1)
+
+    # الطريقة السابقة
+    print("\n⏳ legacy (تتابعي + VotingClassifier.fit)...")
+    models = make_models(n_jobs=core_budget(args.cores))
+    legacy = {}
+    start = time.perf_counter()
+    for name in ['rf', 'xgb', 'lgb']:
+        t = time.perf_counter()
+        models[name].fit(X, y_num if name == 'xgb' else y)
+        legacy[name] = time.perf_counter() - t
+    t = time.perf_counter()
+    legacy_ensemble = VotingClassifier(
+        estimators=[('rf', models['rf']), ('lgb', models['lgb'])], voting='soft', weights=[1, 1]
+    ).fit(X, y)
+    legacy['voting refit'] = time.perf_counter() - t
+    legacy_total = time.perf_counter() - start
+    print_timings(legacy)
+
+    # الطريقة الجديدة
+    print("\n⏳ parallel (fit_models_parallel + prefit_voting_classifier)...")
+    start = time.perf_counter()
+    models, timings = fit_models_parallel(make_models(), X, y, targets={'xgb': y_num}, n_cores=args.cores)
+    ensemble = prefit_voting_classifier([('rf', models['rf']), ('lgb', models['lgb'])], weights=[1, 1])
+    parallel_total = time.perf_counter() - start
+    print_timings(timings)
+
+    max_diff = np.abs(ensemble.predict_proba(X_test) - legacy_ensemble.predict_proba(X_test)).max()
+    same_class = (ensemble.predict(X_test) == legacy_ensemble.predict(X_test)).mean() * 100
+
+    print(f"\n⏱️  المجموع: legacy {legacy_total:.2f} s | parallel {parallel_total:.2f} s | "
+          f"{legacy_total / parallel_total:.2f}x")
+    print(f"📊 أقصى فرق في احتمالات الـ Ensemble: {max_diff:.2e} | تطابق الفئات: {same_class:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+مقارنة محرك المؤشرات (NumPy) مع سلسلة pandas المرجعية
+- التحقق من تطابق المخرجات ضمن هامش الدقة
+- قياس زمن الحساب لكل سهم
+لا يحتاج قاعدة بيانات (بيانات عشوائية)
+"""
+
+import sys
+import time
+import argparse
+import pandas as pd
+import numpy as np
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.models.ml_model import StockMLModel
+from backend.models.indicators import INDICATOR_COLUMNS, compute_indicators
+from backend.models.indicator_state import IndicatorState
+
+
+def make_ohlcv(n_rows, seed=0):
+    """توليد بيانات OHLCV عشوائية (random walk)"""
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n_rows)))
+    open_ = close * (1 + rng.normal(0, 0.01, n_rows))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_rows)))
+    volume = rng.integers(10_000, 5_000_000, n_rows).astype(float)
+
+    return pd.DataFrame({
+        'date': pd.date_range('2020-01-01', periods=n_rows, freq='B'),
+        'open': open_.round(2),
+        'high': high.round(2),
+        'low': low.round(2),
+        'close': close.round(2),
+        'volume': volume
+    })
+
+
+def check_equivalence(model, n_rows, seeds, rtol=1e-7, atol=1e-7):
+    """مقارنة كل عمود بين المحركين - يرجع قائمة الأعمدة المختلفة"""
+    mismatches = []
+
+    for seed in seeds:
+        df = make_ohlcv(n_rows, seed)
+        expected = model.calculate_technical_indicators_pandas(df.copy())
+        actual = model.calculate_technical_indicators(df.copy())
+
+        for col in INDICATOR_COLUMNS:
+            a = actual[col].to_numpy(dtype=float)
+            e = expected[col].to_numpy(dtype=float)
+            if not np.allclose(a, e, rtol=rtol, atol=atol, equal_nan=True):
+                diff = np.nanmax(np.abs(a - e))
+                mismatches.append(f"{col} (rows={n_rows}, seed={seed}, max diff={diff:.3g})")
+
+    return mismatches
+
+
+def check_incremental(n_rows, seeds, rtol=1e-7, atol=1e-7):
+    """مقارنة IndicatorState (شمعة بشمعة مع حفظ/استعادة في المنتصف) مع الحساب الكامل"""
+    mismatches = []
+
+    for seed in seeds:
+        df = make_ohlcv(n_rows, seed)
+        expected = compute_indicators(*(df[col].to_numpy() for col in ['open', 'high', 'low', 'close', 'volume']))
+
+        state = IndicatorState()
+        rows = []
+        for i, bar in enumerate(df.to_dict('records')):
+            if i == n_rows // 2:
+                state = IndicatorState.from_dict(state.to_dict())
+            rows.append(state.update(bar))
+
+        for col in INDICATOR_COLUMNS:
+            a = np.array([row[col] for row in rows], dtype=float)
+            if not np.allclose(a, expected[col], rtol=rtol, atol=atol, equal_nan=True):
+                diff = np.nanmax(np.abs(a - expected[col]))
+                mismatches.append(f"{col} (rows={n_rows}, seed={seed}, max diff={diff:.3g})")
+
+    return mismatches
+
+
+def time_per_call(func, df, repeats):
+    """متوسط زمن الاستدعاء بالميلي ثانية"""
+    func(df.copy())
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(df.copy())
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark technical indicator engines")
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⚡ مقارنة محرك المؤشرات: NumPy مقابل pandas")
+    print("=" * 70)
+
+    model = StockMLModel()
+
+    # التحقق من التطابق
+    print("\n🔍 التحقق من تطابق المخرجات...")
+    mismatches = []
+    for n_rows in [30, 60, 100, 500]:
+        mismatches += check_equivalence(model, n_rows, seeds=range(5))
+
+    if mismatches:
+        print("❌ أعمدة غير متطابقة:")
+        for m in mismatches:
+            print(f"  - {m}")
+        sys.exit(1)
+    print(f"✅ جميع الأعمدة ({len(INDICATOR_COLUMNS)}) متطابقة")
+
+    # التحقق من التحديث التزايدي
+    print("\n🔍 التحقق من IndicatorState مقابل الحساب الكامل...")
+    mismatches = []
+    for n_rows in [30, 60, 100, 500]:
+        mismatches += check_incremental(n_rows, seeds=range(5))
+
+    if mismatches:
+        print("❌ أعمدة غير متطابقة:")
+        for m in mismatches:
+            print(f"  - {m}")
+        sys.exit(1)
+    print("✅ التحديث التزايدي مطابق للحساب الكامل")
+
+    # قياس الأداء
+    print("\n⏱️  زمن الحساب لكل سهم:")
+    print(f"  {'rows':>6} | {'pandas (ms)':>12} | {'numpy (ms)':>11} | {'speedup':>8}")
+    for n_rows in [100, 500, 2500]:
+        df = make_ohlcv(n_rows)
+        t_pandas = time_per_call(model.calculate_technical_indicators_pandas, df, args.repeats)
+        t_numpy = time_per_call(model.calculate_technical_indicators, df, args.repeats)
+        print(f"  {n_rows:>6} | {t_pandas:>12.3f} | {t_numpy:>11.3f} | {t_pandas / t_numpy:>7.1f}x")
+
+    # حساب ميزات النموذج فقط (12 ميزة train_model الأساسية) مقابل كل المؤشرات
+    model_features = ['rsi', 'macd', 'macd_signal', 'macd_diff', 'sma_20', 'sma_50', 'ema_12',
+                      'bb_width', 'atr', 'volume_ratio', 'price_change', 'price_change_5d']
+    df = make_ohlcv(100)
+    t_all = time_per_call(model.calculate_technical_indicators, df, args.repeats)
+    t_subset = time_per_call(lambda d: model.calculate_technical_indicators(d, model_features), df, args.repeats)
+    print(f"\n⏱️  100 شمعة: كل المؤشرات ({len(INDICATOR_COLUMNS)}) {t_all:.3f} ms | "
+          f"ميزات النموذج فقط ({len(model_features)}) {t_subset:.3f} ms")
+
+    # شمعة جديدة واحدة: تحديث الحالة مقابل إعادة الحساب على 100 شمعة
+    df = make_ohlcv(101)
+    bars = df.to_dict('records')
+    state = IndicatorState()
+    for bar in bars[:100]:
+        state.update(bar)
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        IndicatorState.from_dict(state.to_dict()).update(bars[100])
+    t_update = (time.perf_counter() - start) / args.repeats * 1000
+    t_full = time_per_call(model.calculate_technical_indicators, df, args.repeats)
+    print(f"\n⏱️  شمعة جديدة: إعادة حساب 100 شمعة {t_full:.3f} ms | "
+          f"IndicatorState.update (مع استعادة الحالة) {t_update:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+مقارنة التنبؤ المُجمَّع (CompiledForest) مع predict_proba في sklearn/LightGBM
+- التحقق من تطابق الاحتمالات (أقصى فرق مطلق)
+- قياس زمن التنبؤ لصف واحد و100 و10,000 صف
+يستخدم النموذج المدرب إن وُجد وإلا يدرب نماذج على بيانات عشوائية
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.models.ml_model import StockMLModel
+from backend.models.compiled_forest import CompiledForest
+
+
+def make_dataset(n_rows, n_features=12, seed=0):
+    """بيانات تصنيف عشوائية بثلاث فئات (buy/sell/hold)"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    score = X[:, 0] + 0.5 * X[:, 1] - 0.3 * X[:, 2] + rng.normal(0, 0.5, n_rows)
+    y = np.where(score > 0.5, 'buy', np.where(score < -0.5, 'sell', 'hold'))
+    return X, y
+
+
+def demo_models(X, y):
+    """نماذج بنفس إعدادات train_model.py / train_ensemble.py"""
+    from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+
+    models = {
+        'RandomForest': RandomForestClassifier(n_estimators=200, max_depth=15, min_samples_split=10,
+                                               min_samples_leaf=5, random_state=42, n_jobs=-1)
+    }
+
+    try:
+        from lightgbm import LGBMClassifier
+        lgbm = LGBMClassifier(n_estimators=200, max_depth=7, learning_rate=0.05,
+                              random_state=42, verbose=-1)
+        models['LightGBM'] = lgbm
+        models['Voting (RF + LGBM)'] = VotingClassifier(
+            estimators=[('rf', RandomForestClassifier(n_estimators=200, max_depth=15, random_state=42,
+                                                      n_jobs=-1)),
+                        ('lgbm', LGBMClassifier(n_estimators=200, max_depth=7, learning_rate=0.05,
+                                                random_state=42, verbose=-1))],
+            voting='soft'
+        )
+    except ImportError:
+        print("⚠️  LightGBM غير مثبت - سيتم اختبار RandomForest فقط")
+
+    for model in models.values():
+        model.fit(X, y)
+    return models
+
+
+def time_per_call(func, X, repeats):
+    """متوسط زمن الاستدعاء بالميلي ثانية"""
+    func(X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(X)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled tree inference")
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--model-path', default="/tmp/stock_model.pkl")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⚡ مقارنة التنبؤ: CompiledForest مقابل predict_proba")
+    print("=" * 70)
+
+    ml_model = StockMLModel(model_path=args.model_path)
+    if os.path.exists(args.model_path):
+        ml_model.load_model()
+        n_features = len(ml_model.features)
+        models = {type(ml_model.model).__name__: ml_model.model}
+    else:
+        print("ℹ️  لا يوجد نموذج مدرب - التدريب على بيانات عشوائية")
+        n_features = 12
+        X_train, y_train = make_dataset(5000, n_features)
+        models = demo_models(X_train, y_train)
+
+    X_test, _ = make_dataset(10_000, n_features, seed=1)
+    failed = False
+
+    for name, model in models.items():
+        try:
+            compiled = CompiledForest.from_model(model)
+        except NotImplementedError as e:
+            print(f"\n⚠️  {name}: {e}")
+            continue
+
+        expected = model.predict_proba(X_test)
+        actual = compiled.predict_proba(X_test)
+        max_diff = np.abs(actual - expected).max()
+        same_class = (compiled.predict(X_test) == model.predict(X_test)).mean() * 100
+
+        print(f"\n📊 {name}")
+        print(f"  أقصى فرق في الاحتمالات: {max_diff:.2e} | تطابق الفئات: {same_class:.2f}%")
+        if max_diff > 1e-9:
+            failed = True
+
+        print(f"  المُجمَّع مستخدم حتى {compiled.max_rows} صف")
+        print(f"  {'rows':>6} | {'original (ms)':>13} | {'compiled (ms)':>13} | {'speedup':>8}")
+        for n_rows in sorted({1, compiled.max_rows, 100, 10_000}):
+            X = X_test[:n_rows]
+            repeats = args.repeats if n_rows <= 100 else max(1, args.repeats // 10)
+            t_original = time_per_call(model.predict_proba, X, repeats)
+            t_compiled = time_per_call(compiled.predict_proba, X, repeats)
+            print(f"  {n_rows:>6} | {t_original:>13.3f} | {t_compiled:>13.3f} | "
+                  f"{t_original / t_compiled:>7.1f}x")
+
+    if failed:
+        print("\n❌ الاحتمالات غير متطابقة")
+        sys.exit(1)
+    print("\n✅ الاحتمالات متطابقة")
+
+
+if __name__ == "__main__":
+    main()
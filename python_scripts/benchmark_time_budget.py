@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+تقرير الدقة مقابل زمن التدريب
+- تدريب نماذج الـ Ensemble بعدة مهل (--budgets، 0 = بدون حد) مع early stopping زمني
+- Random Forest مقابل HistGradientBoosting كنموذج الغابة
+- الدقة على آخر 20% من الأيام، والزمن وعدد الأشجار/الجولات لكل نموذج، والنتائج في CSV
+"""
+
+import sys
+import time
+import argparse
+import pandas as pd
+from sklearn.metrics import accuracy_score
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.models.training import TimeBudget, fit_models_parallel, model_iterations, prefit_voting_classifier
+from backend.models.validation import time_holdout_split
+from train_ensemble import FEATURES, make_models
+from walk_forward_cv import load_dataset
+
+LABEL_MAP = {'buy': 0, 'hold': 1, 'sell': 2}
+REVERSE_MAP = {code: label for label, code in LABEL_MAP.items()}
+
+
+def run(df, features, forest, seconds, early_stopping_rounds, cores):
+    """تدريب واحد بمهلة محددة - يرجع صفاً لكل نموذج"""
+    train_idx, test_idx = time_holdout_split(df['date'], test_fraction=0.2, horizon=5)
+    train, test = df.iloc[train_idx], df.iloc[test_idx]
+    fit_idx, val_idx = time_holdout_split(train['date'], test_fraction=0.1, horizon=5)
+    fit, val = train.iloc[fit_idx], train.iloc[val_idx]
+
+    eval_set = (val[features], val['target']) if early_stopping_rounds else None
+    start = time.perf_counter()
+    models, timings = fit_models_parallel(
+        make_models(forest), fit[features], fit['target'],
+        targets={'xgb': fit['target'].map(LABEL_MAP).astype(int)}, n_cores=cores,
+        eval_set=eval_set, eval_targets={'xgb': val['target'].map(LABEL_MAP).astype(int)},
+        budget=TimeBudget(seconds or None), early_stopping_rounds=early_stopping_rounds
+    )
+    models['ensemble'] = prefit_voting_classifier([('rf', models['rf']), ('lgb', models['lgb'])])
+    timings['ensemble'] = time.perf_counter() - start
+
+    rows = []
+    for name, model in models.items():
+        y_pred = model.predict(test[features])
+        if name == 'xgb':
+            y_pred = pd.Series(y_pred).map(REVERSE_MAP)
+        rows.append({
+            'forest': forest,
+            'budget': seconds or None,
+            'model': name,
+            'accuracy': accuracy_score(test['target'], y_pred),
+            'fit_seconds': timings[name],
+            'iterations': model_iterations(model)
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy vs training time report")
+    parser.add_argument('--budgets', default="0,5,15,30", help="مهل بالثواني مفصولة بفواصل (0 = بدون حد)")
+    parser.add_argument('--forests', default="rf,hgb")
+    parser.add_argument('--early-stopping-rounds', type=int, default=20)
+    parser.add_argument('--cores', type=int, default=None)
+    parser.add_argument('--synthetic', type=int, default=0, help="عدد الأسهم العشوائية (بدون قاعدة بيانات)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--output', default="/tmp/time_budget_report.csv")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  الدقة مقابل زمن التدريب")
+    print("=" * 70)
+
+    df = load_dataset(args)
+    if df is None or len(df) < 1000:
+        print("❌ البيانات غير كافية!")
+        return
+    features = [f for f in FEATURES if f in df.columns]
+    print(f"📊 {len(df)} عينة، {len(features)} ميزة")
+
+    rows = []
+    for forest in args.forests.split(','):
+        for seconds in [float(b) for b in args.budgets.split(',')]:
+            print(f"\n⏳ {forest} - المهلة: {seconds or 'بدون حد'}...")
+            rows.extend(run(df, features, forest, seconds, args.early_stopping_rounds, args.cores))
+
+    report = pd.DataFrame(rows)
+    pd.set_option('display.width', 200)
+    print("\n📊 النتائج:")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    report.to_csv(args.output, index=False)
+    print(f"\n✅ النتائج في {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+قياس ذاكرة تحضير بيانات التدريب (Peak RSS)
+- legacy: DataFrame بأعمدة float64/object ونسخة لكل سهم ثم pd.concat و dropna
+- compact: build_training_dataset (float32 + category + مصفوفة محجوزة مسبقاً)
+بيانات عشوائية بحجم السوق كاملاً (افتراضياً 230 سهم × 10 سنوات) بصيغة صفوف
+قاعدة البيانات (dict + Decimal). كل وضع يعمل في عملية منفصلة لقياس الذروة بدقة.
+- scaling: زمن التحضير مع زيادة عدد الأسهم (legacy تربيعي، compact خطي)
+لا يحتاج قاعدة بيانات
+"""
+
+import sys
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.data.feature_store import FeatureStore
+from backend.data.training_dataset import compact_prices, build_training_dataset
+from backend.data.labels import create_target
+
+
+def make_market_rows(n_symbols, years, seed=0):
+    """صفوف OHLCV عشوائية بنفس شكل get_all_historical_data (مرتبة حسب symbol ثم date)"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-12-31', periods=years * 252).date
+    rows = []
+
+    for i in range(n_symbols):
+        n = len(dates)
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        open_ = close * (1 + rng.normal(0, 0.01, n))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+        volume = rng.integers(10_000, 5_000_000, n)
+
+        symbol = str(1000 + i)
+        for j in range(n):
+            rows.append({
+                'symbol': symbol,
+                'date': dates[j],
+                'open': Decimal(f"{open_[j]:.2f}"),
+                'high': Decimal(f"{high[j]:.2f}"),
+                'low': Decimal(f"{low[j]:.2f}"),
+                'close': Decimal(f"{close[j]:.2f}"),
+                'volume': int(volume[j])
+            })
+
+    return rows
+
+
+def legacy_prepare(data, store):
+    """الطريقة السابقة في prepare_training_data (للمقارنة)"""
+    df = pd.DataFrame(data)
+    all_data = []
+
+    for symbol in df['symbol'].unique():
+        stock_df = df[df['symbol'] == symbol].copy()
+        stock_df = stock_df.sort_values('date')
+        start_date = stock_df['date'].iloc[0]
+
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            stock_df[col] = stock_df[col].astype(float)
+
+        stock_df = store.update(symbol, stock_df)
+        stock_df = stock_df[stock_df['date'] >= pd.Timestamp(start_date)].copy()
+        stock_df = create_target(stock_df)
+        all_data.append(stock_df)
+
+    final_df = pd.concat(all_data, ignore_index=True)
+    return final_df.dropna()
+
+
+def compact_prepare(data, store, n_jobs=1):
+    df = compact_prices(data)
+    del data[:]
+    return build_training_dataset(df, create_target, store, n_jobs=n_jobs)
+
+
+def current_rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def run_mode(args):
+    """تشغيل وضع واحد وطباعة النتيجة كسطر واحد"""
+    data = make_market_rows(args.symbols, args.years)
+    store = FeatureStore(root=args.store_root)
+    baseline = current_rss_mb()
+
+    start = time.perf_counter()
+    if args.mode == 'legacy':
+        dataset = legacy_prepare(data, store)
+    else:
+        dataset = compact_prepare(data, store, args.n_jobs)
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    size = dataset.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"{len(dataset)} {baseline:.1f} {peak:.1f} {size:.1f} {elapsed:.2f}")
+
+
+def run_scaling(args):
+    """زمن التحضير (بدون بناء الصفوف) لربع ونصف وكامل السوق"""
+    store = FeatureStore(root=args.store_root)
+    for fraction in [0.25, 0.5, 1.0]:
+        n_symbols = max(1, int(args.symbols * fraction))
+        data = make_market_rows(n_symbols, args.years)
+
+        start = time.perf_counter()
+        legacy_prepare(data, store)
+        t_legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compact_prepare(data, store, args.n_jobs)
+        t_compact = time.perf_counter() - start
+
+        print(f"{n_symbols} {t_legacy:.3f} {t_compact:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training dataset memory")
+    parser.add_argument('--symbols', type=int, default=230)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    parser.add_argument('--mode', choices=['warm', 'legacy', 'compact', 'scaling'])
+    parser.add_argument('--store-root')
+    args = parser.parse_args()
+
+    if args.mode:
+        if args.mode == 'scaling':
+            run_scaling(args)
+        elif args.mode == 'warm':
+            data = compact_prices(make_market_rows(args.symbols, args.years))
+            store = FeatureStore(root=args.store_root)
+            for symbol, stock_df in data.groupby('symbol', observed=True):
+                store.update(symbol, stock_df)
+        else:
+            run_mode(args)
+        return
+
+    print("=" * 70)
+    print(f"🧠 ذاكرة تحضير بيانات التدريب: {args.symbols} سهم × {args.years} سنوات")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as store_root:
+        def child(mode):
+            cmd = [sys.executable, os.path.abspath(__file__), '--mode', mode,
+                   '--symbols', str(args.symbols), '--years', str(args.years), '--store-root', store_root,
+                   '--n-jobs', str(args.n_jobs)]
+            return subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip().splitlines()
+
+        # ملء مخزن الميزات مرة واحدة حتى يقيس الوضعان تحضير البيانات فقط
+        print("\n⏳ تجهيز مخزن الميزات...")
+        child('warm')
+
+        results = {}
+        for mode in ['legacy', 'compact']:
+            rows, baseline, peak, size, elapsed = child(mode)[-1].split()
+            results[mode] = (int(rows), float(baseline), float(peak), float(size), float(elapsed))
+
+        scaling = [line.split() for line in child('scaling')]
+
+    print(f"\n  {'mode':>8} | {'rows':>9} | {'input RSS':>10} | {'peak RSS':>9} | "
+          f"{'build +MB':>9} | {'dataset MB':>10} | {'time (s)':>8}")
+    for mode, (rows, baseline, peak, size, elapsed) in results.items():
+        print(f"  {mode:>8} | {rows:>9} | {baseline:>10.1f} | {peak:>9.1f} | "
+              f"{peak - baseline:>9.1f} | {size:>10.1f} | {elapsed:>8.2f}")
+
+    print(f"\n⏱️  زمن التحضير حسب عدد الأسهم ({args.years} سنوات لكل سهم):")
+    print(f"  {'symbols':>8} | {'legacy (s)':>10} | {'compact (s)':>11} | {'legacy/symbol (ms)':>18} | "
+          f"{'compact/symbol (ms)':>19}")
+    for n_symbols, t_legacy, t_compact in scaling:
+        n, t_legacy, t_compact = int(n_symbols), float(t_legacy), float(t_compact)
+        print(f"  {n:>8} | {t_legacy:>10.2f} | {t_compact:>11.2f} | {t_legacy / n * 1000:>18.1f} | "
+              f"{t_compact / n * 1000:>19.1f}")
+
+    if results['legacy'][0] != results['compact'][0]:
+        print("\n❌ عدد الصفوف غير متطابق")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
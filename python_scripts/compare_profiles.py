@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+مقارنة تقارير القياس (backend/profiling.py) لآخر التشغيلات
+- الزمن الفعلي وذروة الذاكرة لكل مرحلة في آخر --last تشغيلات
+- تنبيه للمراحل الأبطأ من متوسط التشغيلات السابقة بأكثر من --threshold
+  (مع تطبيع الزمن بعدد العينات عند توفره، فنمو البيانات وحده لا يُعد تراجعاً)
+"""
+
+import sys
+import glob
+import json
+import argparse
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.profiling import PROFILE_DIR
+
+
+def load_reports(run: str, root: str, last: int):
+    paths = sorted(glob.glob(os.path.join(root, f"{run}_*.json")))[-last:]
+    reports = []
+    for path in paths:
+        with open(path) as f:
+            reports.append(json.load(f))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare profiling reports")
+    parser.add_argument('run', nargs='?', default='train_ensemble',
+                        help="train_model / train_ensemble / backtest_model")
+    parser.add_argument('--last', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.2, help="نسبة التراجع (0.2 = 20%%)")
+    parser.add_argument('--min-seconds', type=float, default=0.5, help="تجاهل المراحل الأقصر")
+    parser.add_argument('--root', default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    reports = load_reports(args.run, args.root, args.last)
+    if not reports:
+        print(f"❌ لا توجد تقارير لـ {args.run} في {args.root}")
+        return
+
+    print("=" * 70)
+    print(f"⏱️  مقارنة القياسات: {args.run} (آخر {len(reports)} تشغيلات)")
+    print("=" * 70)
+
+    rows = []
+    for report in reports:
+        label = report['started_at'].replace('T', ' ')
+        samples = report.get('meta', {}).get('samples')
+        for entry in report['stages'] + [{'stage': 'TOTAL', 'wall_seconds': report['wall_seconds'],
+                                          'peak_rss_mb': report['peak_rss_mb']}]:
+            rows.append({'run': label, 'stage': entry['stage'], 'samples': samples,
+                         'wall_seconds': entry['wall_seconds'], 'peak_rss_mb': entry.get('peak_rss_mb')})
+    df = pd.DataFrame(rows)
+    runs = list(dict.fromkeys(df['run']))
+    stages = list(dict.fromkeys(df['stage']))
+
+    pd.set_option('display.width', 200)
+    for value, title in (('wall_seconds', "الزمن الفعلي (ثانية)"), ('peak_rss_mb', "ذروة الذاكرة (MB)")):
+        table = df.pivot_table(index='stage', columns='run', values=value, aggfunc='first')
+        print(f"\n📊 {title}:")
+        print(table.reindex(index=stages, columns=runs).to_string(float_format=lambda v: f"{v:.2f}"))
+
+    samples = df.drop_duplicates('run').set_index('run')['samples']
+    if samples.notna().all():
+        print("\n📊 العينات: " + " | ".join(f"{run}: {int(n)}" for run, n in samples.items()))
+
+    if len(runs) < 2:
+        return
+
+    # آخر تشغيل مقابل متوسط السابقة (لكل 1000 عينة إن توفر العدد)
+    normalize = samples.notna().all()
+    df['cost'] = df['wall_seconds'] / (df['samples'] / 1000) if normalize else df['wall_seconds']
+    latest, previous = df[df['run'] == runs[-1]], df[df['run'] != runs[-1]]
+    baseline = previous.groupby('stage')['cost'].mean()
+
+    regressions = []
+    for _, row in latest.iterrows():
+        base = baseline.get(row['stage'])
+        if base is None or base <= 0 or row['wall_seconds'] < args.min_seconds:
+            continue
+        change = row['cost'] / base - 1
+        if change > args.threshold:
+            regressions.append((row['stage'], change))
+
+    unit = "لكل 1000 عينة" if normalize else ""
+    if regressions:
+        print(f"\n⚠️  مراحل أبطأ من متوسط التشغيلات السابقة {unit}:")
+        for name, change in regressions:
+            print(f"  {name:<28} +{change*100:.0f}%")
+    else:
+        print(f"\n✅ لا تراجع أكبر من {args.threshold*100:.0f}% {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,10 @@ sys.path.insert(0, parent_dir)
 
 from backend.data.database import Database
 from backend.trade_evaluator import TradeEvaluator
-from backend.models.ml_model import StockMLModel
+from backend.models.model_registry import ModelRegistry
+from backend.models.prediction_cache import PredictionCache, PREDICTION_CACHE_DIR
+from backend.data.feature_store import FeatureStore
+from backend.strategy import MIN_CONFIDENCE
 
 def main():
     print("=" * 70)
@@ -45,6 +48,8 @@ def main():
         print(f"  ❌ وصلت لوقف الخسارة: {results['stop_loss_hit']}")
         print(f"  ⚠️  أغلقت محايدة: {results['closed_neutral']}")
         print(f"  📈 نسبة النجاح: {results['success_rate']}%")
+        if results['failed']:
+            print(f"  ⚠️  تعذر حفظ {results['failed']} تقييم (تُعاد في التشغيل القادم)")
         
         # حفظ الإحصائيات اليومية
         stats = evaluator.get_daily_stats()
@@ -57,8 +62,10 @@ def main():
         print("\n🤖 توليد توصيات جديدة...")
         
         try:
-            ml_model = StockMLModel()
-            ml_model.load_model()
+            # الميزات تُقرأ من مخزن الميزات وتُحسب للشموع الجديدة فقط
+            # والأسهم التي لم تتغير آخر شمعة لها تُقرأ توصيتها من الذاكرة المؤقتة
+            ml_model = ModelRegistry().load(feature_store=FeatureStore(),
+                                            prediction_cache=PredictionCache(disk_path=PREDICTION_CACHE_DIR))
             
             # جلب الأسهم النشطة
             stocks_query = "SELECT symbol FROM stocks WHERE isActive = 1 LIMIT 30"
@@ -77,10 +84,11 @@ def main():
                         continue
                     
                     # التنبؤ
-                    prediction = ml_model.generate_recommendation(symbol, history)
+                    prediction = ml_model.generate_recommendation(symbol, history, incremental=True)
                     
-                    # فلتر: فقط التوصيات بثقة > 55%
-                    if prediction and prediction['type'] in ['buy', 'sell'] and prediction['confidence'] >= 55:
+                    # فلتر: فقط التوصيات بثقة >= MIN_CONFIDENCE (55%)
+                    if (prediction and prediction['type'] in ['buy', 'sell']
+                            and prediction['confidence'] >= MIN_CONFIDENCE):
                         # حفظ التوصية
                         db.save_recommendation(
                             symbol=symbol,
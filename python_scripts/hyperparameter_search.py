@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+البحث عن معاملات نموذج (rf / hgb / xgb / lgb) بدلاً من المعاملات الثابتة
+- --method halving (Successive Halving) أو random
+- التوليفات موزعة على عمليات محلية تقرأ نفس المصفوفات من /dev/shm (mmap)
+- كل نتيجة تُحفظ فور انتهائها: إعادة تشغيل نفس الأمر تكمل البحث من حيث توقف
+- أفضل المعاملات تُحفظ في سجل النماذج (/tmp/model_registry/hyperparameters/<model>.json)
+  ويستخدمها التدريب مع --tuned
+
+عمليات إضافية (جهاز آخر يشارك /tmp/hparam_search و --cache-root، أو طرفية أخرى):
+    python3 python_scripts/hyperparameter_search.py --worker /tmp/hparam_search/<search>
+"""
+
+import sys
+import time
+import argparse
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.models.hyperparameter_search import (SEARCH_DIR, SHARED_CACHE_DIR, HyperparameterSearch,
+                                                  run_worker)
+from backend.models.validation import time_holdout_split
+
+# فضاء البحث لكل نموذج: قائمة قيم أو ('int' | 'float' | 'log', من, إلى)
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [8, 10, 15, 20, None],
+        'min_samples_split': ('int', 2, 40),
+        'min_samples_leaf': ('int', 1, 30),
+        'max_features': ['sqrt', 'log2', 0.5]
+    },
+    'hgb': {
+        'max_iter': [100, 200, 300, 500],
+        'learning_rate': ('log', 0.02, 0.3),
+        'max_leaf_nodes': ('int', 15, 127),
+        'min_samples_leaf': ('int', 5, 100),
+        'l2_regularization': ('log', 1e-4, 10.0)
+    },
+    'xgb': {
+        'n_estimators': [100, 200, 300, 500],
+        'max_depth': ('int', 3, 12),
+        'learning_rate': ('log', 0.02, 0.3),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('log', 0.5, 20.0)
+    },
+    'lgb': {
+        'n_estimators': [100, 200, 300, 500],
+        'max_depth': ('int', 3, 12),
+        'num_leaves': ('int', 15, 255),
+        'learning_rate': ('log', 0.02, 0.3),
+        'subsample': ('float', 0.5, 1.0),
+        'subsample_freq': [1],
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_samples': ('int', 5, 100)
+    }
+}
+
+
+def make_estimator(model_name):
+    """النموذج الأساسي بنفس المعاملات الثابتة في train_ensemble.py"""
+    from train_ensemble import make_forest, make_models
+    if model_name in ('rf', 'hgb'):
+        return make_forest(model_name)
+    return make_models()[model_name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter search")
+    parser.add_argument('--model', choices=sorted(SEARCH_SPACES), default='rf')
+    parser.add_argument('--method', choices=['halving', 'random'], default='halving')
+    parser.add_argument('--trials', type=int, default=27, help="عدد التوليفات")
+    parser.add_argument('--eta', type=int, default=3, help="halving: نسبة الإبقاء 1/eta في كل جولة")
+    parser.add_argument('--rungs', type=int, default=3, help="halving: عدد الجولات")
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--horizon', type=int, default=5, help="مدة الهدف بالأيام (purge)")
+    parser.add_argument('--embargo', type=int, default=0)
+    parser.add_argument('--scoring', choices=['accuracy', 'f1_macro'], default='accuracy')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cores', type=int, default=None)
+    parser.add_argument('--root', default=SEARCH_DIR)
+    parser.add_argument('--cache-root', default=SHARED_CACHE_DIR, help="مجلد المصفوفات المشتركة")
+    parser.add_argument('--worker', metavar='SEARCH_DIR', help="الانضمام لبحث قائم كعملية تنفيذ فقط")
+    parser.add_argument('--no-register', action='store_true', help="بدون حفظ المعاملات في سجل النماذج")
+    parser.add_argument('--synthetic', type=int, default=0, help="عدد الأسهم العشوائية (بدون قاعدة بيانات)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--output', default="/tmp/hparam_search.csv")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(f"👷 الانضمام للبحث {args.worker}...")
+        done = run_worker(args.worker, args.cores, follow=True)
+        print(f"✅ نُفذت {done} مهمة")
+        return
+
+    print("=" * 70)
+    print(f"🔍 البحث عن معاملات {args.model} ({args.method})")
+    print("=" * 70)
+
+    from train_ensemble import FEATURES
+    from walk_forward_cv import load_dataset
+
+    df = load_dataset(args)
+    if df is None or len(df) < 1000:
+        print("❌ البيانات غير كافية!")
+        return
+    features = [f for f in FEATURES if f in df.columns]
+
+    # نفس تقسيم التدريب: آخر 20% من الأيام خارج البحث تماماً
+    train_idx, _ = time_holdout_split(df['date'], test_fraction=0.2, horizon=5)
+    train = df.iloc[train_idx]
+    print(f"📊 {len(train)} عينة تدريب، {len(features)} ميزة")
+
+    search = HyperparameterSearch(
+        args.model, make_estimator(args.model), SEARCH_SPACES[args.model],
+        train[features].to_numpy(), train['target'], train['date'],
+        method=args.method, n_trials=args.trials, eta=args.eta, rungs=args.rungs,
+        n_folds=args.folds, horizon=args.horizon, embargo=args.embargo, scoring=args.scoring,
+        seed=args.seed, root=args.root, cache_root=args.cache_root
+    )
+
+    start = time.perf_counter()
+    best = search.run(n_workers=args.workers, n_cores=args.cores)
+    elapsed = time.perf_counter() - start
+
+    results = search.results()
+    params = pd.json_normalize(results['params'].tolist())
+    table = pd.concat([results[['rung', 'trial', 'fraction', 'score', 'fit_seconds']], params], axis=1)
+    table = table.sort_values(['rung', 'score'], ascending=[False, False])
+
+    pd.set_option('display.width', 200)
+    print("\n📊 أفضل التوليفات:")
+    print(table.head(10).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    table.to_csv(args.output, index=False)
+
+    print(f"\n🏆 أفضل معاملات ({args.scoring} {best['score']:.4f}): {best['params']}")
+
+    if not args.no_register:
+        from backend.models.model_registry import ModelRegistry
+        ModelRegistry().save_hyperparameters(args.model, best['params'], {
+            'score': best['score'],
+            'fold_scores': best['fold_scores'],
+            'scoring': best['scoring'],
+            'method': best['method'],
+            'n_trials': best['n_trials'],
+            'n_tasks': best['n_tasks'],
+            'samples': len(train),
+            'data_start': train['date'].min(),
+            'data_end': train['date'].max(),
+            'features': features,
+            'search_dir': best['search_dir']
+        })
+    search.release_cache()
+
+    print(f"\n✅ اكتمل في {elapsed:.1f} ثانية - النتائج في {args.output}")
+
+
+if __name__ == "__main__":
+    main()
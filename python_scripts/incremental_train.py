@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+تدريب تزايدي يومي للنموذج الفعّال في سجل النماذج
+
+- جلب الأيام الجديدة فقط (بعد آخر تاريخ تدريب data_end في metadata)
+- توسيع النموذج: أشجار جديدة لـ RF (مع حذف الأقدم)، جولات boosting لـ LightGBM/XGBoost
+- تسجيل الناتج كإصدار جديد في السجل
+- تدريب كامل (train_model.py / train_ensemble.py) عند الحاجة:
+  --full، أو مرور --full-every-days يوم على آخر تدريب كامل، أو تعذر التوسيع
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.data.database import Database
+from backend.data.feature_store import FeatureStore
+from backend.data.training_dataset import compact_prices, build_training_dataset
+from backend.models.model_registry import ModelRegistry
+from backend.models.incremental import extend_model, FullRetrainRequired
+from backend.data.labels import create_target
+
+
+def full_retrain(model_type: str, time_budget=None, metadata=None):
+    """التدريب الكامل بنفس سكربت النموذج الحالي وخياراته (metadata الإصدار الحالي)"""
+    print("\n🔁 تدريب كامل...")
+    metadata = metadata or {}
+    argv = ['--time-budget', str(time_budget)] if time_budget else []
+    if metadata.get('hyperparameters'):
+        argv.append('--tuned')
+    if model_type == 'RandomForestClassifier':
+        import train_model
+        train_model.main(argv)
+    elif model_type == 'HistGradientBoostingClassifier':
+        import train_model
+        train_model.main(argv + ['--model', 'hgb'])
+    else:
+        import train_ensemble
+        argv += ['--forest', metadata.get('forest') or 'rf']
+        if metadata.get('feature_selection'):
+            argv += ['--select-features', '--feature-tolerance', str(metadata['feature_selection']['tolerance'])]
+        train_ensemble.main(argv)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental daily retraining")
+    parser.add_argument('--full', action='store_true', help="تدريب كامل بدلاً من التزايدي")
+    parser.add_argument('--full-every-days', type=int, default=30)
+    parser.add_argument('--trees', type=int, default=20, help="أشجار/جولات جديدة لكل تحديث")
+    parser.add_argument('--max-trees', type=int, default=600, help="حد النافذة المنزلقة")
+    parser.add_argument('--min-rows', type=int, default=500, help="أقل عدد عينات جديدة للتحديث")
+    parser.add_argument('--time-budget', type=float, default=None, help="مهلة التدريب الكامل بالثواني")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔄 التدريب التزايدي")
+    print("=" * 70)
+
+    registry = ModelRegistry()
+    version = registry.current_version()
+    if version is None:
+        print("⚠️  لا يوجد نموذج في السجل")
+        full_retrain('RandomForestClassifier', args.time_budget)
+        return
+
+    metadata = registry.metadata(version)
+    model_type = metadata.get('model_type', 'RandomForestClassifier')
+    full_trained_at = pd.Timestamp(metadata.get('full_trained_at', metadata['trained_at']))
+    days_since_full = (pd.Timestamp(datetime.now()) - full_trained_at).days
+
+    if args.full or 'data_end' not in metadata or days_since_full >= args.full_every_days:
+        print(f"ℹ️  آخر تدريب كامل قبل {days_since_full} يوم")
+        full_retrain(model_type, args.time_budget, metadata)
+        return
+
+    start = time.perf_counter()
+    data_end = pd.Timestamp(metadata['data_end'])
+    ml_model = registry.load()
+
+    db = Database()
+    try:
+        # الأيام الجديدة فقط (الميزات تُحسب للشموع الجديدة عبر مخزن الميزات)
+        rows = db.get_historical_data_since(data_end.date())
+    finally:
+        db.close()
+
+    if not rows:
+        print("✅ لا توجد بيانات جديدة")
+        return
+
+    prices = compact_prices(rows)
+    del rows
+    dataset = build_training_dataset(prices, create_target, FeatureStore())
+    dataset = dataset[dataset['date'] > data_end]
+    fetch_seconds = time.perf_counter() - start
+
+    print(f"📊 عينات جديدة: {len(dataset)} (بعد {data_end.date()})")
+    if len(dataset) < args.min_rows:
+        print(f"ℹ️  أقل من {args.min_rows} عينة - التحديث في التشغيل القادم")
+        return
+
+    start = time.perf_counter()
+    try:
+        ml_model.model = extend_model(ml_model.model, dataset[ml_model.features], dataset['target'],
+                                      n_new=args.trees, max_trees=args.max_trees)
+    except FullRetrainRequired as e:
+        print(f"⚠️  {e}")
+        full_retrain(model_type, args.time_budget, metadata)
+        return
+    fit_seconds = time.perf_counter() - start
+
+    registry.register(ml_model, {
+        'samples': metadata.get('samples', 0) + len(dataset),
+        'symbols': metadata.get('symbols'),
+        'data_start': metadata.get('data_start'),
+        'data_end': dataset['date'].max(),
+        'base_version': version,
+        'full_trained_at': str(full_trained_at),
+        'incremental_updates': metadata.get('incremental_updates', 0) + 1,
+        'forest': metadata.get('forest', 'rf'),
+        'feature_selection': metadata.get('feature_selection'),
+        'hyperparameters': metadata.get('hyperparameters')
+    })
+
+    print(f"\n⏱️  البيانات {fetch_seconds:.1f} s | التدريب {fit_seconds:.1f} s")
+    print("✅ اكتمل التدريب التزايدي")
+
+
+if __name__ == "__main__":
+    main()
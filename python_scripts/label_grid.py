@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+مقارنة أهداف التدريب لعدة مدد وعتبات من تحضير واحد للبيانات
+- target_<h>d_<pct>: buy/sell إذا تجاوز عائد h يوم ±pct% (الافتراضي الحالي target_5d_3)
+- path_<h>d_<tp>_<sl>: الهدف tp% قبل الوقف sl% خلال h يوم (نفس قواعد Backtester)
+- توزيع الفئات لكل هدف، و--evaluate: دقة LightGBM على آخر 20% من الأيام (purge بمدة الهدف)
+"""
+
+import sys
+import time
+import argparse
+import pandas as pd
+from sklearn.metrics import accuracy_score, precision_score
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.data.labels import LabelGrid
+from backend.models.validation import time_holdout_split
+from train_ensemble import FEATURES, make_models
+from walk_forward_cv import load_dataset
+
+
+def evaluate_label(df, features, label, horizon):
+    """دقة LightGBM لهدف واحد (الصفوف ذات الهدف المعروف فقط)"""
+    data = df[df[label].notna()]
+    train_idx, test_idx = time_holdout_split(data['date'], test_fraction=0.2, horizon=horizon)
+    train, test = data.iloc[train_idx], data.iloc[test_idx]
+    y_train, y_test = train[label].astype(str), test[label].astype(str)
+
+    model = make_models()['lgb']
+    model.fit(train[features], y_train)
+    y_pred = model.predict(test[features])
+    return {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'majority': float(y_test.value_counts(normalize=True).iloc[0]),
+        'precision_buy': precision_score(y_test, y_pred, labels=['buy'], average='macro', zero_division=0),
+        'precision_sell': precision_score(y_test, y_pred, labels=['sell'], average='macro', zero_division=0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-horizon label report")
+    parser.add_argument('--horizons', default="3,5,10,20", help="المدد بالأيام")
+    parser.add_argument('--thresholds', default="0.02,0.03,0.05", help="عتبات العائد")
+    parser.add_argument('--barriers', default="0.04:0.02,0.06:0.03", help="هدف:وقف")
+    parser.add_argument('--evaluate', action='store_true', help="تدريب LightGBM لكل هدف")
+    parser.add_argument('--synthetic', type=int, default=0, help="عدد الأسهم العشوائية (بدون قاعدة بيانات)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--output', default="/tmp/label_grid.csv")
+    args = parser.parse_args()
+
+    grid = LabelGrid(
+        horizons=[int(h) for h in args.horizons.split(',')],
+        thresholds=[float(t) for t in args.thresholds.split(',')],
+        barriers=[tuple(float(v) for v in b.split(':')) for b in args.barriers.split(',') if b]
+    )
+
+    print("=" * 70)
+    print(f"🎯 مقارنة الأهداف ({len(grid.label_columns())} هدف)")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    df = load_dataset(args, label_grid=grid)
+    if df is None or len(df) < 1000:
+        print("❌ البيانات غير كافية!")
+        return
+    labels_mb = df[grid.return_columns() + grid.label_columns()].memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"✅ {len(df)} عينة في {time.perf_counter() - start:.1f} ثانية (الأهداف {labels_mb:.1f} MB)")
+    features = [f for f in FEATURES if f in df.columns]
+
+    rows = []
+    for label in grid.label_columns():
+        shares = df[label].value_counts(normalize=True, dropna=False)
+        row = {
+            'label': label,
+            'horizon': grid.horizon(label),
+            'buy': shares.get('buy', 0.0),
+            'hold': shares.get('hold', 0.0),
+            'sell': shares.get('sell', 0.0),
+            'missing': float(df[label].isna().mean())
+        }
+        if args.evaluate:
+            print(f"⏳ {label}...")
+            row.update(evaluate_label(df, features, label, grid.horizon(label)))
+        rows.append(row)
+
+    report = pd.DataFrame(rows)
+    pd.set_option('display.width', 200)
+    print("\n📊 الأهداف:")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    if args.evaluate:
+        report['edge'] = report['accuracy'] - report['majority']
+        best = report.loc[report['edge'].idxmax()]
+        print(f"\n🏆 أعلى دقة فوق الفئة الغالبة: {best['label']} "
+              f"({best['accuracy']*100:.2f}% مقابل {best['majority']*100:.2f}%)")
+
+    report.to_csv(args.output, index=False)
+    print(f"\n✅ النتائج في {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+إعادة بناء جدول الإحصائيات التراكمية trade_performance_summary
+يُستخدم بعد إنشاء الجدول لأول مرة أو بعد إضافة/تعديل صفقات قديمة يدوياً
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# إضافة المسار الحالي
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.data.database import Database
+from backend.trade_evaluator import TradeEvaluator
+
+def main():
+    print("=" * 70)
+    print("🔄 إعادة بناء الإحصائيات التراكمية للصفقات")
+    print(f"⏰ الوقت: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 70)
+    
+    db = None
+    
+    try:
+        db = Database()
+        evaluator = TradeEvaluator(db)
+        
+        if not evaluator.rebuild_performance_summary():
+            print("❌ فشلت إعادة البناء")
+            sys.exit(1)
+        
+        stats = evaluator.get_overall_performance()
+        
+        print(f"\n📊 النتائج:")
+        print(f"  ✅ إجمالي الصفقات: {stats['total_trades']}")
+        print(f"  🎯 وصلت للهدف: {stats['successful_trades']}")
+        print(f"  ❌ وصلت لوقف الخسارة: {stats['failed_trades']}")
+        print(f"  ⚠️  أغلقت محايدة: {stats['neutral_trades']}")
+        print(f"  📈 متوسط العائد: {stats['avg_return']:.2f}%")
+        print(f"  💰 إجمالي الربح/الخسارة: {stats['total_profit_loss']:.2f} SAR")
+        
+        print("\n" + "=" * 70)
+        print("✅ اكتملت إعادة البناء بنجاح")
+        print("=" * 70)
+        
+    except Exception as e:
+        print(f"\n❌ خطأ: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+        
+    finally:
+        if db:
+            db.close()
+
+if __name__ == "__main__":
+    main()
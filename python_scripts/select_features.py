@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+تقرير اختيار الميزات (بدون تدريب أو تسجيل نموذج)
+- حذف تدريجي حسب Permutation Importance على آخر 10% من أيام التدريب
+- جدول الدقة مقابل زمن حساب الميزات والتنبؤ لكل مجموعة، والنتائج في CSV
+للتدريب بالميزات المختارة: python3 python_scripts/train_ensemble.py --select-features
+"""
+
+import sys
+import argparse
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.models.feature_selection import print_tradeoff, select_features
+from backend.models.validation import time_holdout_split
+from train_ensemble import FEATURES, make_models
+from walk_forward_cv import load_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature selection report")
+    parser.add_argument('--tolerance', type=float, default=0.005, help="أقصى انخفاض في الدقة (0.005 = 0.5%%)")
+    parser.add_argument('--drop-fraction', type=float, default=0.15)
+    parser.add_argument('--min-features', type=int, default=5)
+    parser.add_argument('--synthetic', type=int, default=0, help="عدد الأسهم العشوائية (بدون قاعدة بيانات)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--output', default="/tmp/feature_selection.csv")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("✂️  اختيار الميزات (Permutation Importance + حذف تدريجي)")
+    print("=" * 70)
+
+    df = load_dataset(args)
+    if df is None or len(df) < 1000:
+        print("❌ البيانات غير كافية!")
+        return
+    features = [f for f in FEATURES if f in df.columns]
+
+    # نفس تقسيم train_ensemble.py: الاختبار خارج الاختيار تماماً
+    train_idx, _ = time_holdout_split(df['date'], test_fraction=0.2, horizon=5)
+    train = df.iloc[train_idx]
+    fit_idx, val_idx = time_holdout_split(train['date'], test_fraction=0.1, horizon=5)
+
+    selected, candidates = select_features(
+        train[features].iloc[fit_idx], train['target'].iloc[fit_idx],
+        train[features].iloc[val_idx], train['target'].iloc[val_idx],
+        lambda: make_models()['lgb'],
+        tolerance=args.tolerance, drop_fraction=args.drop_fraction, min_features=args.min_features
+    )
+    print_tradeoff(candidates)
+
+    print(f"\n✅ الميزات المختارة ({len(selected)} من {len(features)}):")
+    print(f"  {', '.join(selected)}")
+
+    candidates.to_csv(args.output, index=False)
+    print(f"\n✅ النتائج في {args.output}")
+
+
+if __name__ == "__main__":
+    main()
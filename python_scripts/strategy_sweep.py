@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+مقارنة معاملات الاستراتيجية على تنبؤات محفوظة (backend/strategy_sweep.py)
+- التنبؤ مرة واحدة لكل (سهم، يوم) بالنموذج الحالي (موزع على العمليات مثل backtest_model.py --parallel)
+  ويُحفظ في /tmp/backtest_predictions: إعادة التشغيل بشبكة أخرى لا تعيد التنبؤ
+- كل توليفات الهدف × الوقف × أقل ثقة × مدة الصفقة بمحاكاة متجهة، وجدول مرتب في /tmp/strategy_sweep.csv
+- --verify: التوليفة الافتراضية مقابل simulate_trades + summarize_trades على نفس التنبؤات
+- --portfolio N: أفضل N توليفة مرة أخرى بمحاكاة المحفظة (رأس مال وحجم صفقة وأقصى صفقات مفتوحة)
+
+القيم المعتمدة في backend/strategy.py (تغييرها يدوي بعد مراجعة الجدول)
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.backtesting import simulate_trades, summarize_trades
+from backend.data.feature_store import FeatureStore
+from backend.data.labels import TARGET_LABELS
+from backend.data.training_dataset import compact_prices
+from backend.portfolio import simulate_portfolio
+from backend.strategy import MAX_POSITIONS, POSITION_PCT
+from backend.strategy_sweep import PANEL_DIR, RANK_METRICS, load_or_score, rank_strategies, sweep_strategies
+
+COLUMNS = ['rank', 'target_pct', 'stop_pct', 'min_confidence', 'hold_days', 'total_trades', 'success_rate',
+           'total_profit_pct', 'avg_profit_pct', 'sharpe_ratio', 'max_drawdown', 'is_default']
+
+
+def parse_list(value, cast=float):
+    return [cast(v) for v in value.split(',') if v]
+
+
+def load_market(args):
+    """(prices, ml_model, symbols): النموذج الحالي وآخر 500 شمعة لكل الأسهم، أو بيانات عشوائية"""
+    if args.synthetic:
+        from backend.data.labels import create_target
+        from backend.data.training_dataset import build_training_dataset
+        from backend.models.compiled_forest import compile_model
+        from backend.models.ml_model import StockMLModel
+        from benchmark_training_data import make_market_rows
+        from train_ensemble import FEATURES, make_models
+
+        prices = compact_prices(make_market_rows(args.synthetic, args.years))
+        train = build_training_dataset(compact_prices(make_market_rows(20, args.years, seed=5)),
+                                       create_target, FeatureStore(root=tempfile.mkdtemp()))
+        features = [f for f in FEATURES if f in train.columns]
+        ml_model = StockMLModel(model_path=os.path.join(tempfile.mkdtemp(), "model.pkl"))
+        ml_model.model = make_models()['lgb'].set_params(n_estimators=50)
+        ml_model.model.fit(train[features], train['target'])
+        ml_model.features = features
+        ml_model.compiled = compile_model(ml_model.model)
+        ml_model.version = f"synthetic-{args.synthetic}x{args.years}"
+        return prices, ml_model, None
+
+    from backend.data.database import Database
+    from backend.models.model_registry import ModelRegistry
+
+    ml_model = ModelRegistry().load()
+    if not ml_model.model:
+        return None, None, None
+    db = Database()
+    try:
+        symbols = [stock['symbol'] for stock in db.get_all_stocks()]
+        history = db.get_historical_prices_batch(symbols, limit=500)
+    finally:
+        db.close()
+    prices = compact_prices([row for symbol in symbols for row in history.get(symbol, [])])
+    return prices, ml_model, symbols
+
+
+def verify_default(panel, summary):
+    """مقاييس التوليفة الافتراضية من simulate_trades (نفس مسار Backtester)"""
+    trades = []
+    for i, symbol in enumerate(panel.symbols):
+        start, end = panel.bounds[i], panel.bounds[i + 1]
+        df = pd.DataFrame({'date': panel.date[start:end], 'high': panel.high[start:end],
+                           'low': panel.low[start:end], 'close': panel.close[start:end]})
+        predictions = pd.Categorical.from_codes(panel.prediction[start:end], TARGET_LABELS).astype(str)
+        trades.extend(simulate_trades(symbol, df, predictions, panel.confidence[start:end]))
+    expected = summarize_trades(trades)
+    return all(summary[key] == value for key, value in expected.items()), expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strategy parameter sweep over cached predictions")
+    parser.add_argument('--targets', default="0.02,0.03,0.04,0.05,0.06", help="نسب الهدف")
+    parser.add_argument('--stops', default="0.01,0.02,0.03,0.04", help="نسب الوقف")
+    parser.add_argument('--thresholds', default="50,55,60,65,70", help="أقل ثقة (%)")
+    parser.add_argument('--holds', default="3,5,7,10", help="مدة الصفقة (شموع)")
+    parser.add_argument('--rank-by', choices=RANK_METRICS, default='sharpe_ratio')
+    parser.add_argument('--min-trades', type=int, default=30, help="أقل عدد صفقات لترتيب التوليفة")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None, help="عمليات التنبؤ (افتراضياً كل الأنوية)")
+    parser.add_argument('--cache-root', default=PANEL_DIR, help="مجلد التنبؤات المحفوظة")
+    parser.add_argument('--verify', action='store_true', help="مطابقة التوليفة الافتراضية مع Backtester")
+    parser.add_argument('--portfolio', type=int, default=0, help="محاكاة المحفظة لأفضل N توليفة")
+    parser.add_argument('--capital', type=float, default=100000)
+    parser.add_argument('--position-pct', type=float, default=POSITION_PCT)
+    parser.add_argument('--max-positions', type=int, default=MAX_POSITIONS)
+    parser.add_argument('--synthetic', type=int, default=0, help="عدد الأسهم العشوائية (بدون قاعدة بيانات)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--output', default="/tmp/strategy_sweep.csv")
+    args = parser.parse_args()
+
+    targets, stops = parse_list(args.targets), parse_list(args.stops)
+    thresholds, holds = parse_list(args.thresholds), parse_list(args.holds, int)
+    n_configs = len(targets) * len(stops) * len(thresholds) * len(set(holds))
+
+    print("=" * 70)
+    print(f"🎛️  مقارنة معاملات الاستراتيجية ({n_configs} توليفة)")
+    print("=" * 70)
+
+    prices, ml_model, symbols = load_market(args)
+    if ml_model is None:
+        print("❌ النموذج غير موجود! قم بتدريبه أولاً.")
+        return
+
+    start = time.perf_counter()
+    store = FeatureStore(root=tempfile.mkdtemp()) if args.synthetic else FeatureStore()
+    panel, cached = load_or_score(prices, ml_model, store, symbols, args.workers, args.cache_root)
+    print(f"{'📂' if cached else '🔮'} تنبؤات {len(panel.symbols)} سهم ({len(panel)} يوم) "
+          f"{'من الملف' if cached else 'محسوبة ومحفوظة'} في {time.perf_counter() - start:.2f} ثانية")
+
+    start = time.perf_counter()
+    results = sweep_strategies(panel, targets, stops, thresholds, holds)
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {len(results)} توليفة في {elapsed:.2f} ثانية")
+
+    table = rank_strategies(results, by=args.rank_by, min_trades=args.min_trades)
+    columns = [c for c in COLUMNS if c in table.columns]
+    pd.set_option('display.width', 200)
+    print(f"\n📊 أفضل التوليفات ({args.rank_by}، {args.min_trades}+ صفقة):")
+    print(table[columns].head(args.top).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    default = table[table['is_default']]
+    if len(default):
+        row = default.iloc[0]
+        print(f"\n📌 الافتراضية (backend/strategy.py): رتبة {row['rank']}، {row['total_trades']} صفقة، "
+              f"{args.rank_by} {row[args.rank_by]:.3f}")
+        if args.verify:
+            identical, expected = verify_default(panel, row)
+            print(f"{'✅' if identical else '❌'} مطابقة لـ Backtester: {identical} "
+                  f"({expected['total_trades']} صفقة)")
+
+    if args.portfolio:
+        print(f"\n💼 المحفظة ({args.capital:,.0f} ريال، {args.position_pct*100:g}% لكل صفقة، "
+              f"حتى {args.max_positions} صفقات مفتوحة):")
+        rows = []
+        for _, config in table[table['rank'].notna()].head(args.portfolio).iterrows():
+            summary = simulate_portfolio(panel, args.capital, position_pct=args.position_pct,
+                                         max_positions=args.max_positions, target_pct=config['target_pct'],
+                                         stop_pct=config['stop_pct'], hold_days=int(config['hold_days']),
+                                         min_confidence=config['min_confidence'])['summary']
+            rows.append({key: config[key] for key in COLUMNS[:5]} | {
+                key: summary[key] for key in ('total_trades', 'total_return_pct', 'cagr_pct',
+                                              'sharpe_ratio', 'max_drawdown_pct', 'avg_exposure_pct')})
+        print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    table.to_csv(args.output, index=False)
+    print(f"\n✅ النتائج في {args.output}")
+
+
+if __name__ == "__main__":
+    main()
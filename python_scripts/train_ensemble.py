@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 """
 تدريب Ensemble Model (Random Forest + XGBoost + LightGBM)
+
+--time-budget: مهلة بالثواني لكامل التدريب (البيانات + النماذج) - النماذج تتوقف عند انتهائها
+--early-stopping-rounds: early stopping على آخر 10% من أيام التدريب (0 لتعطيله)
+--forest hgb: HistGradientBoosting بدلاً من Random Forest
+--select-features: حذف الميزات الأقل أهمية ما دامت الدقة ضمن --feature-tolerance
+--tuned: معاملات النماذج من آخر بحث (python_scripts/hyperparameter_search.py) بدلاً من الثابتة
 """
 
 import sys
+import argparse
 import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 from datetime import datetime
 import warnings
@@ -20,6 +25,16 @@ sys.path.insert(0, parent_dir)
 
 from backend.data.database import Database
 from backend.models.ml_model import StockMLModel
+from backend.models.model_registry import ModelRegistry
+from backend.data.feature_store import FeatureStore
+from backend.data.price_snapshot import PriceSnapshot
+from backend.data.labels import create_target
+from backend.data.training_dataset import build_training_dataset
+from backend.models.training import (TimeBudget, core_budget, fit_models_parallel, model_iterations,
+                                     prefit_voting_classifier, print_timings)
+from backend.models.validation import time_holdout_split
+from backend.models.feature_selection import print_tradeoff, select_features
+from backend.profiling import RunProfiler, record_stage, stage
 
 # تثبيت XGBoost و LightGBM إذا لم يكونا موجودين
 try:
@@ -39,113 +54,38 @@ except ImportError:
     from lightgbm import LGBMClassifier
 
 
-def create_target(df):
-    """إنشاء الهدف (Buy/Sell/Hold)"""
-    # نظرة للأمام 5 أيام
-    df['future_return'] = df['close'].shift(-5) / df['close'] - 1
-    
-    # تصنيف
-    conditions = [
-        df['future_return'] > 0.03,  # ارتفاع > 3% = Buy
-        df['future_return'] < -0.03,  # انخفاض > 3% = Sell
-    ]
-    choices = ['buy', 'sell']
-    df['target'] = np.select(conditions, choices, default='hold')
-    
-    return df
+# الميزات الكاملة (مع الأنماط الجديدة)
+FEATURES = [
+    # المؤشرات الأساسية
+    'rsi', 'macd', 'macd_signal', 'macd_diff',
+    'sma_20', 'sma_50', 'ema_12',
+    'bb_width', 'atr', 'volume_ratio',
+    'price_change', 'price_change_5d',
+    'stoch_k', 'stoch_d', 'adx', 'obv_ema',
+    # أنماط الشموع اليابانية
+    'doji', 'hammer', 'shooting_star',
+    'bullish_engulfing', 'bearish_engulfing',
+    'morning_star', 'evening_star',
+    # مستويات الدعم والمقاومة
+    'dist_from_support', 'dist_from_resistance',
+    'sr_position', 'near_support', 'near_resistance'
+]
 
 
-def prepare_training_data(db):
-    """تحضير بيانات التدريب"""
-    print("📊 جلب البيانات التاريخية...")
-    
-    # جلب آخر 500 يوم
-    data = db.get_all_historical_data(days=500)
-    
-    if not data:
-        print("❌ لا توجد بيانات!")
-        return None
-    
-    df = pd.DataFrame(data)
-    print(f"✅ تم جلب {len(df)} سجل من {df['symbol'].nunique()} سهم")
-    
-    # معالجة كل سهم
-    ml_model = StockMLModel()
-    all_data = []
-    
-    for symbol in df['symbol'].unique():
-        stock_df = df[df['symbol'] == symbol].copy()
-        stock_df = stock_df.sort_values('date')
-        
-        # تحويل Decimal إلى float
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            if col in stock_df.columns:
-                stock_df[col] = stock_df[col].astype(float)
-        
-        # حساب المؤشرات
-        stock_df = ml_model.calculate_technical_indicators(stock_df)
-        
-        # إنشاء الهدف
-        stock_df = create_target(stock_df)
-        
-        all_data.append(stock_df)
-    
-    # دمج البيانات
-    final_df = pd.concat(all_data, ignore_index=True)
-    final_df = final_df.dropna()
-    
-    print(f"✅ البيانات النهائية: {len(final_df)} عينة")
-    
-    return final_df
-
-
-def train_ensemble(df):
-    """تدريب Ensemble Model"""
-    print("\n🤖 بدء تدريب Ensemble Model...")
-    
-    # الميزات الكاملة (مع الأنماط الجديدة)
-    features = [
-        # المؤشرات الأساسية
-        'rsi', 'macd', 'macd_signal', 'macd_diff',
-        'sma_20', 'sma_50', 'ema_12',
-        'bb_width', 'atr', 'volume_ratio',
-        'price_change', 'price_change_5d',
-        'stoch_k', 'stoch_d', 'adx', 'obv_ema',
-        # أنماط الشموع اليابانية
-        'doji', 'hammer', 'shooting_star',
-        'bullish_engulfing', 'bearish_engulfing',
-        'morning_star', 'evening_star',
-        # مستويات الدعم والمقاومة
-        'dist_from_support', 'dist_from_resistance',
-        'sr_position', 'near_support', 'near_resistance'
-    ]
-    
-    # التحقق من وجود الأعمدة
-    available_features = [f for f in features if f in df.columns]
-    print(f"📊 الميزات المتاحة: {len(available_features)} من {len(features)}")
-    
-    X = df[available_features]
-    y = df['target']
-    
-    # تقسيم البيانات
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    
-    print(f"📊 التدريب: {len(X_train)} عينة")
-    print(f"📊 الاختبار: {len(X_test)} عينة")
-    print(f"📊 توزيع الفئات:\n{y_train.value_counts()}")
-    
-    # تحويل الفئات لأرقام لـ XGBoost
-    label_map = {'buy': 0, 'hold': 1, 'sell': 2}
-    y_train_num = y_train.map(label_map)
-    y_test_num = y_test.map(label_map)
-    
-    # ==================== النماذج ====================
-    
-    print("\n" + "=" * 50)
-    print("🌲 تدريب Random Forest...")
-    rf_model = RandomForestClassifier(
+def make_forest(forest='rf'):
+    """نموذج الغابة: Random Forest أو HistGradientBoosting (hgb)"""
+    if forest == 'hgb':
+        return HistGradientBoostingClassifier(
+            max_iter=300,
+            learning_rate=0.1,
+            max_leaf_nodes=31,
+            min_samples_leaf=20,
+            class_weight='balanced',
+            early_stopping=False,  # early stopping زمني في fit_with_budget
+            random_state=42
+        )
+    
+    return RandomForestClassifier(
         n_estimators=200,
         max_depth=15,
         min_samples_split=10,
@@ -154,113 +94,253 @@ def train_ensemble(df):
         random_state=42,
         n_jobs=-1
     )
-    rf_model.fit(X_train, y_train)
-    rf_pred = rf_model.predict(X_test)
-    rf_acc = accuracy_score(y_test, rf_pred)
-    print(f"✅ دقة Random Forest: {rf_acc*100:.2f}%")
+
+
+def tuned_params(forest='rf'):
+    """معاملات البحث المحفوظة في سجل النماذج لكل نموذج ({} للنماذج بدون بحث)"""
+    registry = ModelRegistry()
+    params = {}
+    for name, key in (('rf', forest), ('xgb', 'xgb'), ('lgb', 'lgb')):
+        artifact = registry.hyperparameters(key)
+        if artifact is not None:
+            params[name] = artifact['params']
+            print(f"✅ معاملات {key} من البحث ({artifact['saved_at']}): {artifact['params']}")
+    return params
+
+
+def make_models(forest='rf', params=None):
+    """
+    نماذج الـ Ensemble (جديدة غير مدربة)
+
+    params: {name: معاملات} تُطبق فوق المعاملات الثابتة (مثل نتيجة tuned_params)
+    """
+    rf_model = make_forest(forest)
     
-    print("\n" + "=" * 50)
-    print("🚀 تدريب XGBoost...")
+    # XGBoost و LightGBM بالـ histograms (تجميع القيم في bins بدلاً من فرز كل قيمة)
     xgb_model = XGBClassifier(
         n_estimators=200,
         max_depth=10,
         learning_rate=0.1,
         subsample=0.8,
         colsample_bytree=0.8,
+        tree_method='hist',
         random_state=42,
         n_jobs=-1,
-        use_label_encoder=False,
         eval_metric='mlogloss'
     )
-    xgb_model.fit(X_train, y_train_num)
-    xgb_pred_num = xgb_model.predict(X_test)
-    reverse_map = {0: 'buy', 1: 'hold', 2: 'sell'}
-    xgb_pred = pd.Series(xgb_pred_num).map(reverse_map)
-    xgb_acc = accuracy_score(y_test, xgb_pred)
-    print(f"✅ دقة XGBoost: {xgb_acc*100:.2f}%")
     
-    print("\n" + "=" * 50)
-    print("⚡ تدريب LightGBM...")
     lgb_model = LGBMClassifier(
         n_estimators=200,
         max_depth=10,
         learning_rate=0.1,
         subsample=0.8,
         colsample_bytree=0.8,
+        max_bin=255,
         class_weight='balanced',
         random_state=42,
         n_jobs=-1,
         verbose=-1
     )
-    lgb_model.fit(X_train, y_train)
-    lgb_pred = lgb_model.predict(X_test)
-    lgb_acc = accuracy_score(y_test, lgb_pred)
-    print(f"✅ دقة LightGBM: {lgb_acc*100:.2f}%")
     
-    # ==================== Ensemble (Voting) ====================
+    models = {'rf': rf_model, 'xgb': xgb_model, 'lgb': lgb_model}
+    for name, model_params in (params or {}).items():
+        models[name].set_params(**model_params)
+    return models
+
+
+def prepare_training_data(db, label_grid=None):
+    """تحضير بيانات التدريب (label_grid: أهداف إضافية لعدة مدد وعتبات - backend/data/labels.py)"""
+    print("📊 جلب البيانات التاريخية...")
     
-    print("\n" + "=" * 50)
-    print("🎯 بناء Ensemble Model (Voting)...")
-    
-    # Soft Voting - يأخذ متوسط الاحتمالات
-    ensemble_model = VotingClassifier(
-        estimators=[
-            ('rf', rf_model),
-            ('lgb', lgb_model)
-        ],
-        voting='soft',
-        weights=[1, 1]  # وزن متساوي
-    )
+    # آخر 500 يوم من النسخة المحلية (يُجلب من قاعدة البيانات الجديد/المعدل فقط)
+    with stage("fetch"):
+        df = PriceSnapshot().load_prices(db, days=500)
     
-    ensemble_model.fit(X_train, y_train)
-    ensemble_pred = ensemble_model.predict(X_test)
-    ensemble_acc = accuracy_score(y_test, ensemble_pred)
+    if df.empty:
+        print("❌ لا توجد بيانات!")
+        return None
     
-    print(f"\n✅ دقة Ensemble Model: {ensemble_acc*100:.2f}%")
+    print(f"✅ تم جلب {len(df)} سجل من {df['symbol'].nunique()} سهم")
+    
+    # الميزات تُحسب للشموع الجديدة فقط عبر مخزن الميزات، وتُجمع في مصفوفة float32 واحدة
+    # (ترتيب واحد حسب symbol/date ومعالجة الأسهم بالتوازي على كل الأنوية)
+    with stage("indicators", rows=len(df)):
+        final_df = build_training_dataset(df, create_target, FeatureStore(), n_jobs=-1, label_grid=label_grid)
     
-    # ==================== المقارنة ====================
+    print(f"✅ البيانات النهائية: {len(final_df)} عينة "
+          f"({final_df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB)")
+    
+    return final_df
+
+
+def train_ensemble(df, budget=None, early_stopping_rounds=20, forest='rf', feature_tolerance=None,
+                   params=None):
+    """
+    تدريب Ensemble Model
+
+    budget: TimeBudget مشتركة (None بدون حد)
+    early_stopping_rounds: جولات بدون تحسن قبل التوقف (0 لتعطيل early stopping)
+    feature_tolerance: أقصى انخفاض مقبول في الدقة عند حذف الميزات (None بدون اختيار)
+    params: معاملات لكل نموذج فوق الثابتة (انظر make_models)
+    يرجع (النموذج, الميزات, الدقة, نتيجة اختيار الميزات أو None)
+    """
+    print("\n🤖 بدء تدريب Ensemble Model...")
     
+    # التحقق من وجود الأعمدة
+    available_features = [f for f in FEATURES if f in df.columns]
+    print(f"📊 الميزات المتاحة: {len(available_features)} من {len(FEATURES)}")
+    
+    with stage("preprocessing"):
+        X = df[available_features]
+        y = df['target']
+    
+        # تقسيم زمني: آخر 20% من الأيام للاختبار مع حذف 5 أيام قبلها (مدة الهدف)
+        train_idx, test_idx = time_holdout_split(df['date'], test_fraction=0.2, horizon=5)
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+    
+        print(f"📊 التدريب: {len(X_train)} عينة")
+        print(f"📊 الاختبار: {len(X_test)} عينة")
+        print(f"📊 توزيع الفئات:\n{y_train.value_counts()}")
+    
+    # اختيار الميزات على آخر 10% من أيام التدريب (LightGBM كنموذج اختيار لأنه الأسرع)
+    selection = None
+    if feature_tolerance is not None:
+        print("\n" + "=" * 50)
+        with stage("feature_selection"):
+            print(f"✂️  اختيار الميزات (أقصى انخفاض في الدقة {feature_tolerance*100:.2f}%)...")
+            fit_idx, val_idx = time_holdout_split(df['date'].iloc[train_idx], test_fraction=0.1, horizon=5)
+            selected, candidates = select_features(
+                X_train.iloc[fit_idx], y_train.iloc[fit_idx],
+                X_train.iloc[val_idx], y_train.iloc[val_idx],
+                lambda: make_models(forest, params)['lgb'],
+                tolerance=feature_tolerance
+            )
+            print_tradeoff(candidates)
+            print(f"✅ الميزات المختارة: {len(selected)} من {len(available_features)}")
+            selection = {
+                'tolerance': feature_tolerance,
+                'dropped': [f for f in available_features if f not in selected],
+                'candidates': candidates.drop(columns=['features']).round(6).to_dict('records')
+            }
+        available_features = selected
+        X, X_train, X_test = X[selected], X_train[selected], X_test[selected]
+    
+    with stage("preprocessing"):
+        # تحويل الفئات لأرقام لـ XGBoost
+        label_map = {'buy': 0, 'hold': 1, 'sell': 2}
+    
+        # بيانات التحقق لـ early stopping: آخر 10% من أيام التدريب (مع حذف 5 أيام قبلها)
+        X_fit, y_fit, eval_set, eval_targets = X_train, y_train, None, None
+        if early_stopping_rounds:
+            fit_idx, val_idx = time_holdout_split(df['date'].iloc[train_idx], test_fraction=0.1, horizon=5)
+            X_fit, y_fit = X_train.iloc[fit_idx], y_train.iloc[fit_idx]
+            eval_set = (X_train.iloc[val_idx], y_train.iloc[val_idx])
+            eval_targets = {'xgb': eval_set[1].map(label_map).astype(int)}
+            print(f"📊 التحقق (early stopping): {len(val_idx)} عينة")
+        y_fit_num = y_fit.map(label_map).astype(int)
+    
+    # ==================== النماذج ====================
+    
+    models = make_models(forest, params)
+    rf_model, xgb_model, lgb_model = models['rf'], models['xgb'], models['lgb']
+    forest_name = 'HistGradientBoosting' if forest == 'hgb' else 'Random Forest'
+    
+    # تدريب النماذج الثلاثة معاً (الأنوية موزعة بينها: TRAINING_CORES أو كل الأنوية)
     print("\n" + "=" * 50)
-    print("📊 مقارنة النماذج:")
-    print("=" * 50)
-    print(f"  🌲 Random Forest: {rf_acc*100:.2f}%")
-    print(f"  🚀 XGBoost:       {xgb_acc*100:.2f}%")
-    print(f"  ⚡ LightGBM:      {lgb_acc*100:.2f}%")
-    print(f"  🎯 Ensemble:      {ensemble_acc*100:.2f}%")
-    
-    # اختيار أفضل نموذج
-    models = {
-        'rf': (rf_model, rf_acc),
-        'xgb': (xgb_model, xgb_acc),
-        'lgb': (lgb_model, lgb_acc),
-        'ensemble': (ensemble_model, ensemble_acc)
-    }
-    
-    best_name = max(models, key=lambda x: models[x][1])
-    best_model, best_acc = models[best_name]
-    
-    print(f"\n🏆 أفضل نموذج: {best_name.upper()} ({best_acc*100:.2f}%)")
-    
-    # تقرير التصنيف للأفضل
-    if best_name == 'xgb':
-        best_pred = xgb_pred
-    elif best_name == 'rf':
-        best_pred = rf_pred
-    elif best_name == 'lgb':
-        best_pred = lgb_pred
-    else:
-        best_pred = ensemble_pred
-    
-    print("\n📊 تقرير التصنيف (أفضل نموذج):")
-    print(classification_report(y_test, best_pred))
-    
-    # أهمية الميزات
-    print("\n📊 أهمية الميزات (Random Forest):")
-    feature_importance = pd.DataFrame({
-        'feature': available_features,
-        'importance': rf_model.feature_importances_
-    }).sort_values('importance', ascending=False).head(15)
-    print(feature_importance.to_string(index=False))
+    print(f"🌲🚀⚡ تدريب {forest_name} + XGBoost + LightGBM بالتوازي ({core_budget()} نواة)...")
+    if budget is not None and budget.deadline is not None:
+        print(f"⏱️  المهلة المتبقية: {budget.remaining():.0f} ثانية")
+    with stage("fit"):
+        models, timings = fit_models_parallel(
+            models,
+            X_fit, y_fit,
+            targets={'xgb': y_fit_num},
+            eval_set=eval_set,
+            eval_targets=eval_targets,
+            budget=budget,
+            early_stopping_rounds=early_stopping_rounds
+        )
+        # النماذج تتدرب معاً في threads: الزمن الفعلي فقط لكل نموذج
+        for name, seconds in timings.items():
+            record_stage(name, seconds, iterations=model_iterations(models[name]))
+    
+    with stage("evaluation"):
+        rf_pred = rf_model.predict(X_test)
+        rf_acc = accuracy_score(y_test, rf_pred)
+        print(f"✅ دقة {forest_name}: {rf_acc*100:.2f}%")
+    
+        xgb_pred_num = xgb_model.predict(X_test)
+        reverse_map = {0: 'buy', 1: 'hold', 2: 'sell'}
+        xgb_pred = pd.Series(xgb_pred_num).map(reverse_map)
+        xgb_acc = accuracy_score(y_test, xgb_pred)
+        print(f"✅ دقة XGBoost: {xgb_acc*100:.2f}%")
+    
+        lgb_pred = lgb_model.predict(X_test)
+        lgb_acc = accuracy_score(y_test, lgb_pred)
+        print(f"✅ دقة LightGBM: {lgb_acc*100:.2f}%")
+    
+        # ==================== Ensemble (Voting) ====================
+    
+        print("\n" + "=" * 50)
+        print("🎯 بناء Ensemble Model (Voting)...")
+    
+        # Soft Voting - يأخذ متوسط الاحتمالات من النماذج المدربة أعلاه (بدون إعادة تدريب)
+        ensemble_model = prefit_voting_classifier(
+            [('rf', rf_model), ('lgb', lgb_model)],
+            weights=[1, 1]  # وزن متساوي
+        )
+    
+        ensemble_pred = ensemble_model.predict(X_test)
+        ensemble_acc = accuracy_score(y_test, ensemble_pred)
+    
+        print(f"\n✅ دقة Ensemble Model: {ensemble_acc*100:.2f}%")
+        print_timings(timings, models)
+    
+        # ==================== المقارنة ====================
+    
+        print("\n" + "=" * 50)
+        print("📊 مقارنة النماذج:")
+        print("=" * 50)
+        print(f"  🌲 {forest_name + ':':<14} {rf_acc*100:.2f}%")
+        print(f"  🚀 XGBoost:       {xgb_acc*100:.2f}%")
+        print(f"  ⚡ LightGBM:      {lgb_acc*100:.2f}%")
+        print(f"  🎯 Ensemble:      {ensemble_acc*100:.2f}%")
+    
+        # اختيار أفضل نموذج
+        models = {
+            'rf': (rf_model, rf_acc),
+            'xgb': (xgb_model, xgb_acc),
+            'lgb': (lgb_model, lgb_acc),
+            'ensemble': (ensemble_model, ensemble_acc)
+        }
+    
+        best_name = max(models, key=lambda x: models[x][1])
+        best_model, best_acc = models[best_name]
+    
+        print(f"\n🏆 أفضل نموذج: {best_name.upper()} ({best_acc*100:.2f}%)")
+    
+        # تقرير التصنيف للأفضل
+        if best_name == 'xgb':
+            best_pred = xgb_pred
+        elif best_name == 'rf':
+            best_pred = rf_pred
+        elif best_name == 'lgb':
+            best_pred = lgb_pred
+        else:
+            best_pred = ensemble_pred
+    
+        print("\n📊 تقرير التصنيف (أفضل نموذج):")
+        print(classification_report(y_test, best_pred))
+    
+        # أهمية الميزات
+        if hasattr(rf_model, 'feature_importances_'):
+            print("\n📊 أهمية الميزات (Random Forest):")
+            feature_importance = pd.DataFrame({
+                'feature': available_features,
+                'importance': rf_model.feature_importances_
+            }).sort_values('importance', ascending=False).head(15)
+            print(feature_importance.to_string(index=False))
     
     # استخدام Ensemble كنموذج نهائي
     return ensemble_model, available_features, {
@@ -268,14 +348,28 @@ def train_ensemble(df):
         'xgb_acc': xgb_acc,
         'lgb_acc': lgb_acc,
         'ensemble_acc': ensemble_acc
-    }
+    }, selection
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the ensemble model")
+    parser.add_argument('--time-budget', type=float, default=None, help="مهلة التدريب بالثواني")
+    parser.add_argument('--early-stopping-rounds', type=int, default=20)
+    parser.add_argument('--forest', choices=['rf', 'hgb'], default='rf')
+    parser.add_argument('--select-features', action='store_true', help="اختيار أصغر مجموعة ميزات")
+    parser.add_argument('--feature-tolerance', type=float, default=0.005, help="أقصى انخفاض في الدقة (0.005 = 0.5%%)")
+    parser.add_argument('--tuned', action='store_true', help="معاملات آخر بحث من سجل النماذج")
+    args = parser.parse_args(argv)
+    
+    # المهلة تبدأ قبل جلب البيانات - كامل التشغيل ينتهي خلال --time-budget تقريباً
+    budget = TimeBudget(args.time_budget)
+    profiler = RunProfiler("train_ensemble", args=vars(args)).start()
+    
     print("=" * 70)
     print("🚀 تدريب Ensemble Model (RF + XGBoost + LightGBM)")
     print("=" * 70)
     
+    params = tuned_params(args.forest) if args.tuned else None
     db = Database()
     
     try:
@@ -286,14 +380,32 @@ def main():
             print("❌ البيانات غير كافية!")
             return
         
+        profiler.meta.update(samples=len(df), symbols=int(df['symbol'].nunique()))
+        
         # تدريب
-        model, features, accuracies = train_ensemble(df)
+        model, features, accuracies, selection = train_ensemble(
+            df, budget, args.early_stopping_rounds, args.forest,
+            args.feature_tolerance if args.select_features else None,
+            params
+        )
         
         # حفظ
-        ml_model = StockMLModel()
-        ml_model.model = model
-        ml_model.features = features
-        ml_model.save_model()
+        with stage("save"):
+            ml_model = StockMLModel()
+            ml_model.model = model
+            ml_model.features = features
+            version = ModelRegistry().register(ml_model, {
+                'samples': len(df),
+                'symbols': int(df['symbol'].nunique()),
+                'data_start': df['date'].min(),
+                'data_end': df['date'].max(),
+                'forest': args.forest,
+                'time_budget': args.time_budget,
+                'feature_selection': selection,
+                'hyperparameters': params or None,
+                **{k: round(float(v), 4) for k, v in accuracies.items()}
+            })
+        profiler.meta.update(model_version=version, **{k: round(float(v), 4) for k, v in accuracies.items()})
         
         print("\n" + "=" * 70)
         print("✅ اكتمل التدريب بنجاح!")
@@ -307,6 +419,7 @@ def main():
     
     finally:
         db.close()
+        profiler.save()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 """
 تدريب نموذج Random Forest للتوصيات
+
+--time-budget: مهلة بالثواني لكامل التدريب - بدون Grid Search، والأشجار تُضاف حتى انتهاء المهلة
+--model hgb: HistGradientBoosting مع early stopping على آخر 10% من أيام التدريب
 """
 
 import sys
+import time
+import argparse
 import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 from datetime import datetime
 
@@ -19,67 +23,71 @@ sys.path.insert(0, parent_dir)
 
 from backend.data.database import Database
 from backend.models.ml_model import StockMLModel
-
-def create_target(df):
-    """إنشاء الهدف (Buy/Sell/Hold)"""
-    # نظرة للأمام 5 أيام
-    df['future_return'] = df['close'].shift(-5) / df['close'] - 1
-    
-    # تصنيف
-    conditions = [
-        df['future_return'] > 0.03,  # ارتفاع > 3% = Buy
-        df['future_return'] < -0.03,  # انخفاض > 3% = Sell
-    ]
-    choices = ['buy', 'sell']
-    df['target'] = np.select(conditions, choices, default='hold')
-    
-    return df
+from backend.models.model_registry import ModelRegistry
+from backend.data.feature_store import FeatureStore
+from backend.data.price_snapshot import PriceSnapshot
+from backend.data.labels import create_target
+from backend.data.training_dataset import build_training_dataset
+from backend.models.training import TimeBudget, fit_with_budget, model_iterations
+from backend.profiling import RunProfiler, stage
+from backend.models.validation import purged_walk_forward, time_holdout_split
 
 def prepare_training_data(db):
     """تحضير بيانات التدريب"""
     print("📊 جلب البيانات التاريخية...")
     
-    # جلب آخر 500 يوم
-    data = db.get_all_historical_data(days=500)
+    # آخر 500 يوم من النسخة المحلية (يُجلب من قاعدة البيانات الجديد/المعدل فقط)
+    with stage("fetch"):
+        df = PriceSnapshot().load_prices(db, days=500)
     
-    if not data:
+    if df.empty:
         print("❌ لا توجد بيانات!")
         return None
     
-    df = pd.DataFrame(data)
     print(f"✅ تم جلب {len(df)} سجل من {df['symbol'].nunique()} سهم")
     
-    # معالجة كل سهم
-    ml_model = StockMLModel()
-    all_data = []
-    
-    for symbol in df['symbol'].unique():
-        stock_df = df[df['symbol'] == symbol].copy()
-        stock_df = stock_df.sort_values('date')
-        
-        # تحويل Decimal إلى float
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            if col in stock_df.columns:
-                stock_df[col] = stock_df[col].astype(float)
-        
-        # حساب المؤشرات
-        stock_df = ml_model.calculate_technical_indicators(stock_df)
-        
-        # إنشاء الهدف
-        stock_df = create_target(stock_df)
-        
-        all_data.append(stock_df)
-    
-    # دمج البيانات
-    final_df = pd.concat(all_data, ignore_index=True)
-    final_df = final_df.dropna()
+    # الميزات تُحسب للشموع الجديدة فقط عبر مخزن الميزات، وتُجمع في مصفوفة float32 واحدة
+    # (ترتيب واحد حسب symbol/date ومعالجة الأسهم بالتوازي على كل الأنوية)
+    with stage("indicators", rows=len(df)):
+        final_df = build_training_dataset(df, create_target, FeatureStore(), n_jobs=-1)
     
-    print(f"✅ البيانات النهائية: {len(final_df)} عينة")
+    print(f"✅ البيانات النهائية: {len(final_df)} عينة "
+          f"({final_df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB)")
     
     return final_df
 
-def train_model(df):
-    """تدريب النموذج"""
+def make_model(model_name='rf', params=None):
+    """النموذج بمعاملات ثابتة (بدون Grid Search) - params تُطبق فوقها"""
+    if model_name == 'hgb':
+        model = HistGradientBoostingClassifier(
+            max_iter=300,
+            learning_rate=0.1,
+            max_leaf_nodes=31,
+            min_samples_leaf=20,
+            class_weight='balanced',
+            early_stopping=False,  # early stopping زمني في fit_with_budget
+            random_state=42
+        )
+    else:
+        model = RandomForestClassifier(
+            n_estimators=200,
+            max_depth=15,
+            min_samples_split=10,
+            min_samples_leaf=5,
+            class_weight='balanced',
+            random_state=42,
+            n_jobs=-1
+        )
+    
+    return model.set_params(**(params or {}))
+
+def train_model(df, budget=None, early_stopping_rounds=20, model_name='rf', params=None):
+    """
+    تدريب النموذج
+
+    budget: TimeBudget (None بدون حد) - مع المهلة لا يُستخدم Grid Search
+    params: معاملات من البحث (python_scripts/hyperparameter_search.py) - بدون Grid Search
+    """
     print("\n🤖 بدء التدريب...")
     
     # الميزات (مع المؤشرات الجديدة + أنماط الشموع + الدعم/المقاومة)
@@ -103,73 +111,118 @@ def train_model(df):
     features = [f for f in features if f in df.columns]
     print(f"📊 الميزات المتاحة: {len(features)}")
     
-    X = df[features]
-    y = df['target']
+    with stage("preprocessing"):
+        X = df[features]
+        y = df['target']
     
-    # تقسيم البيانات
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+        # تقسيم زمني: آخر 20% من الأيام للاختبار مع حذف 5 أيام قبلها (مدة الهدف)
+        train_idx, test_idx = time_holdout_split(df['date'], test_fraction=0.2, horizon=5)
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
     
-    print(f"📊 التدريب: {len(X_train)} عينة")
-    print(f"📊 الاختبار: {len(X_test)} عينة")
-    print(f"📊 توزيع الفئات:\n{y_train.value_counts()}")
+        print(f"📊 التدريب: {len(X_train)} عينة")
+        print(f"📊 الاختبار: {len(X_test)} عينة")
+        print(f"📊 توزيع الفئات:\n{y_train.value_counts()}")
     
-    # Hyperparameter Tuning
-    print("\n⏳ جاري Hyperparameter Tuning...")
+    with stage("fit", model=model_name):
+        if model_name == 'rf' and params is None and (budget is None or budget.deadline is None):
+            # Hyperparameter Tuning
+            print("\n⏳ جاري Hyperparameter Tuning...")
     
-    param_grid = {
-        'n_estimators': [100, 200],
-        'max_depth': [10, 15, 20],
-        'min_samples_split': [10, 20],
-        'min_samples_leaf': [5, 10]
-    }
+            param_grid = {
+                'n_estimators': [100, 200],
+                'max_depth': [10, 15, 20],
+                'min_samples_split': [10, 20],
+                'min_samples_leaf': [5, 10]
+            }
     
-    base_model = RandomForestClassifier(
-        class_weight='balanced',
-        random_state=42,
-        n_jobs=-1
-    )
+            base_model = RandomForestClassifier(
+                class_weight='balanced',
+                random_state=42,
+                n_jobs=-1
+            )
     
-    grid_search = GridSearchCV(
-        base_model,
-        param_grid,
-        cv=3,
-        scoring='accuracy',
-        n_jobs=-1,
-        verbose=1
-    )
+            # folds زمنية (Walk-Forward) بدلاً من KFold العشوائي
+            cv_folds = purged_walk_forward(df['date'].iloc[train_idx], n_folds=3, horizon=5)
     
-    grid_search.fit(X_train, y_train)
+            grid_search = GridSearchCV(
+                base_model,
+                param_grid,
+                cv=[(fold['train_idx'], fold['test_idx']) for fold in cv_folds],
+                scoring='accuracy',
+                n_jobs=-1,
+                verbose=1
+            )
     
-    print(f"\n✅ أفضل معاملات: {grid_search.best_params_}")
+            grid_search.fit(X_train, y_train)
     
-    model = grid_search.best_estimator_
+            print(f"\n✅ أفضل معاملات: {grid_search.best_params_}")
     
-    # التقييم
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
+            model = grid_search.best_estimator_
+    
+        else:
+            # Grid Search لا يمكن إيقافه عند المهلة: معاملات ثابتة (أو من البحث) + تدريب ضمن المهلة
+            model = make_model(model_name, params)
+            X_fit, y_fit, eval_set = X_train, y_train, None
+            if model_name == 'hgb' and early_stopping_rounds:
+                fit_idx, val_idx = time_holdout_split(df['date'].iloc[train_idx], test_fraction=0.1, horizon=5)
+                X_fit, y_fit = X_train.iloc[fit_idx], y_train.iloc[fit_idx]
+                eval_set = (X_train.iloc[val_idx], y_train.iloc[val_idx])
+        
+            print(f"\n⏳ تدريب {type(model).__name__}...")
+            if budget is not None and budget.deadline is not None:
+                print(f"⏱️  المهلة المتبقية: {budget.remaining():.0f} ثانية")
+            start = time.perf_counter()
+            fit_with_budget(model, X_fit, y_fit, eval_set=eval_set, budget=budget,
+                            early_stopping_rounds=early_stopping_rounds)
+            print(f"✅ التدريب: {time.perf_counter() - start:.1f} ثانية ({model_iterations(model)} شجرة/جولة)")
     
-    print(f"\n✅ دقة النموذج: {accuracy*100:.2f}%")
-    print("\n📊 تقرير التصنيف:")
-    print(classification_report(y_test, y_pred))
+    with stage("evaluation"):
+        # التقييم
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
     
-    # أهمية الميزات
-    feature_importance = pd.DataFrame({
-        'feature': features,
-        'importance': model.feature_importances_
-    }).sort_values('importance', ascending=False)
+        print(f"\n✅ دقة النموذج: {accuracy*100:.2f}%")
+        print("\n📊 تقرير التصنيف:")
+        print(classification_report(y_test, y_pred))
     
-    print("\n📊 أهمية الميزات:")
-    print(feature_importance.to_string(index=False))
+        # أهمية الميزات
+        if hasattr(model, 'feature_importances_'):
+            feature_importance = pd.DataFrame({
+                'feature': features,
+                'importance': model.feature_importances_
+            }).sort_values('importance', ascending=False)
+        
+            print("\n📊 أهمية الميزات:")
+            print(feature_importance.to_string(index=False))
     
     return model, features
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the Random Forest model")
+    parser.add_argument('--time-budget', type=float, default=None, help="مهلة التدريب بالثواني")
+    parser.add_argument('--early-stopping-rounds', type=int, default=20)
+    parser.add_argument('--model', choices=['rf', 'hgb'], default='rf')
+    parser.add_argument('--tuned', action='store_true', help="معاملات آخر بحث من سجل النماذج")
+    args = parser.parse_args(argv)
+    
+    # المهلة تبدأ قبل جلب البيانات - كامل التشغيل ينتهي خلال --time-budget تقريباً
+    budget = TimeBudget(args.time_budget)
+    profiler = RunProfiler("train_model", args=vars(args)).start()
+    
     print("=" * 70)
     print("🚀 تدريب نموذج Random Forest للتوصيات")
     print("=" * 70)
     
+    params = None
+    if args.tuned:
+        artifact = ModelRegistry().hyperparameters(args.model)
+        if artifact is None:
+            print(f"⚠️  لا توجد معاملات محفوظة لـ {args.model} - المعاملات الافتراضية")
+        else:
+            params = artifact['params']
+            print(f"✅ معاملات البحث ({artifact['saved_at']}): {params}")
+    
     db = Database()
     
     try:
@@ -180,14 +233,25 @@ def main():
             print("❌ البيانات غير كافية!")
             return
         
+        profiler.meta.update(samples=len(df), symbols=int(df['symbol'].nunique()))
+        
         # تدريب
-        model, features = train_model(df)
+        model, features = train_model(df, budget, args.early_stopping_rounds, args.model, params)
         
         # حفظ
-        ml_model = StockMLModel()
-        ml_model.model = model
-        ml_model.features = features
-        ml_model.save_model()
+        with stage("save"):
+            ml_model = StockMLModel()
+            ml_model.model = model
+            ml_model.features = features
+            version = ModelRegistry().register(ml_model, {
+                'samples': len(df),
+                'symbols': int(df['symbol'].nunique()),
+                'data_start': df['date'].min(),
+                'data_end': df['date'].max(),
+                'time_budget': args.time_budget,
+                'hyperparameters': params
+            })
+        profiler.meta['model_version'] = version
         
         print("\n" + "=" * 70)
         print("✅ اكتمل التدريب بنجاح!")
@@ -200,6 +264,7 @@ def main():
     
     finally:
         db.close()
+        profiler.save()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+تقييم Walk-Forward لنماذج الـ Ensemble (RF + XGBoost + LightGBM + Voting)
+- folds حسب التاريخ مع purge (مدة الهدف) و embargo
+- الـ folds تُقيَّم بالتوازي في عمليات منفصلة تقرأ نفس المصفوفات (mmap)
+- مقاييس وزمن لكل fold ولكل نموذج، والنتائج في CSV
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from backend.data.feature_store import FeatureStore
+from backend.data.training_dataset import compact_prices, build_training_dataset
+from backend.models.validation import run_walk_forward, summarize_walk_forward
+from train_ensemble import FEATURES, make_models, create_target, prepare_training_data
+
+
+def load_dataset(args, label_grid=None):
+    """بيانات التدريب من قاعدة البيانات أو بيانات عشوائية (--synthetic)"""
+    if args.synthetic:
+        from benchmark_training_data import make_market_rows
+        print(f"ℹ️  بيانات عشوائية: {args.synthetic} سهم × {args.years} سنوات")
+        prices = compact_prices(make_market_rows(args.synthetic, args.years))
+        return build_training_dataset(prices, create_target, FeatureStore(root=tempfile.mkdtemp()),
+                                      label_grid=label_grid)
+
+    from backend.data.database import Database
+    db = Database()
+    try:
+        return prepare_training_data(db, label_grid)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward validation")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--horizon', type=int, default=5, help="مدة الهدف بالأيام (purge)")
+    parser.add_argument('--embargo', type=int, default=5)
+    parser.add_argument('--test-fraction', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cores', type=int, default=None)
+    parser.add_argument('--synthetic', type=int, default=0, help="عدد الأسهم العشوائية (بدون قاعدة بيانات)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--output', default="/tmp/walk_forward_cv.csv")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔬 Walk-Forward Validation (purged + embargo)")
+    print("=" * 70)
+
+    df = load_dataset(args)
+    if df is None or len(df) < 1000:
+        print("❌ البيانات غير كافية!")
+        return
+
+    features = [f for f in FEATURES if f in df.columns]
+
+    start = time.perf_counter()
+    results = run_walk_forward(
+        df[features].to_numpy(), df['target'], df['date'], make_models,
+        n_folds=args.folds, horizon=args.horizon, embargo=args.embargo,
+        test_fraction=args.test_fraction, numeric_targets=['xgb'],
+        ensemble_members=['rf', 'lgb'], n_workers=args.workers, n_cores=args.cores
+    )
+    elapsed = time.perf_counter() - start
+
+    pd.set_option('display.width', 200)
+    print("\n📊 النتائج لكل fold:")
+    print(results[['fold', 'model', 'test_start', 'test_end', 'n_train', 'n_test', 'accuracy',
+                   'f1_macro', 'precision_buy', 'precision_sell', 'fit_seconds']]
+          .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    print("\n📊 الملخص (متوسط ± انحراف):")
+    print(summarize_walk_forward(results).to_string(float_format=lambda v: f"{v:.3f}"))
+
+    results.to_csv(args.output, index=False)
+    print(f"\n✅ اكتمل في {elapsed:.1f} ثانية - النتائج في {args.output}")
+
+
+if __name__ == "__main__":
+    main()